@@ -1,23 +1,47 @@
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import requests
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import folium
-from streamlit_folium import st_folium
-from sklearn.linear_model import LinearRegression
-from io import BytesIO
-import base64
+import html
 from datetime import datetime as dt
 from datetime import datetime
+from datetime import timedelta
 UPLOAD_DIR = "uploads"
 LAPORAN_FILE = "laporan_warga.json"
 import pytz
 import subprocess
 import json
 import os
-from PIL import Image
-from rapidfuzz import process, fuzz
+from functools import partial
+from faq import SumberFAQ
+from laporan import StoreLaporan, KOLOM as KOLOM_LAPORAN
+from gambar import PenyimpanGambar, gambar_kecil
+from penyimpanan import BerkasJSON, KonflikTulis
+from harga import RiwayatHarga, FREKUENSI as FREKUENSI_HARGA
+from bersama import DataBersama
+from bagian import lingkup_rerun
+from grafik import CacheGrafik, buat_grafik, PANEL_HARIAN, PANEL_JAM
+from ekspor import (
+    CacheEkspor, AntrianEkspor, FORMAT_EKSPOR, UKURAN_POTONGAN, BATAS_FOTO_XLSX, PORT_UNDUH, saring_tanggal, sidik_df,
+    jalankan_server_unduhan, server_unduhan_aktif, url_unduhan,
+)
+from cuaca import KlienCuaca, buat_df_harian, buat_df_jam, kunci_lokasi
+from arsip_cuaca import ArsipCuaca, PengumpulCuaca
+from peta import CachePeta, tampil_peta
+from instrumen import Instrumen
+from tile_peta import (
+    ProksiTile, jalankan_server, jalankan_prefetch, proksi_aktif, perlebar_kotak, PORT_TILE, ZOOM_PREFETCH, ZOOM_PETA,
+    MARGIN_WILAYAH,
+)
+from irigasi import rekomendasi_irigasi, hitung_irigasi, ringkasan_lokasi
+from wilayah import KECAMATAN_SIDRAP, BBOX_SIDRAP, buat_grid, Gazetir, tentukan_koordinat, hotspot_kecamatan
+from model_panen import muat_model, prediksi
+from musim import perbarui_klimatologi, fitur_musim_banyak, LAMA_MUSIM
+from skenario import hasil_dari_cuaca, evaluasi_skenario, harga_impas, jumlah_skenario, ringkasan_laba, peta_laba, ringkasan_komoditas
+from folium.plugins import HeatMap, FastMarkerCluster
 
 
 # ---------------------- Konfigurasi halaman ----------------------
@@ -169,9 +193,143 @@ input, textarea {{
 with st.sidebar:
     st.checkbox("Dark Mode", value=st.session_state.dark_mode, key="dark_mode")
     
+# ------------------ INSTRUMENTASI KINERJA ------------------
+# Waktu, byte unduhan, hit cache, dan alokasi memori tiap bagian per rerun (instrumen.py). Dicatat hanya untuk
+# sesi yang menyalakan panel "Debug Kinerja" di sidebar, atau semua sesi jika secrets INSTRUMEN = true
+# (supaya metrik di data/metrik & /metrics proksi tile, jika TILE_PROXY_URL diisi, terus terisi)
+@st.cache_resource
+def get_instrumen():
+    return Instrumen(selalu=bool(st.secrets.get("INSTRUMEN", False)))
+
+instrumen = get_instrumen()
+# Nilai checkbox panel (digambar di akhir sidebar) dibaca lebih dulu supaya seluruh rerun ini ikut tercatat
+instrumen.atur_sesi(st.session_state.get("debug_kinerja", False), st.session_state.get("debug_alokasi", False))
+instrumen.mulai_rerun()
+
 # ------------------ INPUT KOORDINAT ------------------
 LAT = st.sidebar.number_input("Latitude", value=-3.921406, format="%.6f")
 LON = st.sidebar.number_input("Longitude", value=119.772731, format="%.6f")
+threshold = st.sidebar.slider("Batas Curah Hujan untuk Irigasi (mm):", 0, 20, 5)
+cakupan_peta = st.sidebar.selectbox("Cakupan Peta", ["Titik Terpilih", "Kecamatan Sidrap", "Grid Sidrap"])
+JENIS_LAPORAN = ["Masalah Irigasi", "Gangguan Hama", "Kondisi Cuaca", "Lainnya"]
+
+# Satu klien per proses: cache dipakai bersama semua sesi dan semua rerun
+@st.cache_resource
+def get_klien_cuaca():
+    klien = KlienCuaca()
+    get_instrumen().pantau_session(klien.session)
+    get_instrumen().daftar_cache("cuaca", klien.stats, hit=("hit", "stale"))
+    return klien
+
+# Arsip snapshot prakiraan (data/arsip_cuaca.db): setiap payload baru dari klien dicatat, dan pengumpul
+# latar mengambil semua kecamatan tiap jam supaya riwayat terbentuk walau dashboard tidak dibuka
+@st.cache_resource
+def get_arsip_cuaca():
+    arsip = ArsipCuaca()
+    klien = get_klien_cuaca()
+    klien.pendengar.append(arsip.dengar)
+    PengumpulCuaca(arsip, KECAMATAN_SIDRAP, klien.ambil).mulai()
+    return arsip
+
+arsip_cuaca = get_arsip_cuaca()
+
+# Satu salinan data referensi (harga, pengingat) untuk semua sesi; versi naik setiap ada penulisan
+@st.cache_resource
+def get_data_bersama():
+    return DataBersama()
+
+data_bersama = get_data_bersama()
+if st.session_state.get("versi_terlihat", data_bersama.versi) != data_bersama.versi:
+    st.toast("Data diperbarui oleh pengguna lain.")
+st.session_state.versi_terlihat = data_bersama.versi
+
+def setelah_tulis(nama, sumber=True):
+    # Naikkan versi data bersama; sesi penulis langsung mencatatnya supaya tidak memicu muat ulang sendiri
+    versi = data_bersama.segarkan(nama) if sumber else data_bersama.tandai(nama)
+    st.session_state.versi_terlihat = versi
+
+def jalankan_ulang(bagian, masukan, pesan=None):
+    # Setelah `bagian` mengubah `masukan`: jalankan ulang hanya fragmen itu jika tidak ada bagian lain
+    # yang membaca masukan tersebut (bagian.py), selain itu seluruh aplikasi. Pesan (jenis, teks)
+    # disimpan dulu supaya tetap tampil setelah rerun.
+    if pesan:
+        st.session_state[f"pesan_{bagian}"] = pesan
+    if lingkup_rerun(bagian, masukan) == "fragment":
+        try:
+            st.rerun(scope="fragment")
+        except StreamlitAPIException:  # klik terproses dalam run penuh, bukan run fragmen
+            pass
+    st.rerun()
+
+def tampil_pesan(bagian):
+    pesan = st.session_state.pop(f"pesan_{bagian}", None)
+    if pesan:
+        getattr(st, pesan[0])(pesan[1])
+
+@st.cache_data(ttl=900, show_spinner="Mengambil prakiraan seluruh kabupaten...")
+def get_irigasi_kabupaten(cakupan, threshold):
+    lokasi = KECAMATAN_SIDRAP if cakupan == "Kecamatan Sidrap" else buat_grid()
+    df_kab = get_klien_cuaca().ambil_banyak(lokasi, max_workers=16)
+    if df_kab.empty:
+        return df_kab, df_kab
+    df_kab = hitung_irigasi(df_kab, threshold)
+    return df_kab, ringkasan_lokasi(df_kab)
+
+@st.cache_resource
+def get_gazetir():
+    return Gazetir()
+
+# Laporan disimpan di SQLite (data/laporan.db); laporan_warga.json lama dimigrasikan sekali,
+# dan laporan yang belum berkoordinat digeokode dari nama lokasinya lewat gazetir
+@st.cache_resource
+def get_store_laporan():
+    store = StoreLaporan()
+    store.migrasi_json(LAPORAN_FILE)
+    store.isi_koordinat(get_gazetir().koordinat)
+    return store
+
+store_laporan = get_store_laporan()
+BATAS_TITIK_PETA = 5000
+
+@st.cache_data(ttl=300)
+def get_titik_laporan(versi, kotak, jenis):
+    return store_laporan.dalam_kotak(*kotak, jenis=list(jenis), batas=BATAS_TITIK_PETA)
+
+@st.cache_data(ttl=300)
+def get_hotspot_laporan(versi):
+    df = store_laporan.koordinat()
+    return hotspot_kecamatan(df["Lat"], df["Lon"], df["Jenis"], JENIS_LAPORAN)
+
+# ------------------ PROKSI TILE PETA ------------------
+# Satu proksi tile per proses (tile_peta.py): browser mengambil tile peta dasar & curah hujan lewat proksi
+# ini, bukan langsung ke OpenStreetMap/OpenWeatherMap, jadi kuota API terpakai sekali per tile untuk semua
+# pengguna. Proksi hanya dipakai jika secrets TILE_PROXY_URL diisi dengan URL yang terjangkau browser
+# pengguna (mis. https://domain/tile-proxy di balik reverse proxy yang meneruskan ke TILE_PROXY_HOST:port,
+# bawaan 127.0.0.1:8765). Tanpa itu, atau jika proksi tidak bisa dijalankan, peta memakai URL upstream langsung:
+# "localhost" di browser pengguna bukan server ini. Proksi hanya melayani tile sekitar Sidrap (BBOX_SIDRAP).
+@st.cache_resource
+def get_proksi_tile():
+    # -> (url proksi atau None, ProksiTile milik proses ini atau None)
+    url = st.secrets.get("TILE_PROXY_URL", "").rstrip("/")
+    if not url:
+        return None, None
+    host = st.secrets.get("TILE_PROXY_HOST", "127.0.0.1")
+    port = int(st.secrets.get("TILE_PROXY_PORT", PORT_TILE))
+    proksi = ProksiTile(kunci_api=st.secrets.get("OWM_API_KEY", ""), wilayah=BBOX_SIDRAP)
+    try:
+        jalankan_server(proksi, host=host, port=port, metrik=get_instrumen().ke_prometheus)
+    except OSError:
+        # Port sudah dipakai: biasanya proksi proses Streamlit lain, yang bisa dipakai bersama
+        return (url if proksi_aktif(port, host) else None), None
+    lapisan = ZOOM_PREFETCH if proksi.kunci_api else {"dasar": ZOOM_PREFETCH["dasar"]}
+    jalankan_prefetch(proksi, BBOX_SIDRAP, lapisan)
+    return url, proksi
+
+@st.cache_resource
+def get_cache_peta():
+    cache = CachePeta()
+    get_instrumen().daftar_cache("peta", cache.stats, miss=("bangun",))
+    return cache
 
 # ------------------ HEADER ------------------
 st.title("Dashboard Pertanian Cerdas – Kabupaten Sidenreng Rappang")
@@ -180,710 +338,1003 @@ Lokasi: Kabupaten Sidenreng Rapppang – Sulawesi Selatan
 Dikembangkan oleh Dian Eka Putra | Email: ekaputradian01@gmail.com | WA: 085654073752
 """)
 # ------------------ PETA CURAH HUJAN ------------------
-with st.expander("Peta Curah Hujan Real-time"):
-    m = folium.Map(location=[LAT, LON], zoom_start=13, control_scale=True)
+with st.expander("Peta Curah Hujan Real-time"), instrumen.ukur("peta"):
+    df_kabupaten, df_ringkasan = None, None
+    pusat_peta, zoom_peta = [LAT, LON], 13
+    if cakupan_peta != "Titik Terpilih":
+        df_kabupaten, df_ringkasan = get_irigasi_kabupaten(cakupan_peta, threshold)
+        if df_ringkasan.empty:
+            st.warning("Data prakiraan kabupaten belum tersedia.")
+            df_kabupaten, df_ringkasan = None, None
+        else:
+            pusat_peta, zoom_peta = [df_ringkasan["Lat"].mean(), df_ringkasan["Lon"].mean()], 10
+
+    url_tile, proksi_tile = get_proksi_tile()
     OWM_API_KEY = st.secrets.get("OWM_API_KEY", "")
-    if OWM_API_KEY:
-        tile_url = f"https://tile.openweathermap.org/map/precipitation_new/{{z}}/{{x}}/{{y}}.png?appid={OWM_API_KEY}"
-        folium.TileLayer(
-            tiles=tile_url, attr="© OpenWeatherMap",
-            name="Curah Hujan", overlay=True, control=True, opacity=0.6
-        ).add_to(m)
-    folium.Marker([LAT, LON], tooltip="Lokasi Terpilih").add_to(m)
-    st_folium(m, width="100%", height=400)
+    # Proksi hanya melayani tile sekitar Sidrap; peta yang berpusat di luar wilayah itu memakai upstream langsung
+    batas_peta = perlebar_kotak(BBOX_SIDRAP, MARGIN_WILAYAH)
+    if not (batas_peta[0] <= pusat_peta[0] <= batas_peta[2] and batas_peta[1] <= pusat_peta[1] <= batas_peta[3]):
+        url_tile = None
+
+    # Laporan warga sebagai layer cluster. Peta tidak lagi mengirim bounds (geser/zoom tidak memicu rerun),
+    # jadi titik diambil untuk seluruh kabupaten; pengelompokan di browser tetap ringan.
+    jenis_peta = st.multiselect("Laporan warga di peta", JENIS_LAPORAN, default=JENIS_LAPORAN, key="jenis_peta")
+    df_titik = get_titik_laporan(store_laporan.versi(), BBOX_SIDRAP, tuple(jenis_peta)) if jenis_peta else None
+    if df_titik is not None and len(df_titik) >= BATAS_TITIK_PETA:
+        st.caption(f"Menampilkan {BATAS_TITIK_PETA} laporan terbaru di peta.")
+
+    def bangun_peta():
+        # Lewat proksi, geser & zoom dibatasi ke wilayah dan zoom yang dilayaninya
+        batas = dict(
+            min_zoom=ZOOM_PETA[0], max_zoom=ZOOM_PETA[1], max_bounds=True, min_lat=batas_peta[0],
+            min_lon=batas_peta[1], max_lat=batas_peta[2], max_lon=batas_peta[3],
+        ) if url_tile else {}
+        m = folium.Map(
+            location=pusat_peta, zoom_start=zoom_peta, control_scale=True, tiles=None if url_tile else "OpenStreetMap",
+            **batas,
+        )
+        if url_tile:
+            folium.TileLayer(
+                tiles=f"{url_tile}/tile/dasar/{{z}}/{{x}}/{{y}}.png", name="Peta Dasar",
+                min_zoom=ZOOM_PETA[0], max_zoom=ZOOM_PETA[1],
+                attr='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors',
+            ).add_to(m)
+        if OWM_API_KEY:
+            if url_tile:
+                tile_url = f"{url_tile}/tile/hujan/{{z}}/{{x}}/{{y}}.png"
+            else:
+                tile_url = f"https://tile.openweathermap.org/map/precipitation_new/{{z}}/{{x}}/{{y}}.png?appid={OWM_API_KEY}"
+            folium.TileLayer(
+                tiles=tile_url, attr="© OpenWeatherMap",
+                name="Curah Hujan", overlay=True, control=True, opacity=0.6
+            ).add_to(m)
+        folium.Marker([LAT, LON], tooltip="Lokasi Terpilih").add_to(m)
+
+        # Satu layer panas untuk seluruh lokasi, bobot = total defisit air selama prakiraan
+        if df_ringkasan is not None:
+            HeatMap(
+                df_ringkasan[["Lat", "Lon", "Total Defisit (mm)"]].to_numpy().tolist(),
+                name="Defisit Air", radius=25, blur=20,
+            ).add_to(m)
+
+        if df_titik is not None and not df_titik.empty:
+            warna = dict(zip(JENIS_LAPORAN, ["blue", "red", "orange", "gray"]))
+            FastMarkerCluster(
+                [
+                    [lat, lon, html.escape(f"{j} – {lok or '-'} ({tgl})"), warna.get(j, "gray")]
+                    for lat, lon, j, lok, tgl in zip(
+                        df_titik["Lat"], df_titik["Lon"], df_titik["Jenis"], df_titik["Lokasi"], df_titik["Tanggal"]
+                    )
+                ],
+                callback="""function (row) {
+                    var marker = L.circleMarker(new L.LatLng(row[0], row[1]),
+                        {radius: 6, color: row[3], fillOpacity: 0.7});
+                    marker.bindPopup(row[2]);
+                    return marker;
+                }""",
+                name="Laporan Warga",
+            ).add_to(m)
+        folium.LayerControl().add_to(m)
+        return m
+
+    # HTML peta dibangun sekali per (lokasi, lapisan, versi data) dan dipakai ulang semua rerun & sesi;
+    # hanya klik yang dikirim balik (peta.py)
+    kunci_peta = (
+        LAT, LON, tuple(pusat_peta), zoom_peta, url_tile, bool(OWM_API_KEY),
+        None if df_ringkasan is None else sidik_df(df_ringkasan), tuple(jenis_peta), store_laporan.versi(),
+    )
+    hasil_peta = tampil_peta(get_cache_peta(), kunci_peta, bangun_peta, key="peta_utama")
+    if proksi_tile is not None:
+        info_tile = proksi_tile.ringkasan()
+        if info_tile["hit_rate"] is not None:
+            st.caption(
+                f"Cache tile: {info_tile['tile']} tile ({info_tile['ukuran_mb']} MB), "
+                f"hit rate {info_tile['hit_rate']:.0%}"
+            )
+    if hasil_peta and hasil_peta.get("last_clicked"):
+        klik = hasil_peta["last_clicked"]
+        st.session_state.pin_laporan = (round(klik["lat"], 6), round(klik["lng"], 6))
+
+    if df_ringkasan is not None:
+        st.markdown("Ringkasan Kebutuhan Irigasi per Lokasi")
+        st.dataframe(
+            df_ringkasan.sort_values("Total Defisit (mm)", ascending=False),
+            use_container_width=True, hide_index=True
+        )
+
+    df_hotspot = get_hotspot_laporan(store_laporan.versi())
+    if df_hotspot["Total"].sum() > 0:
+        st.markdown("Sebaran Laporan Warga per Kecamatan")
+        st.dataframe(df_hotspot, use_container_width=True, hide_index=True)
 
 # ------------------ AMBIL DATA CUACA ------------------
-weather_url = (
-    f"https://api.open-meteo.com/v1/forecast?latitude={LAT}&longitude={LON}&"
-    "daily=temperature_2m_min,temperature_2m_max,precipitation_sum,relative_humidity_2m_mean&"
-    "hourly=temperature_2m,precipitation,relative_humidity_2m&timezone=auto"
-)
-resp = requests.get(weather_url)
-data = resp.json()
+with instrumen.ukur("cuaca"):
+    try:
+        data = get_klien_cuaca().ambil(LAT, LON)
+    except (requests.RequestException, ValueError):
+        st.error("Gagal mengambil data cuaca dari Open-Meteo. Silakan coba lagi beberapa saat.")
+        st.stop()
 
 # ------------------ DATAFRAME HARIAN ------------------
-df_harian = pd.DataFrame({
-    "Tanggal": pd.to_datetime(data["daily"]["time"]),
-    "Curah Hujan (mm)": np.round(data["daily"]["precipitation_sum"], 1),
-    "Suhu Maks (°C)": np.round(data["daily"]["temperature_2m_max"], 1),
-    "Suhu Min (°C)": np.round(data["daily"]["temperature_2m_min"], 1),
-    "Kelembapan (%)": np.round(data["daily"]["relative_humidity_2m_mean"], 1)
-})
+df_harian = buat_df_harian(data)
 
-threshold = st.sidebar.slider("Batas Curah Hujan untuk Irigasi (mm):", 0, 20, 5)
-df_harian["Rekomendasi Irigasi"] = df_harian["Curah Hujan (mm)"].apply(
-    lambda x: "Irigasi Diperlukan" if x < threshold else "Cukup"
-)
+df_harian["Rekomendasi Irigasi"] = rekomendasi_irigasi(df_harian["Curah Hujan (mm)"], threshold)
 
 # ------------------ TAMPILKAN TABEL DATA ------------------
-with st.expander("Tabel Data Cuaca Harian"):
-    st.dataframe(df_harian, use_container_width=True)
+@st.cache_resource
+def get_cache_ekspor():
+    cache = CacheEkspor()
+    get_instrumen().daftar_cache("ekspor", cache.stats, miss=("bangun",))
+    return cache
 
-    csv = df_harian.to_csv(index=False).encode("utf-8")
-    st.download_button("Download CSV", csv, "data_cuaca_harian.csv", "text/csv")
-
-    excel_io = BytesIO()
-    with pd.ExcelWriter(excel_io, engine='xlsxwriter') as writer:
-        df_harian.to_excel(writer, index=False, sheet_name="Cuaca Harian")
-        workbook = writer.book
-        worksheet = writer.sheets["Cuaca Harian"]
-        date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
-        worksheet.set_column('A:A', 15, date_format)
-    excel_io.seek(0)
-    st.download_button("Download Excel", data=excel_io.read(), file_name="data_cuaca_harian.xlsx")
+with st.expander("Tabel Data Cuaca Harian"), instrumen.ukur("tabel_cuaca"):
+    st.dataframe(df_harian, use_container_width=True)
 
-    pdf_html = df_harian.to_html(index=False)
-    b64 = base64.b64encode(pdf_html.encode("utf-8")).decode("utf-8")
-    href = f'<a href="data:text/html;base64,{b64}" download="laporan_cuaca_harian.html">📥 Download Laporan (HTML)</a>'
-    st.markdown(href, unsafe_allow_html=True)
+    # ---- Ekspor: file dibuat saat tombol diklik dan di-cache per isi data ----
+    pilihan_ekspor = ["Lokasi terpilih"] + (["Semua lokasi di peta"] if df_kabupaten is not None else [])
+    sumber_ekspor = st.radio("Data yang diekspor", pilihan_ekspor, horizontal=True, key="ekspor_sumber")
+    if sumber_ekspor == "Semua lokasi di peta":
+        df_ekspor_sumber, nama_ekspor, nama_html = df_kabupaten, "data_cuaca_kabupaten", "laporan_cuaca_kabupaten"
+    else:
+        df_ekspor_sumber, nama_ekspor, nama_html = df_harian, "data_cuaca_harian", "laporan_cuaca_harian"
+    tgl_min, tgl_maks = df_ekspor_sumber["Tanggal"].min().date(), df_ekspor_sumber["Tanggal"].max().date()
+    rentang_ekspor = st.date_input(
+        "Rentang Tanggal Ekspor", value=(tgl_min, tgl_maks), min_value=tgl_min, max_value=tgl_maks, key="ekspor_rentang"
+    )
+    df_ekspor = saring_tanggal(df_ekspor_sumber, *rentang_ekspor) if len(rentang_ekspor) == 2 else df_ekspor_sumber
+    per_lokasi = sumber_ekspor == "Semua lokasi di peta" and st.checkbox("Excel: satu sheet per lokasi", key="ekspor_per_lokasi")
+
+    cache_ekspor = get_cache_ekspor()
+    sidik_ekspor = sidik_df(df_ekspor, nama_ekspor, per_lokasi)
+    kolom_unduh = st.columns(5)
+    for kolom_unduh_i, (label, fmt, nama_file) in zip(kolom_unduh, [
+        ("Download CSV", "csv", f"{nama_ekspor}.csv"),
+        ("Download Excel", "xlsx", f"{nama_ekspor}.xlsx"),
+        ("📥 Download Laporan (HTML)", "html", f"{nama_html}.html"),
+        ("Download Parquet", "parquet", f"{nama_ekspor}.parquet"),
+        ("Download Semua (ZIP)", "zip", f"{nama_ekspor}.zip"),
+    ]):
+        kolom_unduh_i.download_button(
+            label, data=cache_ekspor.pembuat(df_ekspor, fmt, nama_ekspor, per_lokasi, sidik=sidik_ekspor),
+            file_name=nama_file, mime=FORMAT_EKSPOR[fmt][0], on_click="ignore", key=f"unduh_{fmt}",
+        )
 
 # ------------------ DATAFRAME PER JAM ------------------
-df_jam = pd.DataFrame({
-    "Waktu": pd.to_datetime(data["hourly"]["time"]),
-    "Curah Hujan (mm)": data["hourly"]["precipitation"],
-    "Suhu (°C)": data["hourly"]["temperature_2m"],
-    "Kelembapan (%)": data["hourly"]["relative_humidity_2m"]
-})
+df_jam = buat_df_jam(data)
 
 # ------------------ TAMPILKAN GRAFIK ------------------
-with st.expander("Grafik Harian"):
-    st.plotly_chart(px.bar(df_harian, x="Tanggal", y="Curah Hujan (mm)", title="Curah Hujan Harian"), use_container_width=True)
-    st.plotly_chart(px.line(df_harian, x="Tanggal", y="Suhu Maks (°C)", title="Suhu Maksimum Harian"), use_container_width=True)
-    st.plotly_chart(px.line(df_harian, x="Tanggal", y="Suhu Min (°C)", title="Suhu Minimum Harian"), use_container_width=True)
-    st.plotly_chart(px.line(df_harian, x="Tanggal", y="Kelembapan (%)", title="Kelembapan Harian"), use_container_width=True)
-
-# ------------------ GRAFIK JAM KE DEPAN ------------------
-df_jam_prediksi = df_jam[df_jam["Waktu"] > dt.now()].head(48)
-with st.expander("Grafik Per Jam (48 Jam Ke Depan)"):
-    if df_jam_prediksi.empty:
-        st.warning("Tidak ada data prediksi ke depan tersedia saat ini.")
-    else:
-        st.plotly_chart(px.line(df_jam_prediksi, x="Waktu", y="Curah Hujan (mm)", title="Prediksi Curah Hujan per Jam (48 Jam Ke Depan)"), use_container_width=True)
-        st.plotly_chart(px.line(df_jam_prediksi, x="Waktu", y="Suhu (°C)", title="Prediksi Suhu per Jam (48 Jam Ke Depan)"), use_container_width=True)
-        st.plotly_chart(px.line(df_jam_prediksi, x="Waktu", y="Kelembapan (%)", title="Prediksi Kelembapan per Jam (48 Jam Ke Depan)"), use_container_width=True)
+# Satu figure subplot per grafik, dibangun sekali per isi data (versi prakiraan) dan dipakai
+# bersama semua sesi; deret panjang dirampingkan LTTB sebelum dikirim ke browser
+@st.cache_resource
+def get_cache_grafik():
+    cache = CacheGrafik()
+    get_instrumen().daftar_cache("grafik", cache.stats, miss=("bangun",))
+    return cache
+
+RENTANG_JAM = {"48 Jam": 48, "7 Hari": 24 * 7, "Semua": None}
+RENTANG_ARSIP = {"30 Hari": 30, "1 Tahun": 365, "Semua": None}
+
+@st.fragment
+@instrumen.catat("grafik")
+def bagian_grafik(df_harian, df_jam, df_kabupaten):
+    cache_grafik = get_cache_grafik()
+    with st.expander("Grafik Harian"):
+        pilihan_grafik = ["Lokasi terpilih"] + (["Semua lokasi di peta"] if df_kabupaten is not None else [])
+        sumber_grafik = st.radio("Tampilkan", pilihan_grafik, horizontal=True, key="grafik_sumber")
+        df_grafik = df_kabupaten if sumber_grafik == "Semua lokasi di peta" else df_harian
+        kolom_lokasi = "Lokasi" if sumber_grafik == "Semua lokasi di peta" else None
+        fig_harian = cache_grafik.ambil(
+            ("harian", sidik_df(df_grafik), kolom_lokasi),
+            lambda: buat_grafik(df_grafik, "Tanggal", PANEL_HARIAN, kolom_lokasi=kolom_lokasi),
+        )
+        st.plotly_chart(fig_harian, use_container_width=True)
+
+    with st.expander("Grafik Per Jam (Prakiraan ke Depan)"):
+        rentang_jam = st.radio("Rentang", list(RENTANG_JAM), horizontal=True, key="grafik_jam_rentang")
+        df_jam_prediksi = df_jam[df_jam["Waktu"] > dt.now()]
+        if RENTANG_JAM[rentang_jam]:
+            df_jam_prediksi = df_jam_prediksi.head(RENTANG_JAM[rentang_jam])
+        if df_jam_prediksi.empty:
+            st.warning("Tidak ada data prediksi ke depan tersedia saat ini.")
+        else:
+            fig_jam = cache_grafik.ambil(
+                ("jam", sidik_df(df_jam_prediksi)),
+                lambda: buat_grafik(
+                    df_jam_prediksi, "Waktu", PANEL_JAM, judul=f"Prediksi per Jam ({rentang_jam} ke Depan)"
+                ),
+            )
+            st.plotly_chart(fig_jam, use_container_width=True)
+
+    with st.expander("Riwayat Prakiraan (Arsip)"):
+        kol_rentang, kol_lead = st.columns(2)
+        rentang_arsip = kol_rentang.radio("Rentang", list(RENTANG_ARSIP), horizontal=True, key="arsip_rentang")
+        lead = kol_lead.selectbox(
+            "Prakiraan yang diambil", range(7), key="arsip_lead",
+            format_func=lambda h: "Pada hari yang sama" if h == 0 else f"{h} hari sebelumnya",
+        )
+        hari_arsip = RENTANG_ARSIP[rentang_arsip]
+        mulai_arsip = dt.now() - timedelta(days=hari_arsip) if hari_arsip else None
+        df_arsip = arsip_cuaca.harian(kunci_lokasi(LAT, LON), mulai=mulai_arsip, lead=lead)
+        if df_arsip.empty:
+            st.info("Arsip prakiraan untuk lokasi ini belum ada; riwayat terkumpul setiap prakiraan diperbarui.")
+        else:
+            fig_arsip = cache_grafik.ambil(
+                ("arsip", sidik_df(df_arsip)),
+                lambda: buat_grafik(df_arsip, "Tanggal", PANEL_HARIAN),
+            )
+            st.plotly_chart(fig_arsip, use_container_width=True)
+            st.caption(f"{len(df_arsip)} hari tercatat sejak {df_arsip['Tanggal'].min():%d %b %Y}.")
+
+bagian_grafik(df_harian, df_jam, df_kabupaten)
 
 # ------------------ MODEL PREDIKSI ------------------
-model_df = pd.DataFrame({
-    "Curah Hujan (mm)": [3.2, 1.0, 5.5, 0.0, 6.0],
-    "Suhu (°C)": [30, 32, 29, 31, 33],
-    "Kelembapan (%)": [75, 80, 78, 82, 79],
-    "Hasil Panen (kg/ha)": [5100, 4800, 5300, 4500, 5500]
-})
-model = LinearRegression().fit(
-    model_df.drop("Hasil Panen (kg/ha)", axis=1), model_df["Hasil Panen (kg/ha)"]
-)
+# Model dilatih sekali dari data/riwayat_panen.csv lalu dipakai ulang oleh semua sesi
+@st.cache_resource
+def get_model_panen():
+    return muat_model()
+
+model, versi_model = get_model_panen()
+KOLOM_CUACA_MODEL = ["Curah Hujan (mm)", "Suhu Maks (°C)", "Kelembapan (%)"]
+
+# Klimatologi multi-tahun per koordinat, diperbarui bertahap (hanya hari baru yang diunduh)
+@st.cache_data(ttl=3600, show_spinner="Memperbarui klimatologi lokasi...")
+def get_klimatologi(lat, lon):
+    return perbarui_klimatologi(lat, lon, get_klien_cuaca().session)
+
+with instrumen.ukur("klimatologi"):
+    klimatologi = get_klimatologi(LAT, LON)
+if klimatologi is not None:
+    # Fitur tiap musim tanam: prakiraan jangka pendek + klimatologi untuk sisa musim
+    df_musim = fitur_musim_banyak({"Terpilih": klimatologi}, df_harian.assign(Lokasi="Terpilih"))
+else:
+    # Klimatologi belum tersedia: pakai rata-rata prakiraan seperti sebelumnya
+    df_musim = pd.DataFrame({
+        "Musim": ["Panen 1", "Panen 2", "Panen 3"],
+        "Mulai Tanam": [None, None, None],
+        **{k: [df_harian.head(7)[k].mean(), df_harian.tail(7)[k].mean(), df_harian.tail(7)[k].mean()]
+           for k in KOLOM_CUACA_MODEL},
+    })
+
+# ------------------ DATA HARGA KOMODITAS ------------------
+HARGA_FILE = "data/harga_komoditas.json"
 
-# ------------------ PREDIKSI PANEN ------------------
-with st.expander("Prediksi Panen"):
-    # ---- Prediksi Manual dengan Input Cuaca (Khusus Padi) ----
-    st.subheader("Prediksi Panen Khusus Padi (Dengan Input Cuaca)")
-    ch_manual_padi = st.number_input("Curah Hujan (mm)", value=5.0, key="manual_padi_ch")
-    suhu_manual_padi = st.number_input("Suhu Maks (°C)", value=32.0, key="manual_padi_suhu")
-    hum_manual_padi = st.number_input("Kelembapan (%)", value=78.0, key="manual_padi_hum")
-    luas_manual_padi = st.number_input("Luas Lahan (ha)", value=1.0, key="manual_padi_luas")
-    harga_manual_padi = st.number_input("Harga Padi (Rp/kg)", value=7000, key="manual_padi_harga")
-    biaya_manual_padi = st.number_input("Biaya Produksi per Ha (Rp)", value=5000000, key="manual_padi_biaya")
-
-    pred_manual_padi = model.predict([[ch_manual_padi, suhu_manual_padi, hum_manual_padi]])[0]
-    total_manual_padi = pred_manual_padi * luas_manual_padi
-    pendapatan_manual_padi = total_manual_padi * harga_manual_padi
-    laba_bersih_manual_padi = pendapatan_manual_padi - (biaya_manual_padi * luas_manual_padi)
-
-    st.markdown(f"""
-    - **Prediksi Hasil Panen Padi (Manual):** {pred_manual_padi:,.0f} kg/ha  
-    - **Total Panen:** {total_manual_padi:,.0f} kg  
-    - **Pendapatan Kotor:** Rp {pendapatan_manual_padi:,.0f}  
-    - **Laba Bersih:** Rp {laba_bersih_manual_padi:,.0f}
-    """)
-
-    # ---- Prediksi Manual tanpa Input Cuaca (Untuk Semua Komoditas) ----
-    st.subheader("Prediksi Panen Otomatis Komoditas Pertanian Di Kabupaten Sidrap")
-    komoditas_list = ["Padi", "Jagung", "Kopi", "Kakao", "Kelapa", "Porang"]
-    komoditas_manual = st.selectbox("Pilih Komoditas", komoditas_list, key="manual2_komoditas")
-    pred_yield_default = {
-        "Padi": 5000,
-        "Jagung": 6000,
-        "Kopi": 1200,
-        "Kakao": 1500,
-        "Kelapa": 2000,
-        "Porang": 10000
-    }
-    hasil_per_ha = pred_yield_default.get(komoditas_manual, 5000)
-    luas_lahan = st.number_input("Luas Lahan (ha)", value=1.0, key="manual2_luas")
-    harga = st.number_input(f"Harga {komoditas_manual} (Rp/kg)", value=7000, key="manual2_harga")
-    biaya = st.number_input("Biaya Produksi per Ha (Rp)", value=5000000, key="manual2_biaya")
-
-    total_hasil = hasil_per_ha * luas_lahan
-    pendapatan = total_hasil * harga
-    laba = pendapatan - (biaya * luas_lahan)
-
-    st.markdown(f"""
-    - **Prediksi Hasil Panen {komoditas_manual}:** {hasil_per_ha:,.0f} kg/ha  
-    - **Total Panen:** {total_hasil:,.0f} kg  
-    - **Pendapatan Kotor:** Rp {pendapatan:,.0f}  
-    - **Laba Bersih:** Rp {laba:,.0f}
-    """)
-
-    # ---- Prediksi Otomatis Berdasarkan Cuaca Harian (Khusus Padi) ----
-    st.subheader("Prediksi Panen Otomatis Khusus Padi")
-    luas_auto = st.number_input("Luas Sawah (ha) (otomatis)", value=1.0, key="auto_luas")
-    harga_auto = st.number_input("Harga Padi (Rp/kg) (otomatis)", value=7000, key="auto_harga")
-    biaya_auto = st.number_input("Biaya Produksi per Ha (Rp) (otomatis)", value=5000000, key="auto_biaya")
-
-    if not df_harian.empty:
-        input_auto = df_harian[["Curah Hujan (mm)", "Suhu Maks (°C)", "Kelembapan (%)"]].mean().values.reshape(1, -1)
-        pred_auto = model.predict(input_auto)[0]
-    else:
-        pred_auto = 0
-
-    total_auto = pred_auto * luas_auto
-    pendapatan_auto = total_auto * harga_auto
-    laba_bersih_auto = pendapatan_auto - (biaya_auto * luas_auto)
-
-    st.markdown(f"""
-    - **Prediksi Hasil Panen Padi (Otomatis):** {pred_auto:,.0f} kg/ha  
-    - **Total Panen:** {total_auto:,.0f} kg  
-    - **Pendapatan Kotor:** Rp {pendapatan_auto:,.0f}  
-    - **Laba Bersih:** Rp {laba_bersih_auto:,.0f}
-    """)
-
-    # ---- Prediksi 3 Kali Panen Tahunan (Khusus Padi) ----
-    st.markdown("Proyeksi Panen Tahunan Padi (3 Kali Panen)")
-    df_panen1 = df_harian.head(7)
-    input_panen1 = df_panen1[["Curah Hujan (mm)", "Suhu Maks (°C)", "Kelembapan (%)"]].mean().values.reshape(1, -1)
-    pred1 = model.predict(input_panen1)[0]
-
-    df_panen2 = df_harian[60:67] if len(df_harian) >= 67 else df_harian.tail(7)
-    input_panen2 = df_panen2[["Curah Hujan (mm)", "Suhu Maks (°C)", "Kelembapan (%)"]].mean().values.reshape(1, -1)
-    pred2 = model.predict(input_panen2)[0]
-
-    df_panen3 = df_harian[120:127] if len(df_harian) >= 127 else df_harian.tail(7)
-    input_panen3 = df_panen3[["Curah Hujan (mm)", "Suhu Maks (°C)", "Kelembapan (%)"]].mean().values.reshape(1, -1)
-    pred3 = model.predict(input_panen3)[0]
-
-    luas_ha = st.number_input("Luas Lahan (ha) (Tahunan)", value=1.0, key="luas_tahunan")
-    harga_rp = st.number_input("Harga Padi (Rp/kg) (Tahunan)", value=7000, key="harga_tahunan")
-    biaya_tahunan = st.number_input("Biaya Produksi per Ha (Rp) (Tahunan)", value=5000000, key="biaya_tahunan")
-
-    total1 = pred1 * luas_ha
-    total2 = pred2 * luas_ha
-    total3 = pred3 * luas_ha
-    hasil_total = total1 + total2 + total3
-    pendapatan_total = hasil_total * harga_rp
-    biaya_total = biaya_tahunan * luas_ha * 3
-    laba_bersih_total = pendapatan_total - biaya_total
-
-    st.write("#### Panen 1")
-    st.write(f"- Prediksi Hasil: {pred1:,.0f} kg/ha | Total: {total1:,.0f} kg | Rp {total1 * harga_rp:,.0f}")
-
-    st.write("#### Panen 2")
-    st.write(f"- Prediksi Hasil: {pred2:,.0f} kg/ha | Total: {total2:,.0f} kg | Rp {total2 * harga_rp:,.0f}")
-
-    st.write("#### Panen 3")
-    st.write(f"- Prediksi Hasil: {pred3:,.0f} kg/ha | Total: {total3:,.0f} kg | Rp {total3 * harga_rp:,.0f}")
-
-    st.success(f"🟩 Total Panen Tahunan: {hasil_total:,.0f} kg | Rp {pendapatan_total:,.0f}")
-    st.success(f"🟨 Laba Bersih Tahunan: Rp {laba_bersih_total:,.0f}")
-
-faq_pairs = [
-    # Padi
-    ("mengapa padi saya kuning", "Padi kuning biasanya karena kekurangan nitrogen, kurang air, atau serangan hama."),
-    ("cara mengatasi padi kuning", "Berikan pupuk nitrogen, perbaiki irigasi, dan cek hama."),
-    ("mengapa padi layu", "Layu dapat disebabkan kekurangan air, penyakit layu bakteri, atau akar rusak."),
-    ("hama wereng pada padi", "Wereng menghisap getah tanaman dan bisa merusak padi."),
-    ("pengendalian hama wereng", "Gunakan insektisida yang tepat dan varietas tahan hama."),
-    ("penyakit bercak daun pada padi", "Biasanya disebabkan jamur, gunakan fungisida."),
-    ("penyebab padi kerontang", "Kerontang terjadi akibat kurangnya penyerbukan atau kekurangan hara."),
-    ("waktu tanam padi terbaik", "Musim hujan biasanya waktu terbaik untuk tanam padi."),
-    ("apa itu padi organik", "Padi yang dibudidayakan tanpa bahan kimia sintetis."),
-    ("cara meningkatkan hasil panen padi", "Gunakan benih unggul, pupuk tepat, dan pengendalian hama baik."),
-
-    # Jagung
-    ("cara menanam jagung", "Pilih lahan bersih, tanam benih unggul, berikan pupuk dan air cukup."),
-    ("penyakit hawar daun jagung", "Penyakit jamur yang menyebabkan daun mengering, kendalikan dengan fungisida."),
-    ("hama ulat pada jagung", "Ulat memakan daun jagung, kendalikan dengan insektisida atau musuh alami."),
-    ("waktu panen jagung", "Panen ketika biji sudah keras dan kering."),
-
-    # Kedelai
-    ("cara budidaya kedelai", "Tanam di lahan gembur, berikan pupuk dan air cukup."),
-    ("penyakit karat pada kedelai", "Penyakit jamur menyebabkan bercak oranye pada daun."),
-    ("hama penggerek batang kedelai", "Serangga yang merusak batang, kendalikan dengan insektisida."),
-
-    # Irigasi & Curah Hujan
-    ("apa itu irigasi", "Pengairan lahan untuk memenuhi kebutuhan air tanaman."),
-    ("jenis irigasi", "Irigasi tetes, sprinkler, banjir, dan lainnya."),
-    ("curah hujan yang ideal untuk padi", "Sekitar 1000-2000 mm/tahun, tergantung varietas."),
-    ("cara mengukur curah hujan", "Gunakan alat penakar hujan."),
-    ("irigasi tetes", "Memberikan air langsung ke akar dengan jumlah kecil."),
-
-    # Pupuk & Tanah
-    ("jenis pupuk untuk padi", "Urea, SP-36, KCl adalah pupuk utama."),
-    ("pupuk organik", "Pupuk alami seperti kompos dan pupuk kandang."),
-    ("kapan waktu memupuk padi", "Saat umur 20-30 hari dan menjelang berbunga."),
-    ("fungsi pupuk N", "Meningkatkan pertumbuhan daun dan batang."),
-    ("fungsi pupuk P", "Meningkatkan perkembangan akar dan pembungaan."),
-    ("fungsi pupuk K", "Meningkatkan ketahanan tanaman terhadap penyakit."),
-
-    # Hama & Penyakit Umum
-    ("jenis hama padi", "Wereng, penggerek batang, kutu daun, tikus."),
-    ("cara mengendalikan hama tikus", "Perangkap dan rodentisida aman."),
-    ("penyakit blas pada padi", "Penyakit jamur yang menyebabkan bercak hitam pada daun."),
-    ("penyakit hawar daun", "Penyakit jamur yang membuat daun mengering dan mati."),
-    ("cara mengatasi penyakit tanaman", "Gunakan fungisida dan sanitasi lahan."),
-
-    # Lingkungan & Pengelolaan Lahan
-    ("apa itu pertanian berkelanjutan", "Pertanian yang menjaga keseimbangan lingkungan."),
-    ("cara mencegah erosi tanah", "Terasering, mulsa, dan penanaman pohon pelindung."),
-    ("apa itu agroforestri", "Sistem campuran pohon dan tanaman pertanian."),
-    ("cara menjaga kualitas air irigasi", "Hindari pencemaran dan lakukan filtrasi."),
-    ("cara mengatasi kekeringan lahan", "Mulsa, irigasi efisien, dan tanaman tahan kekeringan."),
-
-    # Teknik Budidaya & Praktik Terbaik
-    ("cara rotasi tanaman", "Ganti tanaman setiap musim untuk mencegah hama dan menjaga tanah."),
-    ("manfaat mulsa", "Menjaga kelembaban tanah dan mencegah gulma."),
-    ("cara penyiangan gulma", "Manual atau penggunaan herbisida selektif."),
-    ("apa itu penanaman serentak", "Menanam pada waktu yang sama untuk mengendalikan hama."),
-
-    # Cuaca & Prediksi Panen
-    ("pengaruh suhu terhadap tanaman", "Suhu mempengaruhi fotosintesis dan metabolisme."),
-    ("cara memprediksi hasil panen", "Data cuaca, tanah, dan pengelolaan tanaman."),
-    ("apa itu kelembapan tanah", "Jumlah air yang tersedia di tanah."),
-    ("cara mengukur kelembapan tanah", "Sensor kelembapan atau metode gravimetri."),
-    ("pengaruh curah hujan terhadap panen", "Curah hujan cukup penting untuk pertumbuhan."),
-
-    # Variasi typo dan singkatan umum
-    ("padi kuning", "Padi kuning biasanya karena kekurangan hara."),
-    ("padi layu", "Padi layu bisa karena kekurangan air atau penyakit."),
-    ("irigasi", "Irigasi adalah pengairan lahan."),
-    ("curah hujan", "Jumlah air hujan di suatu tempat."),
-    ("hama padi", "Hama umum padi termasuk wereng dan tikus."),
-    ("pupuk padi", "Pupuk utama padi adalah Urea, SP-36, dan KCl."),
-    ("kualitas air", "Air harus bersih untuk irigasi."),
-    ("penyakit tanaman", "Gunakan fungisida untuk mengatasi penyakit."),
-    ("kelembapan tanah", "Kelembapan tanah penting bagi tanaman."),
-    ("pengaruh suhu", "Suhu mempengaruhi metabolisme tanaman."),
-
-    # Tambahan umum lain
-    ("apa itu penyerbukan", "Proses perpindahan serbuk sari ke kepala putik."),
-    ("cara meningkatkan kesuburan tanah", "Tambahkan pupuk organik dan lakukan rotasi tanaman."),
-    ("apa itu pupuk hayati", "Pupuk yang mengandung mikroorganisme bermanfaat."),
-    ("cara mengatasi kekeringan", "Gunakan mulsa dan irigasi yang tepat."),
-    ("apa itu gulma", "Tanaman pengganggu yang bersaing dengan tanaman utama."),
-    ("cara pengendalian gulma", "Penyiangan manual atau herbisida."),
-    ("apa itu erosi", "Hilangnya lapisan tanah atas oleh air atau angin."),
-    ("cara menjaga kelembaban tanah", "Penggunaan mulsa dan irigasi teratur."),
-    ("apa itu rehabilitasi lahan", "Pemulihan lahan yang rusak agar dapat produktif kembali."),
-    ("cara memanfaatkan limbah pertanian", "Dijadikan kompos atau bahan bakar biomassa."),
-    # Padi lanjut
-    ("penyebab daun padi berlubang", "Biasanya karena serangan hama penggerek daun atau ulat."),
-    ("cara mengatasi daun padi berlubang", "Semprot insektisida dan gunakan varietas tahan hama."),
-    ("padi gagal panen", "Bisa karena kekeringan, serangan hama parah, atau penyakit berat."),
-    ("penyakit hawar daun", "Penyakit jamur yang menyebabkan daun mengering dan gugur."),
-    ("pengendalian penyakit hawar daun", "Gunakan fungisida dan rotasi tanaman."),
-    ("kapan pemupukan padi", "Umumnya pada fase vegetatif dan generatif."),
-    ("pupuk susulan padi", "Diberikan saat tanaman mulai berbunga agar hasil optimal."),
-    ("penyebab padi keriting", "Kekurangan unsur hara atau serangan hama."),
-    ("cara mengatasi padi keriting", "Berikan pupuk daun dan kendalikan hama."),
-    ("penyebab padi busuk", "Serangan jamur seperti padi bercak dan jamur batang."),
-    ("apa itu padi organik", "Padi yang dibudidayakan tanpa pestisida dan pupuk kimia."),
-    ("cara tanam padi organik", "Gunakan pupuk organik, pestisida alami, dan pengelolaan tanah baik."),
-    ("berat panen padi per hektar", "Rata-rata 5-7 ton gabah kering tergantung varietas dan pengelolaan."),
-
-    # Jagung lanjut
-    ("hama wereng jagung", "Wereng jagung menyerang daun dan batang, menyebabkan layu."),
-    ("penyakit busuk batang jagung", "Biasanya disebabkan jamur, kendalikan dengan fungisida."),
-    ("pupuk terbaik untuk jagung", "Pupuk NPK dan Urea, sesuai kebutuhan tanah."),
-    ("kapan panen jagung", "Setelah 90-110 hari setelah tanam tergantung varietas."),
-    ("penyebab jagung gagal panen", "Serangan hama, kekurangan air, atau cuaca ekstrem."),
-
-    # Kedelai lanjut
-    ("penyebab daun kedelai keriting", "Infeksi virus atau serangan hama."),
-    ("cara mengatasi virus pada kedelai", "Gunakan benih sehat dan kendalikan vektor serangga."),
-    ("hama kutu daun kedelai", "Kutu daun menyebabkan daun menguning dan rontok."),
-    ("waktu tanam kedelai", "Pada musim kemarau awal dengan pengairan memadai."),
-
-    # Irigasi dan pengairan lanjut
-    ("apa itu irigasi tetes", "Metode pengairan yang mengalirkan air langsung ke akar."),
-    ("keuntungan irigasi tetes", "Hemat air dan mencegah pemborosan."),
-    ("irigasi banjir", "Pengairan lahan dengan cara membanjiri seluruh area."),
-    ("kapan irigasi dilakukan", "Saat curah hujan kurang dari kebutuhan tanaman."),
-    ("cara cek kelembaban tanah", "Gunakan sensor kelembaban atau metode manual seperti cocol tanah."),
-    ("irigasi otomatis", "Pengairan yang dikontrol dengan sistem elektronik sesuai kebutuhan tanaman."),
-    ("penyebab irigasi tidak merata", "Saluran tersumbat atau desain sistem yang buruk."),
-    ("cara memperbaiki saluran irigasi", "Bersihkan dan perbaiki kerusakan fisik saluran."),
-
-    # Curah hujan dan cuaca lanjut
-    ("apa itu kelembapan relatif", "Persentase kadar uap air di udara dibandingkan kapasitas maksimum."),
-    ("pengaruh curah hujan rendah", "Tanaman bisa stres kekurangan air dan pertumbuhan terganggu."),
-    ("curah hujan tinggi berdampak apa", "Bisa menyebabkan genangan dan penyakit jamur."),
-    ("alat ukur suhu", "Termometer."),
-    ("alat ukur kelembapan", "Higrometer atau sensor kelembapan."),
-
-    # Pupuk dan tanah lanjut
-    ("fungsi pupuk organik", "Meningkatkan kesuburan dan struktur tanah."),
-    ("pupuk kimia yang umum", "Urea, SP-36, KCl, NPK."),
-    ("apa itu pupuk dasar", "Pupuk yang diberikan sebelum tanam."),
-    ("apa itu pupuk susulan", "Pupuk yang diberikan setelah tanaman tumbuh."),
-    ("tanda kekurangan nitrogen", "Daun menguning terutama daun tua."),
-    ("tanda kekurangan fosfor", "Tanaman tumbuh lambat dan warna daun gelap."),
-    ("tanda kekurangan kalium", "Daun menguning di tepi dan mudah rusak."),
-    ("pengaruh pH tanah", "pH mempengaruhi ketersediaan hara untuk tanaman."),
-    ("cara memperbaiki pH tanah asam", "Tambahkan kapur atau dolomit."),
-
-    # Hama & penyakit lanjut
-    ("jenis hama tikus", "Tikus sawah, tikus rumah, tikus ladang."),
-    ("cara mengendalikan hama tikus", "Perangkap, rodentisida, dan sanitasi lahan."),
-    ("penyakit blas", "Penyakit jamur yang menyebabkan bercak hitam."),
-    ("penyakit hawar", "Penyakit jamur yang menyebabkan daun layu."),
-    ("penyakit bulai", "Penyakit yang menyebabkan bulir kosong."),
-    ("pengendalian penyakit", "Gunakan fungisida dan varietas tahan."),
-    ("serangga penghisap getah", "Wereng dan kutu daun."),
-    ("serangga penggerek batang", "Penggerek batang merusak jaringan dalam tanaman."),
-
-    # Lingkungan & pengelolaan lahan lanjut
-    ("apa itu konservasi tanah", "Upaya mencegah erosi dan degradasi tanah."),
-    ("cara konservasi tanah", "Terasering, mulsa, penanaman pohon."),
-    ("apa itu agroekologi", "Sistem pertanian yang ramah lingkungan."),
-    ("pengelolaan limbah pertanian", "Dijadikan kompos atau biogas."),
-    ("pengaruh polusi air irigasi", "Merusak tanaman dan mengurangi hasil panen."),
-
-    # Teknik budidaya & praktik terbaik lanjut
-    ("apa itu tanam tumpangsari", "Menanam dua jenis tanaman secara bersamaan."),
-    ("manfaat tanam tumpangsari", "Mengoptimalkan lahan dan mengendalikan hama."),
-    ("apa itu sistem tanam jajar legowo", "Baris tanaman dibuat lebih renggang untuk sirkulasi udara."),
-    ("manfaat sistem legowo", "Meningkatkan hasil dan mengurangi penyakit."),
-    ("apa itu pemangkasan", "Mengurangi bagian tanaman untuk memperbaiki pertumbuhan."),
-
-    # Cuaca & prediksi lanjut
-    ("apa itu indeks panas tanaman", "Pengukuran stres panas pada tanaman."),
-    ("cara memprediksi hasil panen", "Menggunakan data cuaca, tanah, dan pemodelan statistik."),
-    ("pengaruh angin kencang", "Merusak tanaman dan mempercepat penguapan air."),
-    ("pengaruh kelembapan tinggi", "Meningkatkan risiko penyakit jamur."),
-
-    # Terminologi umum & typo tambahan
-    ("padi kuneng", "Padi kuning biasanya karena kekurangan hara."),
-    ("padi kering", "Bisa disebabkan kekurangan air atau penyakit."),
-    ("penyakit padi", "Penyakit umum padi termasuk blas, hawar, dan bulai."),
-    ("cara tanam jagung", "Pilih lahan bersih, berikan pupuk, dan siram cukup."),
-    ("hama padi wereng", "Wereng adalah hama yang menghisap getah tanaman."),
-    ("pupuk urea", "Pupuk nitrogen untuk pertumbuhan vegetatif."),
-    ("pupuk sp36", "Pupuk fosfor untuk perkembangan akar."),
-    ("kapan panen padi", "Biasanya 3-4 bulan setelah tanam."),
-    ("kapan panen jagung", "Setelah 3-4 bulan sesuai varietas."),
-
-    # Tips dan trik
-    ("tips menanam padi", "Gunakan benih unggul, jaga irigasi dan kendalikan hama."),
-    ("tips irigasi hemat", "Gunakan sistem irigasi tetes atau jadwal irigasi tepat."),
-    ("cara menghindari gulma", "Penyiangan rutin dan mulsa."),
-    ("cara meningkatkan hasil panen", "Pengelolaan tanah baik, pupuk tepat, dan kendali hama."),
-    ("cara mendeteksi penyakit tanaman", "Perhatikan gejala seperti perubahan warna dan tekstur daun."),
-
-    # Tanya umum terkait pertanian
-    ("apa itu pertanian modern", "Pertanian yang menggunakan teknologi dan ilmu pengetahuan terkini."),
-    ("apa itu smart farming", "Pertanian dengan otomatisasi dan sensor canggih."),
-    ("apa itu drone pertanian", "Drone yang digunakan untuk pemantauan dan penyemprotan."),
-    ("apa itu hidroponik", "Budidaya tanaman tanpa tanah menggunakan larutan nutrisi."),
-    ("apa itu aquaponik", "Sistem gabungan budidaya ikan dan tanaman."),
-
-    # Pertanyaan seputar lingkungan
-    ("bagaimana menjaga lingkungan pertanian", "Kurangi penggunaan pestisida, gunakan pupuk organik, dan konservasi air."),
-    ("apa itu deforestasi", "Penggundulan hutan yang berdampak buruk pada ekosistem."),
-    ("bagaimana perubahan iklim mempengaruhi pertanian", "Cuaca ekstrem dan pola hujan yang tidak menentu dapat merusak tanaman."),
-
-    # Pertanyaan soal peralatan
-    ("alat untuk mengukur pH tanah", "pH meter atau kertas lakmus."),
-    ("alat pengukur curah hujan", "Penakar hujan."),
-    ("alat pengukur kelembapan tanah", "Sensor kelembapan atau tensiometer."),
-
-    # Pertanyaan seputar hasil panen dan pasar
-    ("bagaimana menentukan harga gabah", "Bergantung kualitas, pasokan, dan permintaan pasar."),
-    ("apa itu gabah kering", "Gabah yang sudah dikeringkan untuk penyimpanan."),
-
-    # Tambahan typo dan variasi bahasa gaul
-    ("padi kuneng", "Padi kuning biasanya karena kekurangan hara."),
-    ("padi kering banget", "Mungkin tanaman kurang air atau terkena penyakit."),
-    ("padi rusak", "Periksa hama dan penyakit serta kondisi air."),
-    ("tanem padi gimana", "Gunakan benih bagus, siram teratur, dan pupuk tepat."),
-    ("jagung ga tumbuh", "Cek kualitas benih dan kondisi tanah serta air."),
-    ("pupuk kurang", "Tanaman akan terlihat layu dan kuning."),
-    ("kenapa saya sayang aripa", "Karena aripaku sayang diannnnnnn."),
+# Buat folder jika belum ada
+if not os.path.exists("data"):
+    os.makedirs("data")
+
+# Default komoditas khas Sidrap
+HARGA_DEFAULT = [
+    {"Komoditas": "Padi", "Harga (Rp/kg)": 7000},
+    {"Komoditas": "Jagung", "Harga (Rp/kg)": 5300},
+    {"Komoditas": "Kopi", "Harga (Rp/kg)": 8500},
+    {"Komoditas": "Kakao", "Harga (Rp/kg)": 12000},
+    {"Komoditas": "Kelapa", "Harga (Rp/kg)": 2500},
+    {"Komoditas": "Porang", "Harga (Rp/kg)": 10000}
 ]
+berkas_harga = BerkasJSON(HARGA_FILE, default=HARGA_DEFAULT)
+data_bersama.daftar("harga", berkas_harga)
+
+# Fungsi untuk load & simpan harga (atomik; versi dipakai untuk mendeteksi perubahan bersamaan).
+# Hasil load dipakai bersama semua sesi dan hanya-baca.
+def load_harga_komoditas():
+    return data_bersama.baca("harga")
 
-def cari_jawaban(pertanyaan, faq_list, threshold=70):
-    pertanyaan = pertanyaan.lower()
-    pertanyaan = pertanyaan.strip()
-    # Cari pertanyaan paling mirip
-    hasil = process.extractOne(pertanyaan, [q for q, _ in faq_list], scorer=fuzz.token_set_ratio)
-    if hasil and hasil[1] >= threshold:
-        for q, a in faq_list:
-            if q == hasil[0]:
-                return a
-    return "Maaf, saya belum punya jawaban untuk pertanyaan itu. Silakan tanyakan hal lain."
+def save_harga_komoditas(data, versi=None):
+    versi_baru = berkas_harga.tulis(data, versi)
+    get_riwayat_harga().catat(data)
+    setelah_tulis("harga")
+    return versi_baru
+
+# Setiap penyimpanan juga dicatat sebagai riwayat harga (data/harga.db) untuk grafik tren & prakiraan
+@st.cache_resource
+def get_riwayat_harga():
+    riwayat = RiwayatHarga()
+    if riwayat.kosong():
+        riwayat.catat(load_harga_komoditas())
+    return riwayat
+
+riwayat_harga = get_riwayat_harga()
+
+# ------------------ PREDIKSI PANEN ------------------
+# Fragmen: slider & input di bawah hanya menjalankan ulang bagian ini (lihat bagian.py)
+@st.fragment
+@instrumen.catat("prediksi_panen")
+def bagian_prediksi_panen():
+    with st.expander("Prediksi Panen"):
+        # ---- Prediksi Manual dengan Input Cuaca (Khusus Padi) ----
+        # Harga acuan semua perhitungan di bawah: harga terakhir tersimpan, atau prakiraan tren
+        # pada tanggal panen musim terdekat
+        sumber_harga = st.radio("Harga acuan", ["Harga terbaru", "Prakiraan saat panen"], horizontal=True, key="sumber_harga")
+        harga_acuan = riwayat_harga.terbaru()
+        if sumber_harga == "Prakiraan saat panen":
+            mulai_tanam = df_musim["Mulai Tanam"].dropna()
+            tanggal_panen = (pd.Timestamp(mulai_tanam.min()) if len(mulai_tanam) else pd.Timestamp.now().normalize()) \
+                + pd.Timedelta(days=LAMA_MUSIM)
+            harga_acuan.update(riwayat_harga.prakiraan(list(harga_acuan), tanggal_panen))
+            st.caption(f"Prakiraan harga untuk panen sekitar {tanggal_panen:%d %B %Y} (tren linear 180 hari terakhir)")
+        harga_padi_acuan = int(round(harga_acuan.get("Padi", 7000)))
+
+        st.subheader("Prediksi Panen Khusus Padi (Dengan Input Cuaca)")
+        ch_manual_padi = st.number_input("Curah Hujan (mm)", value=5.0, key="manual_padi_ch")
+        suhu_manual_padi = st.number_input("Suhu Maks (°C)", value=32.0, key="manual_padi_suhu")
+        hum_manual_padi = st.number_input("Kelembapan (%)", value=78.0, key="manual_padi_hum")
+        luas_manual_padi = st.number_input("Luas Lahan (ha)", value=1.0, key="manual_padi_luas")
+        harga_manual_padi = st.number_input("Harga Padi (Rp/kg)", value=harga_padi_acuan, key=f"manual_padi_harga_{harga_padi_acuan}")
+        biaya_manual_padi = st.number_input("Biaya Produksi per Ha (Rp)", value=5000000, key="manual_padi_biaya")
+
+        # Semua jalur prediksi (manual, otomatis, 3 panen tahunan) dihitung dalam satu panggilan
+        pred_manual_padi, pred_auto, pred1, pred2, pred3 = prediksi(model, np.vstack([
+            [ch_manual_padi, suhu_manual_padi, hum_manual_padi],
+            df_harian[KOLOM_CUACA_MODEL].mean().values,
+            df_musim[KOLOM_CUACA_MODEL].to_numpy(),
+        ]))
+        total_manual_padi = pred_manual_padi * luas_manual_padi
+        pendapatan_manual_padi = total_manual_padi * harga_manual_padi
+        laba_bersih_manual_padi = pendapatan_manual_padi - (biaya_manual_padi * luas_manual_padi)
+
+        st.markdown(f"""
+        - **Prediksi Hasil Panen Padi (Manual):** {pred_manual_padi:,.0f} kg/ha  
+        - **Total Panen:** {total_manual_padi:,.0f} kg  
+        - **Pendapatan Kotor:** Rp {pendapatan_manual_padi:,.0f}  
+        - **Laba Bersih:** Rp {laba_bersih_manual_padi:,.0f}
+        """)
+
+        # ---- Prediksi Manual tanpa Input Cuaca (Untuk Semua Komoditas) ----
+        st.subheader("Prediksi Panen Otomatis Komoditas Pertanian Di Kabupaten Sidrap")
+        komoditas_list = ["Padi", "Jagung", "Kopi", "Kakao", "Kelapa", "Porang"]
+        komoditas_manual = st.selectbox("Pilih Komoditas", komoditas_list, key="manual2_komoditas")
+        pred_yield_default = {
+            "Padi": 5000,
+            "Jagung": 6000,
+            "Kopi": 1200,
+            "Kakao": 1500,
+            "Kelapa": 2000,
+            "Porang": 10000
+        }
+        hasil_per_ha = pred_yield_default.get(komoditas_manual, 5000)
+        luas_lahan = st.number_input("Luas Lahan (ha)", value=1.0, key="manual2_luas")
+        harga_komoditas_acuan = int(round(harga_acuan.get(komoditas_manual, 7000)))
+        harga = st.number_input(
+            f"Harga {komoditas_manual} (Rp/kg)", value=harga_komoditas_acuan,
+            key=f"manual2_harga_{komoditas_manual}_{harga_komoditas_acuan}",
+        )
+        biaya = st.number_input("Biaya Produksi per Ha (Rp)", value=5000000, key="manual2_biaya")
+
+        total_hasil = hasil_per_ha * luas_lahan
+        pendapatan = total_hasil * harga
+        laba = pendapatan - (biaya * luas_lahan)
+
+        st.markdown(f"""
+        - **Prediksi Hasil Panen {komoditas_manual}:** {hasil_per_ha:,.0f} kg/ha  
+        - **Total Panen:** {total_hasil:,.0f} kg  
+        - **Pendapatan Kotor:** Rp {pendapatan:,.0f}  
+        - **Laba Bersih:** Rp {laba:,.0f}
+        """)
+
+        # ---- Prediksi Otomatis Berdasarkan Cuaca Harian (Khusus Padi) ----
+        st.subheader("Prediksi Panen Otomatis Khusus Padi")
+        luas_auto = st.number_input("Luas Sawah (ha) (otomatis)", value=1.0, key="auto_luas")
+        harga_auto = st.number_input("Harga Padi (Rp/kg) (otomatis)", value=harga_padi_acuan, key=f"auto_harga_{harga_padi_acuan}")
+        biaya_auto = st.number_input("Biaya Produksi per Ha (Rp) (otomatis)", value=5000000, key="auto_biaya")
+
+        total_auto = pred_auto * luas_auto
+        pendapatan_auto = total_auto * harga_auto
+        laba_bersih_auto = pendapatan_auto - (biaya_auto * luas_auto)
+
+        st.markdown(f"""
+        - **Prediksi Hasil Panen Padi (Otomatis):** {pred_auto:,.0f} kg/ha  
+        - **Total Panen:** {total_auto:,.0f} kg  
+        - **Pendapatan Kotor:** Rp {pendapatan_auto:,.0f}  
+        - **Laba Bersih:** Rp {laba_bersih_auto:,.0f}
+        """)
+
+        # ---- Prediksi 3 Kali Panen Tahunan (Khusus Padi) ----
+        st.markdown("Proyeksi Panen Tahunan Padi (3 Kali Panen)")
+        luas_ha = st.number_input("Luas Lahan (ha) (Tahunan)", value=1.0, key="luas_tahunan")
+        harga_rp = st.number_input("Harga Padi (Rp/kg) (Tahunan)", value=harga_padi_acuan, key=f"harga_tahunan_{harga_padi_acuan}")
+        biaya_tahunan = st.number_input("Biaya Produksi per Ha (Rp) (Tahunan)", value=5000000, key="biaya_tahunan")
+
+        total1 = pred1 * luas_ha
+        total2 = pred2 * luas_ha
+        total3 = pred3 * luas_ha
+        hasil_total = total1 + total2 + total3
+        pendapatan_total = hasil_total * harga_rp
+        biaya_total = biaya_tahunan * luas_ha * 3
+        laba_bersih_total = pendapatan_total - biaya_total
+
+        for nama_musim, mulai_tanam, pred_musim, total_musim in zip(
+            df_musim["Musim"], df_musim["Mulai Tanam"], (pred1, pred2, pred3), (total1, total2, total3)
+        ):
+            st.write(f"#### {nama_musim}")
+            if not pd.isna(mulai_tanam):
+                st.caption(f"Tanam {mulai_tanam:%d %B %Y}, rata-rata cuaca musim: prakiraan + klimatologi")
+            st.write(f"- Prediksi Hasil: {pred_musim:,.0f} kg/ha | Total: {total_musim:,.0f} kg | Rp {total_musim * harga_rp:,.0f}")
+
+        st.success(f"🟩 Total Panen Tahunan: {hasil_total:,.0f} kg | Rp {pendapatan_total:,.0f}")
+        st.success(f"🟨 Laba Bersih Tahunan: Rp {laba_bersih_total:,.0f}")
+        st.caption(f"Versi model prediksi: {versi_model}")
+
+        # ---- Simulasi Banyak Skenario Sekaligus ----
+        st.subheader("Simulasi Skenario Laba (Harga × Luas × Biaya × Cuaca)")
+        harga_dasar = harga_acuan
+        komoditas_sim = st.selectbox("Komoditas Simulasi", komoditas_list, key="sim_komoditas")
+        harga_sim = max(int(harga_dasar.get(komoditas_sim, 7000)), 1)
+        rentang_harga = st.slider("Rentang Harga (Rp/kg)", 0, harga_sim * 2, (int(harga_sim * 0.8), int(harga_sim * 1.2)), key="sim_harga")
+        rentang_luas = st.slider("Rentang Luas Lahan (ha)", 0.1, 20.0, (0.5, 2.0), key="sim_luas")
+        rentang_biaya = st.slider("Rentang Biaya Produksi per Ha (Rp)", 0, 20000000, (4000000, 6000000), step=100000, key="sim_biaya")
+        langkah_sim = st.slider("Jumlah Titik per Rentang", 5, 50, 20, key="sim_langkah")
+
+        if komoditas_sim == "Padi":
+            rentang_hujan = st.slider("Rentang Curah Hujan (mm)", 0.0, 30.0, (0.0, 10.0), key="sim_hujan")
+            rentang_suhu = st.slider("Rentang Suhu Maks (°C)", 20.0, 40.0, (29.0, 34.0), key="sim_suhu")
+            rentang_hum = st.slider("Rentang Kelembapan (%)", 40.0, 100.0, (70.0, 90.0), key="sim_hum")
+            hasil_sim = hasil_dari_cuaca(
+                model,
+                np.linspace(*rentang_hujan, langkah_sim),
+                np.linspace(*rentang_suhu, 5),
+                np.linspace(*rentang_hum, 5),
+            )
+        else:
+            hasil_dasar = pred_yield_default.get(komoditas_sim, 5000)
+            hasil_sim = np.linspace(hasil_dasar * 0.8, hasil_dasar * 1.2, langkah_sim)
+
+        harga_arr = np.linspace(*rentang_harga, langkah_sim)
+        luas_arr = np.linspace(*rentang_luas, max(langkah_sim // 4, 2))
+        biaya_arr = np.linspace(*rentang_biaya, langkah_sim)
+        laba_sim = evaluasi_skenario(hasil_sim, harga_arr, luas_arr, biaya_arr)
+        ringkasan_sim = ringkasan_laba(laba_sim)
+
+        total_sim = jumlah_skenario(hasil_sim, harga_arr, luas_arr, biaya_arr)
+        if laba_sim.size < total_sim:
+            st.write(f"{total_sim:,} skenario, diringkas dari sampel {laba_sim.size:,} skenario (sebaran hasil dipertahankan).")
+        else:
+            st.write(f"{laba_sim.size:,} skenario dihitung.")
+        st.dataframe(pd.DataFrame([ringkasan_sim]), use_container_width=True, hide_index=True)
+        st.write(f"- Harga impas median: Rp {np.median(harga_impas(hasil_sim, biaya_arr)):,.0f}/kg")
+
+        fig_laba = px.imshow(
+            peta_laba(laba_sim).T, x=harga_arr, y=biaya_arr, origin="lower", aspect="auto",
+            color_continuous_scale="RdYlGn", color_continuous_midpoint=0,
+            labels={"x": "Harga (Rp/kg)", "y": "Biaya per Ha (Rp)", "color": "Median Laba (Rp)"},
+            title=f"Median Laba {komoditas_sim} per Harga dan Biaya",
+        )
+        st.plotly_chart(fig_laba, use_container_width=True)
+
+        st.markdown("Persentil Laba Semua Komoditas (hasil & harga ±20%)")
+        st.dataframe(
+            ringkasan_komoditas(pred_yield_default, harga_dasar, luas_arr, biaya_arr),
+            use_container_width=True, hide_index=True
+        )
+
+bagian_prediksi_panen()
+
+# Basis pengetahuan FAQ dimuat dari data/faq.json; indeksnya dipakai bersama semua sesi
+# dan dimuat ulang otomatis saat file diubah (tanpa redeploy).
+# Mode pencarian per deployment lewat secrets: FAQ_MODE = "fuzzy" (bawaan) atau "tfidf"
+@st.cache_resource
+def get_sumber_faq():
+    return SumberFAQ(mode=st.secrets.get("FAQ_MODE", "fuzzy"))
+
+def cari_jawaban(pertanyaan, indeks, threshold=None):
+    return indeks.jawab(pertanyaan, threshold)
 
 # -------------------- Streamlit Chatbot Interface -------------------- #
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 
-st.title("Chatbot FAQ Pertanian")
+def kirim_pertanyaan():
+    # Dijalankan sekali per pertanyaan (on_change), lalu kotak input dikosongkan
+    pertanyaan = st.session_state.pertanyaan_chat.strip()
+    if pertanyaan:
+        st.session_state.chat_history.append(("🧑", pertanyaan))
+        st.session_state.chat_history.append(("🤖", cari_jawaban(pertanyaan, get_sumber_faq().indeks())))
+    st.session_state.pertanyaan_chat = ""
+
+@st.fragment
+@instrumen.catat("chatbot")
+def bagian_chatbot():
+    st.title("Chatbot FAQ Pertanian")
+
+    st.text_input(
+        "Tanyakan apa saja tentang pertanian, irigasi, cuaca, hama, dan lingkungan:",
+        key="pertanyaan_chat", on_change=kirim_pertanyaan,
+    )
 
-user_input = st.text_input("Tanyakan apa saja tentang pertanian, irigasi, cuaca, hama, dan lingkungan:")
+    for role, msg in st.session_state.chat_history:
+        st.markdown(f"**{role}**: {msg}")
 
-if user_input:
-    st.session_state.chat_history.append(("🧑", user_input))
-    jawaban = cari_jawaban(user_input, faq_pairs)
-    st.session_state.chat_history.append(("🤖", jawaban))
+bagian_chatbot()
 
-for role, msg in st.session_state.chat_history:
-    if role == "🧑":
-        st.markdown(f"**{role}**: {msg}")
-    else:
-        st.markdown(f"**{role}**: {msg}")
-        
 # ------------------ KALKULATOR PEMUPUKAN ------------------
-with st.expander("Kalkulator Pemupukan"):
-    tanaman = st.selectbox("Pilih Komoditas", ["Padi", "Jagung", "Kedelai", "Kopi", "Kakao", "Kelapa", "Porang"], key="komoditas_pupuk")
-    luas_lahan = st.number_input("Luas Lahan (ha)", value=1.0, min_value=0.01, step=0.1, key="luas_pupuk")
-
-    rekomendasi_pupuk = {
-        "Padi": {
-            "Urea": {"dosis": 250, "fungsi": "Merangsang pertumbuhan daun dan batang"},
-            "SP-36": {"dosis": 100, "fungsi": "Membentuk akar dan anakan, serta meningkatkan hasil malai"},
-            "KCl": {"dosis": 100, "fungsi": "Meningkatkan ketahanan terhadap hama/penyakit dan kualitas gabah"},
-        },
-        "Jagung": {
-            "Urea": {"dosis": 300, "fungsi": "Mendorong pertumbuhan vegetatif (daun dan batang)"},
-            "SP-36": {"dosis": 150, "fungsi": "Meningkatkan perkembangan akar dan pembentukan tongkol"},
-            "KCl": {"dosis": 100, "fungsi": "Meningkatkan pengisian biji dan ketahanan tanaman"},
-        },
-        "Kedelai": {
-            "Urea": {"dosis": 100, "fungsi": "Dosis rendah karena kedelai bisa fiksasi nitrogen sendiri"},
-            "SP-36": {"dosis": 100, "fungsi": "Mendukung pembentukan bunga dan polong"},
-            "KCl": {"dosis": 75, "fungsi": "Meningkatkan kualitas dan daya simpan hasil panen"},
-        },
-        "Kopi": {
-            "NPK": {"dosis": 500, "fungsi": "Meningkatkan pertumbuhan dan produksi buah kopi"}
-        },
-        "Kakao": {
-            "Urea": {"dosis": 150, "fungsi": "Meningkatkan pertumbuhan daun dan buah kakao"},
-            "TSP": {"dosis": 100, "fungsi": "Meningkatkan pembentukan bunga dan buah"},
-            "KCl": {"dosis": 150, "fungsi": "Meningkatkan rasa dan mutu biji kakao"}
-        },
-        "Kelapa": {
-            "NPK": {"dosis": 300, "fungsi": "Memperbaiki pertumbuhan dan produktivitas kelapa"}
-        },
-        "Porang": {
-            "Urea": {"dosis": 200, "fungsi": "Meningkatkan pertumbuhan daun dan umbi porang"},
-            "KCl": {"dosis": 100, "fungsi": "Meningkatkan pembentukan dan bobot umbi"}
+@st.fragment
+@instrumen.catat("pupuk")
+def bagian_pupuk():
+    with st.expander("Kalkulator Pemupukan"):
+        tanaman = st.selectbox("Pilih Komoditas", ["Padi", "Jagung", "Kedelai", "Kopi", "Kakao", "Kelapa", "Porang"], key="komoditas_pupuk")
+        luas_lahan = st.number_input("Luas Lahan (ha)", value=1.0, min_value=0.01, step=0.1, key="luas_pupuk")
+
+        rekomendasi_pupuk = {
+            "Padi": {
+                "Urea": {"dosis": 250, "fungsi": "Merangsang pertumbuhan daun dan batang"},
+                "SP-36": {"dosis": 100, "fungsi": "Membentuk akar dan anakan, serta meningkatkan hasil malai"},
+                "KCl": {"dosis": 100, "fungsi": "Meningkatkan ketahanan terhadap hama/penyakit dan kualitas gabah"},
+            },
+            "Jagung": {
+                "Urea": {"dosis": 300, "fungsi": "Mendorong pertumbuhan vegetatif (daun dan batang)"},
+                "SP-36": {"dosis": 150, "fungsi": "Meningkatkan perkembangan akar dan pembentukan tongkol"},
+                "KCl": {"dosis": 100, "fungsi": "Meningkatkan pengisian biji dan ketahanan tanaman"},
+            },
+            "Kedelai": {
+                "Urea": {"dosis": 100, "fungsi": "Dosis rendah karena kedelai bisa fiksasi nitrogen sendiri"},
+                "SP-36": {"dosis": 100, "fungsi": "Mendukung pembentukan bunga dan polong"},
+                "KCl": {"dosis": 75, "fungsi": "Meningkatkan kualitas dan daya simpan hasil panen"},
+            },
+            "Kopi": {
+                "NPK": {"dosis": 500, "fungsi": "Meningkatkan pertumbuhan dan produksi buah kopi"}
+            },
+            "Kakao": {
+                "Urea": {"dosis": 150, "fungsi": "Meningkatkan pertumbuhan daun dan buah kakao"},
+                "TSP": {"dosis": 100, "fungsi": "Meningkatkan pembentukan bunga dan buah"},
+                "KCl": {"dosis": 150, "fungsi": "Meningkatkan rasa dan mutu biji kakao"}
+            },
+            "Kelapa": {
+                "NPK": {"dosis": 300, "fungsi": "Memperbaiki pertumbuhan dan produktivitas kelapa"}
+            },
+            "Porang": {
+                "Urea": {"dosis": 200, "fungsi": "Meningkatkan pertumbuhan daun dan umbi porang"},
+                "KCl": {"dosis": 100, "fungsi": "Meningkatkan pembentukan dan bobot umbi"}
+            }
         }
-    }
-
-    data_pupuk = []
-    for jenis_pupuk, data in rekomendasi_pupuk.get(tanaman, {}).items():
-        total_dosis = data["dosis"] * luas_lahan
-        data_pupuk.append({
-            "Jenis": jenis_pupuk,
-            "Total (kg)": round(total_dosis, 2),
-            "Fungsi": data["fungsi"]
-        })
-
-    df_pupuk = pd.DataFrame(data_pupuk)
-
-    if not df_pupuk.empty:
-        st.markdown("### Rekomendasi Pemupukan")
-        st.markdown(df_pupuk.to_html(classes='styled-table', index=False), unsafe_allow_html=True)
-    else:
-        st.write("Data pupuk belum tersedia untuk tanaman ini.")
-    
-# ------------------ Harga Komoditas ------------------
 
-HARGA_FILE = "data/harga_komoditas.json"
+        data_pupuk = []
+        for jenis_pupuk, data in rekomendasi_pupuk.get(tanaman, {}).items():
+            total_dosis = data["dosis"] * luas_lahan
+            data_pupuk.append({
+                "Jenis": jenis_pupuk,
+                "Total (kg)": round(total_dosis, 2),
+                "Fungsi": data["fungsi"]
+            })
 
-# Buat folder jika belum ada
-if not os.path.exists("data"):
-    os.makedirs("data")
+        df_pupuk = pd.DataFrame(data_pupuk)
 
-# Fungsi untuk load & simpan harga
-def load_harga_komoditas():
-    if os.path.exists(HARGA_FILE):
-        with open(HARGA_FILE, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                pass
-    # Default komoditas khas Sidrap
-    return [
-        {"Komoditas": "Padi", "Harga (Rp/kg)": 7000},
-        {"Komoditas": "Jagung", "Harga (Rp/kg)": 5300},
-        {"Komoditas": "Kopi", "Harga (Rp/kg)": 8500},
-        {"Komoditas": "Kakao", "Harga (Rp/kg)": 12000},
-        {"Komoditas": "Kelapa", "Harga (Rp/kg)": 2500},
-        {"Komoditas": "Porang", "Harga (Rp/kg)": 10000}
-    ]
-
-def save_harga_komoditas(data):
-    with open(HARGA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-# Load harga ke session_state
-if "harga_komoditas" not in st.session_state:
-    st.session_state.harga_komoditas = load_harga_komoditas()
-
-# UI Harga Komoditas
-with st.expander("Harga Komoditas di Sidrap"):
-    st.markdown("Silakan ubah harga langsung di tabel berikut:")
-
-    # Ambil data
-    df_edit = pd.DataFrame(st.session_state.harga_komoditas)
-
-    # Rename kolom ke bentuk lebih pendek dan mobile-friendly
-    df_edit = df_edit.rename(columns={"Harga (Rp/kg)": "Harga"})
-
-    # Tampilkan tabel editor
-    edited_df = st.data_editor(
-        df_edit,
-        column_config={
-            "Komoditas": st.column_config.TextColumn("Komoditas"),
-            "Harga": st.column_config.NumberColumn("Harga (Rp/kg)", format="Rp. %d"),
-        },
-        hide_index=True,
-        use_container_width=True,
-        num_rows="dynamic",
-        key="editor_harga"
-    )
+        if not df_pupuk.empty:
+            st.markdown("### Rekomendasi Pemupukan")
+            st.markdown(df_pupuk.to_html(classes='styled-table', index=False), unsafe_allow_html=True)
+        else:
+            st.write("Data pupuk belum tersedia untuk tanaman ini.")
+
+bagian_pupuk()
+
+# ------------------ EKSPOR ARSIP (LATAR) ------------------
+# Arsip laporan & harga ditulis bertahap ke disk oleh worker latar; sesi hanya menyimpan id
+# pekerjaan dan memantau progresnya, sehingga UI tetap responsif selama ekspor berjalan
+@st.cache_resource
+def get_antrian_ekspor():
+    return AntrianEkspor()
+
+antrian_ekspor = get_antrian_ekspor()
+
+# File hasil dikirim dari disk per potongan lewat server unduhan jika secrets EKSPOR_URL diisi (URL yang
+# terjangkau browser, di balik reverse proxy ke EKSPOR_HOST:EKSPOR_PORT, bawaan 127.0.0.1:8766). Tanpa itu
+# tombol unduh Streamlit biasa dipakai, yang memuat seluruh file ke memori saat diklik.
+@st.cache_resource
+def get_url_unduhan():
+    url = st.secrets.get("EKSPOR_URL", "").rstrip("/")
+    if not url:
+        return None
+    host = st.secrets.get("EKSPOR_HOST", "127.0.0.1")
+    port = int(st.secrets.get("EKSPOR_PORT", PORT_UNDUH))
+    try:
+        jalankan_server_unduhan(antrian_ekspor.folder, host=host, port=port)
+    except OSError:
+        # Port sudah dipakai: biasanya server unduhan proses Streamlit lain (folder yang sama)
+        return url if server_unduhan_aktif(port, host) else None
+    return url
+
+def tampil_ekspor(id_job):
+    job = antrian_ekspor.status(id_job)
+    if job["status"] == "kedaluwarsa":
+        st.caption("File ekspor sudah kedaluwarsa, silakan ekspor ulang.")
+    elif job["status"] in ("antri", "berjalan"):
+        total = job["total"] or 0
+        st.progress(
+            min(job["selesai"] / total, 1.0) if total else 0.0,
+            text=f"Mengekspor {job['selesai']:,} dari {total:,} baris...",
+        )
+    elif job["status"] == "gagal":
+        st.error(f"Ekspor gagal: {job['galat']}")
+    else:
+        label = f"Download {job['file']} ({job['selesai']:,} baris, {job['ukuran'] / 1024 / 1024:.1f} MB)"
+        url = get_url_unduhan()
+        if url:
+            st.link_button(label, url_unduhan(url, job["path"], job["file"]))
+        else:
+            st.download_button(
+                label, data=lambda: antrian_ekspor.baca(id_job), file_name=job["file"],
+                mime=FORMAT_EKSPOR[job["fmt"]][0], on_click="ignore", key=f"unduh_job_{id_job}",
+            )
 
-    if st.button("Simpan Perubahan Harga"):
-        # Kembalikan nama kolom ke format aslinya untuk penyimpanan
-        edited_df = edited_df.rename(columns={"Harga": "Harga (Rp/kg)"})
-        st.session_state.harga_komoditas = edited_df.to_dict(orient="records")
-        save_harga_komoditas(st.session_state.harga_komoditas)
-        st.success("✅ Harga komoditas berhasil diperbarui.")
+@st.fragment(run_every=1)
+def pantau_ekspor(id_job):
+    # Setelah selesai, satu rerun penuh menghentikan polling dan menampilkan tombol unduh
+    if not antrian_ekspor.berjalan(id_job):
+        st.rerun()
+    tampil_ekspor(id_job)
+
+def panel_ekspor(kunci, mulai_ekspor, total):
+    # mulai_ekspor(fmt) -> id pekerjaan di antrian_ekspor
+    e1, e2 = st.columns([0.6, 0.4])
+    with e1:
+        fmt = st.radio("Format", ["xlsx", "csv"], horizontal=True, key=f"{kunci}_fmt")
+    with e2:
+        if st.button(f"Ekspor {total:,} baris", key=f"{kunci}_mulai", disabled=total == 0):
+            st.session_state[f"{kunci}_job"] = mulai_ekspor(fmt)
+    id_job = st.session_state.get(f"{kunci}_job")
+    if id_job and antrian_ekspor.berjalan(id_job):
+        pantau_ekspor(id_job)
+    elif id_job:
+        tampil_ekspor(id_job)
 
-# ------------------ LAPORAN WARGA ------------------
-# Pastikan folder upload ada
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
+# ------------------ Harga Komoditas ------------------
 
-def load_data(filename):
-    if os.path.exists(filename):
-        with open(filename, "r", encoding="utf-8") as f:
+@st.fragment
+@instrumen.catat("harga")
+def bagian_harga():
+    # Versi harga yang menjadi dasar suntingan; hanya diperbarui selama tabel belum disunting
+    suntingan_harga = st.session_state.get("editor_harga") or {}
+    if "versi_harga" not in st.session_state or not any(
+        suntingan_harga.get(k) for k in ("edited_rows", "added_rows", "deleted_rows")
+    ):
+        st.session_state.versi_harga = data_bersama.versi_sumber("harga")
+
+    # UI Harga Komoditas
+    with st.expander("Harga Komoditas di Sidrap"):
+        st.markdown("Silakan ubah harga langsung di tabel berikut:")
+
+        # Ambil data
+        df_edit = pd.DataFrame(load_harga_komoditas())
+
+        # Rename kolom ke bentuk lebih pendek dan mobile-friendly
+        df_edit = df_edit.rename(columns={"Harga (Rp/kg)": "Harga"})
+
+        # Tampilkan tabel editor
+        edited_df = st.data_editor(
+            df_edit,
+            column_config={
+                "Komoditas": st.column_config.TextColumn("Komoditas"),
+                "Harga": st.column_config.NumberColumn("Harga (Rp/kg)", format="Rp. %d"),
+            },
+            hide_index=True,
+            use_container_width=True,
+            num_rows="dynamic",
+            key="editor_harga"
+        )
+
+        if st.button("Simpan Perubahan Harga"):
+            # Kembalikan nama kolom ke format aslinya untuk penyimpanan
+            edited_df = edited_df.rename(columns={"Harga": "Harga (Rp/kg)"})
+            data_harga = edited_df.to_dict(orient="records")
             try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []
-    return []
-
-def save_data(filename, data):
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-
-if "laporan" not in st.session_state:
-    st.session_state.laporan = load_data(LAPORAN_FILE)
-
-if "laporan_update" not in st.session_state:
-    st.session_state.laporan_update = False
-
-with st.expander("Laporan Warga"):
-    with st.form("form_laporan"):
-        nama = st.text_input("Nama")
-        kontak = st.text_input("Kontak")
-        jenis = st.selectbox("Jenis", ["Masalah Irigasi", "Gangguan Hama", "Kondisi Cuaca", "Lainnya"])
-        lokasi = st.text_input("Lokasi")
-        isi = st.text_area("Deskripsi")
-        gambar = st.file_uploader("Upload Gambar (opsional)", type=["png", "jpg", "jpeg"])
-        kirim = st.form_submit_button("Kirim")
-
-        if kirim:
-            if nama.strip() and kontak.strip() and isi.strip():
-                path_gambar = None
-                if gambar is not None:
-                    # Simpan gambar ke folder upload dengan nama unik
-                    ext = os.path.splitext(gambar.name)[1]
-                    filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}{ext}"
-                    filepath = os.path.join(UPLOAD_DIR, filename)
-                    with open(filepath, "wb") as f:
-                        f.write(gambar.getbuffer())
-                    path_gambar = filepath
-
-                new_laporan = {
-                    "Nama": nama.strip(),
-                    "Kontak": kontak.strip(),
-                    "Jenis": jenis,
-                    "Lokasi": lokasi.strip(),
-                    "Deskripsi": isi.strip(),
-                    "Tanggal": datetime.now(pytz.timezone("Asia/Makassar")).strftime("%d %B %Y %H:%M"),
-                    "Gambar": path_gambar,
-                }
-                st.session_state.laporan.append(new_laporan)
-                save_data(LAPORAN_FILE, st.session_state.laporan)
-                st.session_state.laporan_update = True
-                st.success("Laporan berhasil dikirim.")
+                st.session_state.versi_harga = save_harga_komoditas(data_harga, st.session_state.versi_harga)
+                pesan = ("success", "✅ Harga komoditas berhasil diperbarui.")
+            except KonflikTulis:
+                # Buang suntingan yang berbasis data lama; tabel berikutnya memakai data terbaru
+                del st.session_state["editor_harga"]
+                setelah_tulis("harga")
+                st.session_state.versi_harga = data_bersama.versi_sumber("harga")
+                pesan = ("warning", "⚠️ Harga sudah diubah pengguna lain. Data terbaru dimuat, silakan ulangi perubahan Anda.")
+            # Harga acuan Prediksi Panen ikut berubah
+            jalankan_ulang("harga", "harga", pesan)
+        tampil_pesan("harga")
+
+        # ---- Tren Harga dari Riwayat ----
+        st.markdown("#### Tren Harga")
+        daftar_komoditas_riwayat = riwayat_harga.daftar_komoditas()
+        t1, t2 = st.columns([0.6, 0.4])
+        with t1:
+            komoditas_tren = st.multiselect(
+                "Komoditas", daftar_komoditas_riwayat,
+                default=[k for k in ["Padi"] if k in daftar_komoditas_riwayat], key="tren_komoditas",
+            )
+        with t2:
+            frekuensi_tren = st.radio("Periode", list(FREKUENSI_HARGA), index=1, horizontal=True, key="tren_frekuensi")
+        rentang_tren = st.date_input(
+            "Rentang Tanggal", value=(datetime.now().date() - timedelta(days=365), datetime.now().date()), key="tren_rentang"
+        )
+        if komoditas_tren and len(rentang_tren) == 2:
+            df_tren = riwayat_harga.ringkas(komoditas_tren, frekuensi_tren, *rentang_tren)
+            if df_tren.empty:
+                st.info("Belum ada riwayat harga pada rentang ini.")
             else:
-                st.warning("Lengkapi semua isian sebelum mengirim laporan.")
-
-    # Tampilkan laporan warga
-    for i, lap in enumerate(st.session_state.laporan):
-        col1, col2 = st.columns([0.8, 0.2])
-        with col1:
-            st.markdown(
-                f"**{lap['Tanggal']}**  \n"
-                f"*{lap['Jenis']}* oleh **{lap['Nama']}**  \n"
-                f"{lap['Lokasi']}  \n"
-                f"{lap['Deskripsi']}"
+                st.plotly_chart(
+                    px.line(df_tren, x="Waktu", y="Harga", color="Komoditas", markers=True,
+                            title=f"Rata-rata Harga {frekuensi_tren} (Rp/kg)"),
+                    use_container_width=True,
+                )
+                if df_tren["Volatilitas (%)"].notna().any():
+                    st.plotly_chart(
+                        px.line(df_tren.dropna(subset=["Volatilitas (%)"]), x="Waktu", y="Volatilitas (%)",
+                                color="Komoditas", title="Volatilitas Harga Bergulir (std perubahan %, 4 periode)"),
+                        use_container_width=True,
+                    )
+
+        # ---- Ekspor arsip harga (observasi mentah) ----
+        st.markdown("#### Ekspor Arsip Harga")
+        komoditas_ekspor = komoditas_tren or daftar_komoditas_riwayat
+        rentang_arsip = rentang_tren if len(rentang_tren) == 2 else (None, None)
+        st.caption(
+            f"Komoditas: {', '.join(komoditas_ekspor) or '-'}; rentang mengikuti Tren Harga di atas."
+        )
+        total_arsip = riwayat_harga.hitung(komoditas_ekspor, *rentang_arsip) if komoditas_ekspor else 0
+        panel_ekspor(
+            "ekspor_harga",
+            lambda fmt: antrian_ekspor.mulai(
+                "arsip_harga", fmt, ["Komoditas", "Waktu", "Harga (Rp/kg)"],
+                partial(riwayat_harga.iter_potongan, komoditas_ekspor, *rentang_arsip, ukuran=UKURAN_POTONGAN),
+                total=total_arsip, **({"kolom_waktu": (1,)} if fmt == "xlsx" else {}),
+            ),
+            total_arsip,
+        )
+
+bagian_harga()
+
+# ------------------ LAPORAN WARGA ------------------
+# Foto disimpan per hash isi di folder upload; thumbnail dibuat di latar dan di-cache per proses
+@st.cache_resource
+def get_penyimpan_gambar():
+    return PenyimpanGambar(UPLOAD_DIR)
+
+penyimpan_gambar = get_penyimpan_gambar()
+
+UKURAN_HALAMAN = [10, 20, 50]
+KOLOM_EKSPOR_LAPORAN = ["waktu", "jenis", "nama", "kontak", "lokasi", "deskripsi", "lat", "lon", "sumber_lokasi", "gambar"]
+
+def foto_ekspor(path):
+    # Thumbnail WebP diperkecil ke PNG karena xlsxwriter tidak bisa menyisipkan WebP
+    thumb = penyimpan_gambar.thumbnail(path)
+    return gambar_kecil(thumb) if thumb else None
+
+@st.fragment
+@instrumen.catat("laporan")
+def bagian_laporan():
+    with st.expander("Laporan Warga"):
+        with st.form("form_laporan"):
+            nama = st.text_input("Nama")
+            kontak = st.text_input("Kontak")
+            jenis = st.selectbox("Jenis", JENIS_LAPORAN)
+            lokasi = st.text_input("Lokasi")
+            isi = st.text_area("Deskripsi")
+            gambar = st.file_uploader("Upload Gambar (opsional)", type=["png", "jpg", "jpeg"])
+            pin = st.session_state.get("pin_laporan")
+            pakai_pin = st.checkbox(
+                f"Pakai titik yang diklik di peta ({pin[0]:.5f}, {pin[1]:.5f})" if pin
+                else "Pakai titik yang diklik di peta (klik peta curah hujan terlebih dahulu)",
+                disabled=pin is None,
+            )
+            kirim = st.form_submit_button("Kirim")
+
+            if kirim:
+                if nama.strip() and kontak.strip() and isi.strip():
+                    path_gambar, gps = None, None
+                    if gambar is not None:
+                        try:
+                            path_gambar, gps = penyimpan_gambar.simpan(gambar.getvalue())
+                        except ValueError:
+                            st.warning("Gambar tidak dapat dibaca, laporan dikirim tanpa gambar.")
+
+                    lat_lap, lon_lap, sumber_lokasi = tentukan_koordinat(
+                        pin if pakai_pin else None, gps, lokasi, get_gazetir()
+                    )
+                    waktu_lapor = datetime.now(pytz.timezone("Asia/Makassar"))
+                    new_laporan = {
+                        "Nama": nama.strip(),
+                        "Kontak": kontak.strip(),
+                        "Jenis": jenis,
+                        "Lokasi": lokasi.strip(),
+                        "Deskripsi": isi.strip(),
+                        "Tanggal": waktu_lapor.strftime("%d %B %Y %H:%M"),
+                        "Waktu": waktu_lapor.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "Gambar": path_gambar,
+                        "Lat": lat_lap,
+                        "Lon": lon_lap,
+                        "Sumber Lokasi": sumber_lokasi,
+                    }
+                    store_laporan.tambah(new_laporan)
+                    setelah_tulis("laporan", sumber=False)
+                    # Titik & hotspot di peta ikut berubah
+                    jalankan_ulang("laporan", "laporan", ("success", "Laporan berhasil dikirim."))
+                else:
+                    st.warning("Lengkapi semua isian sebelum mengirim laporan.")
+            tampil_pesan("laporan")
+
+        # Tampilkan laporan warga: filter & paging dijalankan di SQLite, hanya satu halaman yang dirender
+        st.markdown("#### Daftar Laporan")
+        f1, f2, f3 = st.columns(3)
+        with f1:
+            filter_jenis = st.multiselect("Filter Jenis", JENIS_LAPORAN, key="lap_jenis")
+        with f2:
+            filter_tanggal = st.date_input("Rentang Tanggal", value=(), key="lap_tanggal")
+        with f3:
+            filter_lokasi = st.selectbox("Filter Lokasi", ["Semua"] + store_laporan.daftar_lokasi(), key="lap_lokasi")
+        filter_teks = st.text_input("Cari di Deskripsi", key="lap_teks")
+
+        p1, p2 = st.columns([0.3, 0.7])
+        with p1:
+            per_halaman = st.selectbox("Per halaman", UKURAN_HALAMAN, key="lap_per_halaman")
+        with p2:
+            halaman = st.number_input("Halaman", min_value=1, value=1, step=1, key="lap_halaman")
+
+        mulai_tgl = filter_tanggal[0] if len(filter_tanggal) > 0 else None
+        sampai_tgl = filter_tanggal[1] if len(filter_tanggal) > 1 else mulai_tgl
+        daftar_laporan, total_laporan = store_laporan.cari(
+            jenis=filter_jenis,
+            mulai=mulai_tgl,
+            sampai=sampai_tgl,
+            lokasi=None if filter_lokasi == "Semua" else filter_lokasi,
+            teks=filter_teks,
+            batas=per_halaman,
+            offset=(halaman - 1) * per_halaman,
+        )
+        jumlah_halaman = max(1, -(-total_laporan // per_halaman))
+        st.caption(f"{total_laporan} laporan cocok — halaman {halaman} dari {jumlah_halaman}")
+        if halaman > jumlah_halaman and total_laporan:
+            st.info("Halaman melebihi jumlah hasil, pilih halaman yang lebih kecil.")
+
+        # Ekspor seluruh hasil filter (bukan hanya halaman ini), ditulis bertahap di latar
+        with st.popover("📤 Ekspor hasil filter"):
+            sertakan_foto = st.checkbox(
+                f"Sertakan foto (Excel, maksimal {BATAS_FOTO_XLSX:,} foto)", key="ekspor_laporan_foto"
+            )
+            filter_ekspor = {
+                "jenis": filter_jenis, "mulai": mulai_tgl, "sampai": sampai_tgl,
+                "lokasi": None if filter_lokasi == "Semua" else filter_lokasi, "teks": filter_teks,
+            }
+            panel_ekspor(
+                "ekspor_laporan",
+                lambda fmt: antrian_ekspor.mulai(
+                    "laporan_warga", fmt, [KOLOM_LAPORAN[k] for k in KOLOM_EKSPOR_LAPORAN],
+                    partial(store_laporan.iter_potongan, KOLOM_EKSPOR_LAPORAN, ukuran=UKURAN_POTONGAN, **filter_ekspor),
+                    total=total_laporan,
+                    **({
+                        "kolom_waktu": (0,),
+                        "foto": foto_ekspor if sertakan_foto else None,
+                        "kolom_foto": KOLOM_EKSPOR_LAPORAN.index("gambar"),
+                    } if fmt == "xlsx" else {}),
+                ),
+                total_laporan,
             )
-            if lap.get("Gambar"):
-                try:
-                    img = Image.open(lap["Gambar"])
-                    st.image(img, width=300)
-                except Exception as e:
-                    st.warning("Gambar tidak dapat ditampilkan.")
-        with col2:
-            if st.button("🗑️ Hapus", key=f"del_lap_{i}"):
-                # Hapus file gambar jika ada
-                if lap.get("Gambar") and os.path.exists(lap["Gambar"]):
-                    os.remove(lap["Gambar"])
-                st.session_state.laporan.pop(i)
-                save_data(LAPORAN_FILE, st.session_state.laporan)
-                st.session_state.laporan_update = True
-                st.experimental_rerun()
 
+        for lap in daftar_laporan:
+            col1, col2 = st.columns([0.8, 0.2])
+            with col1:
+                st.markdown(
+                    f"**{lap['Tanggal']}**  \n"
+                    f"*{lap['Jenis']}* oleh **{lap['Nama']}**  \n"
+                    f"{lap['Lokasi']}"
+                    + (f" 📍 {lap['Lat']:.4f}, {lap['Lon']:.4f} ({lap['Sumber Lokasi']})" if lap.get("Lat") is not None else "")
+                    + "  \n"
+                    f"{lap['Deskripsi']}"
+                )
+                if lap.get("Gambar"):
+                    thumb = penyimpan_gambar.thumbnail(lap["Gambar"])
+                    if thumb is not None:
+                        st.image(thumb, width=300)
+                    else:
+                        st.warning("Gambar tidak dapat ditampilkan.")
+            with col2:
+                if st.button("🗑️ Hapus", key=f"del_lap_{lap['id']}"):
+                    # Hapus berdasarkan id; file gambar ikut dihapus jika tidak dipakai laporan lain
+                    terhapus = store_laporan.hapus(lap["id"])
+                    setelah_tulis("laporan", sumber=False)
+                    if terhapus and terhapus.get("Gambar") and not store_laporan.gambar_dipakai(terhapus["Gambar"]):
+                        penyimpan_gambar.hapus(terhapus["Gambar"])
+                    jalankan_ulang("laporan", "laporan")
+
+bagian_laporan()
 
 # ------------------ PENGINGAT HARIAN ------------------
 TODO_FILE = "todo_harian.json"
 
+berkas_todo = BerkasJSON(TODO_FILE)
+data_bersama.daftar("todo", berkas_todo)
+
 def load_todo():
-    if os.path.exists(TODO_FILE):
-        with open(TODO_FILE, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []
-    return []
-
-def save_todo(data):
-    with open(TODO_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-
-if "todo" not in st.session_state:
-    st.session_state.todo = load_todo()
-
-with st.expander("Pengingat Harian"):
-    tugas_baru = st.text_input("Tambah Tugas Baru:")
-    if st.button("✅ Simpan Tugas Baru"):
-        if tugas_baru.strip():
-            st.session_state.todo.append(tugas_baru.strip())
-            save_todo(st.session_state.todo)
-            st.success("Tugas berhasil disimpan.")
-        else:
-            st.warning("⚠️ Tugas tidak boleh kosong.")
-
-    # Tampilkan daftar tugas dengan tombol hapus
-    for i, tugas in enumerate(st.session_state.todo):
-        col1, col2 = st.columns([0.9, 0.1])
-        col1.markdown(f"- {tugas}")
-        if col2.button("🗑️", key=f"hapus_tugas_{i}"):
-            st.session_state.todo.pop(i)
-            save_todo(st.session_state.todo)
-            st.experimental_rerun()
+    return data_bersama.baca("todo")
+
+def hapus_tugas(data, i, tugas):
+    # Hapus berdasarkan posisi jika masih cocok, jika tidak (daftar sudah berubah) berdasarkan isi
+    if i < len(data) and data[i] == tugas:
+        data.pop(i)
+    elif tugas in data:
+        data.remove(tugas)
+    return data
+
+@st.fragment
+@instrumen.catat("pengingat")
+def bagian_pengingat():
+    with st.expander("Pengingat Harian"):
+        tugas_baru = st.text_input("Tambah Tugas Baru:")
+        if st.button("✅ Simpan Tugas Baru"):
+            if tugas_baru.strip():
+                berkas_todo.ubah(lambda data: data + [tugas_baru.strip()])
+                setelah_tulis("todo")
+                st.success("Tugas berhasil disimpan.")
+            else:
+                st.warning("⚠️ Tugas tidak boleh kosong.")
+
+        # Tampilkan daftar tugas dengan tombol hapus
+        for i, tugas in enumerate(load_todo()):
+            col1, col2 = st.columns([0.9, 0.1])
+            col1.markdown(f"- {tugas}")
+            if col2.button("🗑️", key=f"hapus_tugas_{i}"):
+                berkas_todo.ubah(lambda data: hapus_tugas(data, i, tugas))
+                setelah_tulis("todo")
+                jalankan_ulang("pengingat", "todo")
+
+bagian_pengingat()
+
+# ------------------ SINKRON DATA BERSAMA ------------------
+# Sesi yang sedang terbuka mengecek versi data bersama secara berkala dan memuat ulang
+# tampilan jika ada penulisan dari sesi/proses lain
+@st.fragment(run_every=15)
+def pantau_data_bersama():
+    for nama in ("harga", "todo"):
+        data_bersama.baca(nama)
+    if data_bersama.versi != st.session_state.get("versi_terlihat"):
+        st.rerun()
+
+pantau_data_bersama()
+
+with st.sidebar.expander("Data Bersama"):
+    st.caption(f"Versi data: {data_bersama.versi}")
+    for nama, ukuran in data_bersama.ukuran().items():
+        st.caption(f"{nama}: {ukuran / 1024:.1f} KB di memori (satu salinan per proses)")
+
+# ------------------ PANEL DEBUG KINERJA ------------------
+instrumen.selesai_rerun()
+with st.sidebar.expander("Debug Kinerja"):
+    st.checkbox("Catat kinerja per bagian", key="debug_kinerja")
+    st.checkbox(
+        "Lacak alokasi memori (memperlambat semua sesi)", key="debug_alokasi",
+        disabled=not st.session_state.debug_kinerja,
+    )
+    riwayat_kinerja = instrumen.riwayat(sesi_ini=True, batas=10)
+    if riwayat_kinerja:
+        terakhir = riwayat_kinerja[0]
+        st.caption(f"Rerun terakhir ({terakhir['jenis']}{', terhenti' if terakhir['terhenti'] else ''}): "
+                   f"{terakhir['detik'] * 1000:.0f} ms")
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    "Bagian": bagian, "ms": round(c["detik"] * 1000, 1), "KB unduh": round(c["byte"] / 1024, 1),
+                    "Hit": c["hit"], "Miss": c["miss"],
+                    "KB alokasi": None if c["alokasi"] is None else round(c["alokasi"] / 1024, 1),
+                }
+                for bagian, c in sorted(terakhir["bagian"].items(), key=lambda x: -x[1]["detik"])
+            ]),
+            use_container_width=True, hide_index=True,
+        )
+        st.markdown("10 rerun terakhir (ms)")
+        st.dataframe(
+            pd.DataFrame([
+                {"Jenis": r["jenis"] + (" (terhenti)" if r["terhenti"] else ""), "Total": round(r["detik"] * 1000),
+                 **{b: round(c["detik"] * 1000) for b, c in r["bagian"].items()}}
+                for r in riwayat_kinerja
+            ]),
+            use_container_width=True, hide_index=True,
+        )
+    if instrumen.stats["rerun"]:
+        st.markdown("Semua sesi (ring buffer)")
+        st.dataframe(
+            pd.DataFrame.from_dict(instrumen.ringkasan(), orient="index").round(1),
+            use_container_width=True,
+        )
+        k1, k2 = st.columns(2)
+        k1.download_button("JSON", data=instrumen.ke_json, file_name="kinerja.json",
+                           mime="application/json", on_click="ignore", key="unduh_kinerja_json")
+        k2.download_button("Prometheus", data=instrumen.ke_prometheus, file_name="kinerja.prom",
+                           mime="text/plain", on_click="ignore", key="unduh_kinerja_prom")
+        st.caption(f"Juga ditulis ke {instrumen.folder}/" + (" dan /metrics proksi tile." if proksi_tile is not None else "."))
 # Footer
 st.markdown("---")
 st.caption("© 2025 – Kabupaten Sidenreng Rappang | Dashboard Pertanian Digital by Dian Eka Putra")
@@ -0,0 +1,333 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import requests
+
+from cuaca import kunci_lokasi
+
+# ------------------ Arsip Snapshot Prakiraan (SQLite) ------------------
+# Setiap payload Open-Meteo yang diambil disimpan per lokasi sebagai snapshot, sehingga ada riwayat
+# untuk tren, fitur musiman, dan pengecekan akurasi prakiraan. Waktu disimpan sebagai detik epoch
+# waktu lokal lokasi (jam dinding dari payload, timezone=auto), jadi `waktu // 86400` = hari lokal.
+#
+#   snapshot  satu baris per payload baru (lokasi, diambil); payload yang isinya sama dilewati
+#   jam       resolusi penuh: nilai per (lokasi, snapshot, jam), disimpan SIMPAN_JAM_HARI hari
+#   terkini   per (lokasi, jam) nilai dari snapshot terbaru; deret per jam tanpa memilah snapshot
+#   harian    agregat per (lokasi, lead, hari), disimpan selamanya. lead = selisih hari antara tanggal
+#             prakiraan dan tanggal snapshot diambil (0 = prakiraan yang diambil pada hari itu)
+#
+# Kunci utama semua tabel sekaligus indeks berkelompok (WITHOUT ROWID), jadi kueri rentang per lokasi
+# hanya membaca baris lokasi itu secara berurutan, berapa tahun pun isi arsipnya.
+ARSIP_CUACA_DB = "data/arsip_cuaca.db"
+SIMPAN_JAM_HARI = 14
+INTERVAL_KUMPUL = 3600
+INTERVAL_RAPIKAN = 24 * 3600
+HARI = 86400
+
+SKEMA = """
+CREATE TABLE IF NOT EXISTS snapshot (
+    lokasi   TEXT    NOT NULL,  -- kunci_lokasi "lat,lon"
+    diambil  INTEGER NOT NULL,  -- epoch waktu lokal saat payload diambil
+    sidik    TEXT    NOT NULL,  -- sidik isi hourly, untuk melewati payload yang tidak berubah
+    lat      REAL,
+    lon      REAL,
+    PRIMARY KEY (lokasi, diambil)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS jam (
+    lokasi      TEXT    NOT NULL,
+    diambil     INTEGER NOT NULL,
+    waktu       INTEGER NOT NULL,
+    hujan       REAL,
+    suhu        REAL,
+    kelembapan  REAL,
+    PRIMARY KEY (lokasi, diambil, waktu)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS terkini (
+    lokasi      TEXT    NOT NULL,
+    waktu       INTEGER NOT NULL,
+    hujan       REAL,
+    suhu        REAL,
+    kelembapan  REAL,
+    diambil     INTEGER NOT NULL,
+    PRIMARY KEY (lokasi, waktu)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS harian (
+    lokasi      TEXT    NOT NULL,
+    lead        INTEGER NOT NULL,
+    hari        INTEGER NOT NULL,  -- waktu // 86400
+    hujan       REAL,
+    suhu_maks   REAL,
+    suhu_min    REAL,
+    suhu_rata   REAL,
+    kelembapan  REAL,
+    n_snapshot  INTEGER NOT NULL,
+    PRIMARY KEY (lokasi, lead, hari)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS info (
+    kunci  TEXT PRIMARY KEY,
+    nilai  INTEGER
+);
+"""
+
+# Agregat harian per (lokasi, lead, hari) dari tabel jam: dalam satu snapshot, jam-jam satu hari
+# dijumlah/dirata-rata; lalu snapshot dengan lead yang sama dirata-rata. Semua snapshot dengan
+# (hari, lead) yang sama diambil pada hari yang sama, jadi setelah hari pengambilan itu lewat
+# agregatnya final dan bisa disimpan ke tabel harian.
+SQL_RINGKAS = """
+SELECT lokasi, lead, hari, AVG(hujan) AS hujan, AVG(suhu_maks) AS suhu_maks, AVG(suhu_min) AS suhu_min,
+       AVG(suhu_rata) AS suhu_rata, AVG(kelembapan) AS kelembapan, COUNT(*) AS n_snapshot
+FROM (
+    SELECT lokasi, waktu / 86400 AS hari, waktu / 86400 - diambil / 86400 AS lead,
+           SUM(hujan) AS hujan, MAX(suhu) AS suhu_maks, MIN(suhu) AS suhu_min,
+           AVG(suhu) AS suhu_rata, AVG(kelembapan) AS kelembapan
+    FROM jam WHERE {syarat}
+    GROUP BY lokasi, diambil, hari
+)
+WHERE lead >= 0
+GROUP BY lokasi, lead, hari
+"""
+# Batas (epoch) snapshot yang sudah diringkas ke tabel harian; snapshot sejak batas ini diringkas saat kueri
+SQL_DIRINGKAS = "COALESCE((SELECT nilai FROM info WHERE kunci = 'diringkas'), 0)"
+
+KOLOM_JAM = ["Waktu", "Curah Hujan (mm)", "Suhu (°C)", "Kelembapan (%)"]
+KOLOM_HARIAN = ["Tanggal", "Curah Hujan (mm)", "Suhu Maks (°C)", "Suhu Min (°C)", "Kelembapan (%)"]
+
+
+def _epoch(waktu):
+    # Timestamp naif (jam dinding lokal) -> detik epoch, tanpa konversi zona waktu
+    return int(pd.Timestamp(waktu).value // 10**9)
+
+
+def _sekarang_lokal(offset_detik):
+    # Jam dinding saat ini di zona lokasi (utc_offset_seconds payload), naif seperti kolom waktu arsip;
+    # tidak bergantung zona waktu server
+    return datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=offset_detik or 0)
+
+
+def _sidik_payload(data):
+    isi = json.dumps(data["hourly"], sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(isi).hexdigest()[:16]
+
+
+class ArsipCuaca:
+    def __init__(self, path=ARSIP_CUACA_DB, simpan_jam_hari=SIMPAN_JAM_HARI):
+        self.path = path
+        self.simpan_jam_hari = simpan_jam_hari
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self.stats = {"snapshot": 0, "sama": 0, "dirampingkan": 0, "gagal": 0}
+        self._lokal = threading.local()
+        self._lock = threading.Lock()
+        self._sidik_terakhir = {}  # lokasi -> sidik snapshot terakhir
+        conn = self._koneksi()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SKEMA)
+
+    def _koneksi(self):
+        conn = getattr(self._lokal, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._lokal.conn = conn
+        return conn
+
+    # ---------- Tulis ----------
+    def simpan(self, lokasi, data, diambil=None):
+        # Simpan satu payload Open-Meteo (dict hasil KlienCuaca / fixture rekaman) untuk kunci lokasi.
+        # diambil: datetime naif waktu lokal; default sekarang menurut utc_offset_seconds payload.
+        # Mengembalikan jumlah baris jam yang ditulis (0 jika isinya sama dengan snapshot terakhir).
+        sidik = _sidik_payload(data)
+        conn = self._koneksi()
+        with self._lock:
+            if lokasi not in self._sidik_terakhir:
+                baris = conn.execute(
+                    "SELECT sidik FROM snapshot WHERE lokasi = ? ORDER BY diambil DESC LIMIT 1", (lokasi,)
+                ).fetchone()
+                self._sidik_terakhir[lokasi] = baris[0] if baris else None
+            if self._sidik_terakhir[lokasi] == sidik:
+                self.stats["sama"] += 1
+                return 0
+            self._sidik_terakhir[lokasi] = sidik
+        try:
+            baris = self._tulis_snapshot(conn, lokasi, data, diambil, sidik)
+        except Exception:
+            # Gagal (payload tidak lengkap / galat SQLite): lupakan sidik supaya payload yang sama dicoba lagi
+            with self._lock:
+                self._sidik_terakhir.pop(lokasi, None)
+            raise
+        with self._lock:
+            self.stats["snapshot"] += 1
+        return baris
+
+    def _tulis_snapshot(self, conn, lokasi, data, diambil, sidik):
+        if diambil is None:
+            diambil = _sekarang_lokal(data.get("utc_offset_seconds", 0))
+        detik = _epoch(diambil)
+        jam = data["hourly"]
+        waktu = pd.to_datetime(jam["time"]).to_numpy().astype("datetime64[s]").astype("int64")
+        nilai = [
+            np.asarray(jam[k], dtype=float) for k in ("precipitation", "temperature_2m", "relative_humidity_2m")
+        ]
+        # NaN -> NULL supaya SUM/AVG di SQLite melewatinya
+        baris = [
+            (lokasi, detik, int(w), *(None if v != v else v for v in vs))
+            for w, *vs in zip(waktu, *(n.tolist() for n in nilai))
+        ]
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshot VALUES (?, ?, ?, ?, ?)",
+                (lokasi, detik, sidik, data.get("latitude"), data.get("longitude")),
+            )
+            if "utc_offset_seconds" in data:
+                # Zona waktu snapshot, untuk menentukan "hari ini" saat rapikan() tanpa `sekarang`
+                conn.execute("INSERT OR REPLACE INTO info VALUES ('utc_offset', ?)", (data["utc_offset_seconds"],))
+            conn.executemany("INSERT OR REPLACE INTO jam VALUES (?, ?, ?, ?, ?, ?)", baris)
+            # Snapshot yang datang terlambat (diambil lebih awal) tidak menimpa nilai yang lebih baru
+            conn.executemany(
+                "INSERT INTO terkini VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (lokasi, waktu) DO UPDATE SET "
+                "hujan = excluded.hujan, suhu = excluded.suhu, kelembapan = excluded.kelembapan, "
+                "diambil = excluded.diambil WHERE excluded.diambil >= terkini.diambil",
+                [(l, w, *vs, d) for l, d, w, *vs in baris],
+            )
+        return len(baris)
+
+    def dengar(self, lokasi, data):
+        # Pendengar untuk KlienCuaca.pendengar: arsip yang gagal ditulis (galat SQLite, payload tanpa hourly
+        # atau berisi nilai rusak) tidak boleh menggagalkan pengambilan
+        try:
+            self.simpan(lokasi, data)
+        except (sqlite3.Error, KeyError, ValueError, TypeError):
+            with self._lock:
+                self.stats["gagal"] += 1
+
+    def rapikan(self, sekarang=None):
+        # 1. Snapshot yang diambil sebelum hari ini (dan belum diringkas) diringkas ke tabel harian.
+        # 2. Retensi: snapshot yang lebih tua dari simpan_jam_hari hari dihapus dari tabel jam, dan jam
+        #    yang lebih tua dari itu dihapus dari terkini; riwayatnya tetap ada di tabel harian.
+        # Satu transaksi, aman dijalankan berulang. Tabel snapshot (satu baris kecil per payload) tetap
+        # utuh sebagai log pengambilan. Tanpa `sekarang`, hari ini dihitung di zona waktu snapshot
+        # (mis. Asia/Makassar), bukan zona waktu server.
+        conn = self._koneksi()
+        if sekarang is None:
+            offset = conn.execute("SELECT nilai FROM info WHERE kunci = 'utc_offset'").fetchone()
+            sekarang = _sekarang_lokal(offset[0] if offset else 0)
+        hari_ini = _epoch(sekarang) // HARI * HARI
+        batas = hari_ini - self.simpan_jam_hari * HARI
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO harian "
+                + SQL_RINGKAS.format(syarat=f"diambil >= {SQL_DIRINGKAS} AND diambil < ?"), (hari_ini,)
+            )
+            conn.execute(
+                f"INSERT OR REPLACE INTO info VALUES ('diringkas', MAX({SQL_DIRINGKAS}, ?))", (hari_ini,)
+            )
+            jumlah = conn.execute("DELETE FROM jam WHERE diambil < ?", (batas,)).rowcount
+            conn.execute("DELETE FROM terkini WHERE waktu < ?", (batas,))
+        with self._lock:
+            self.stats["dirampingkan"] += jumlah
+        return jumlah
+
+    # ---------- Kueri ----------
+    def daftar_lokasi(self):
+        return [b[0] for b in self._koneksi().execute("SELECT DISTINCT lokasi FROM snapshot ORDER BY lokasi")]
+
+    def jam(self, lokasi, mulai=None, sampai=None):
+        # Deret per jam dengan nilai dari snapshot terbaru untuk setiap jam (kolom seperti buat_df_jam).
+        # Hanya mencakup simpan_jam_hari hari terakhir; yang lebih tua ada di harian().
+        mulai = _epoch(mulai) if mulai is not None else 0
+        sampai = _epoch(pd.Timestamp(sampai) + pd.Timedelta(days=1)) if sampai is not None else 2**62
+        baris = self._koneksi().execute(
+            "SELECT waktu, hujan, suhu, kelembapan FROM terkini WHERE lokasi = ? AND waktu >= ? AND waktu < ? "
+            "ORDER BY waktu",
+            (lokasi, mulai, sampai),
+        ).fetchall()
+        df = pd.DataFrame(baris, columns=KOLOM_JAM)
+        df["Waktu"] = pd.to_datetime(df["Waktu"], unit="s")
+        return df
+
+    def harian(self, lokasi, mulai=None, sampai=None, lead=0):
+        # Deret harian (kolom seperti buat_df_harian) dari prakiraan yang diambil `lead` hari sebelumnya;
+        # lead=0 (diambil pada hari itu sendiri) paling dekat dengan kenyataan. Hari yang sudah
+        # diringkas dibaca dari tabel harian, snapshot hari ini diringkas langsung dari tabel jam.
+        mulai = _epoch(mulai) // HARI if mulai is not None else 0
+        sampai = _epoch(sampai) // HARI if sampai is not None else 2**40
+        conn = self._koneksi()
+        arsip = conn.execute(
+            "SELECT hari, hujan, suhu_maks, suhu_min, kelembapan FROM harian "
+            "WHERE lokasi = ? AND lead = ? AND hari >= ? AND hari <= ? ORDER BY hari",
+            (lokasi, lead, mulai, sampai),
+        ).fetchall()
+        baru = conn.execute(
+            "SELECT hari, hujan, suhu_maks, suhu_min, kelembapan FROM ("
+            + SQL_RINGKAS.format(
+                syarat=f"lokasi = ? AND diambil >= {SQL_DIRINGKAS} AND waktu / 86400 - diambil / 86400 = ?"
+            )
+            + ") WHERE hari >= ? AND hari <= ? ORDER BY hari",
+            (lokasi, lead, mulai, sampai),
+        ).fetchall()
+        df = pd.DataFrame(arsip + baru, columns=KOLOM_HARIAN)
+        df["Tanggal"] = pd.to_datetime(df["Tanggal"] * HARI, unit="s")
+        return df.round({k: 1 for k in KOLOM_HARIAN[1:]})
+
+
+class PengumpulCuaca:
+    # Thread latar yang mengambil prakiraan semua lokasi setiap `interval` detik lewat `sumber(lat, lon)`
+    # dan menyimpannya ke arsip, lalu menjalankan retensi sekali per `interval_rapikan`. sumber biasanya
+    # KlienCuaca.ambil (memakai cache-nya, jadi tidak menambah beban upstream); untuk uji bisa berupa
+    # fungsi yang mengembalikan payload rekaman.
+    def __init__(self, arsip, lokasi, sumber, interval=INTERVAL_KUMPUL, interval_rapikan=INTERVAL_RAPIKAN, presisi=2):
+        self.arsip = arsip
+        self.lokasi = list(lokasi)  # list of (nama, lat, lon)
+        self.sumber = sumber
+        self.interval = interval
+        self.interval_rapikan = interval_rapikan
+        self.presisi = presisi
+        self.stats = {"putaran": 0, "gagal": 0}
+        self._rapikan_terakhir = 0
+        self._berhenti = threading.Event()
+        self._thread = None
+
+    def jalankan_sekali(self, sekarang=None):
+        # Satu putaran pengumpulan; sekarang: datetime naif waktu lokal (untuk fixture). Mengembalikan
+        # jumlah snapshot baru.
+        baru = 0
+        for _, lat, lon in self.lokasi:
+            try:
+                data = self.sumber(lat, lon)
+                baru += self.arsip.simpan(kunci_lokasi(lat, lon, self.presisi), data, diambil=sekarang) > 0
+            except (requests.RequestException, sqlite3.Error, KeyError, ValueError, TypeError):
+                # Satu lokasi gagal (upstream, payload rusak, arsip terkunci): lokasi lain tetap dikumpulkan
+                self.stats["gagal"] += 1
+        if time.time() - self._rapikan_terakhir >= self.interval_rapikan:
+            self.arsip.rapikan(sekarang)
+            self._rapikan_terakhir = time.time()
+        self.stats["putaran"] += 1
+        return baru
+
+    def mulai(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._berhenti.clear()
+
+        def kerja():
+            while not self._berhenti.is_set():
+                try:
+                    self.jalankan_sekali()
+                except Exception:
+                    # Galat apa pun tidak boleh mematikan thread diam-diam; dicoba lagi putaran berikutnya
+                    self.stats["gagal"] += 1
+                self._berhenti.wait(self.interval)
+
+        self._thread = threading.Thread(target=kerja, daemon=True)
+        self._thread.start()
+
+    def berhenti(self):
+        self._berhenti.set()
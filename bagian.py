@@ -0,0 +1,41 @@
+# ------------------ Grafik Ketergantungan Bagian Dashboard ------------------
+# Bagian interaktif dijalankan sebagai st.fragment: widget di dalamnya hanya menjalankan ulang
+# bagian itu sendiri. BACA mencatat masukan yang dibaca setiap bagian; setelah sebuah bagian
+# mengubah masukan, hanya bagian yang membacanya yang perlu dijalankan ulang.
+#
+#   masukan      asal                                    dibaca oleh
+#   lokasi       sidebar (koordinat, threshold, cakupan) peta, tabel_cuaca, grafik, prediksi_panen
+#   cuaca        KlienCuaca (prakiraan Open-Meteo)       peta, tabel_cuaca, grafik, prediksi_panen
+#   arsip        data/arsip_cuaca.db (pengumpul latar)   grafik
+#   laporan      data/laporan.db                         peta (titik & hotspot), laporan
+#   harga        harga_komoditas.json + data/harga.db    prediksi_panen (harga acuan), harga
+#   todo         todo_harian.json                        pengingat
+#   faq          data/faq.json                           chatbot
+#   chat         session_state.chat_history              chatbot
+#   pupuk        widget kalkulator                       pupuk
+BACA = {
+    "peta": {"lokasi", "cuaca", "laporan"},
+    "tabel_cuaca": {"lokasi", "cuaca"},
+    "grafik": {"lokasi", "cuaca", "arsip"},
+    "prediksi_panen": {"lokasi", "cuaca", "harga"},
+    "chatbot": {"faq", "chat"},
+    "pupuk": {"pupuk"},
+    "harga": {"harga"},
+    "laporan": {"laporan"},
+    "pengingat": {"todo"},
+}
+
+# Bagian yang dibungkus st.fragment di ap.py; sisanya ikut jalan ulang penuh
+FRAGMEN = {"grafik", "prediksi_panen", "chatbot", "pupuk", "harga", "laporan", "pengingat"}
+
+
+def pembaca(masukan):
+    return {bagian for bagian, baca in BACA.items() if masukan in baca}
+
+
+def lingkup_rerun(bagian, masukan):
+    # Lingkup st.rerun setelah `bagian` mengubah `masukan`: cukup fragmennya sendiri jika tidak ada
+    # bagian lain yang membaca masukan itu, selain itu seluruh aplikasi
+    if bagian in FRAGMEN and pembaca(masukan) <= {bagian}:
+        return "fragment"
+    return "app"
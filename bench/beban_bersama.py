@@ -0,0 +1,74 @@
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+AKAR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AKAR)
+
+from bersama import DataBersama
+from penyimpanan import BerkasJSON
+
+# ------------------ Uji Beban Data Bersama ------------------
+# Setiap thread meniru satu sesi browser yang membuka aplikasi dan menyimpan data harga & pengingat di
+# session_state-nya. Sebelum: tiap sesi memegang salinan sendiri (BerkasJSON.baca()). Sesudah: tiap sesi
+# hanya memegang referensi ke salinan beku DataBersama dan nomor versi yang terakhir dilihat.
+# Memori yang masih dipegang setelah semua sesi dibuka diukur dengan tracemalloc.
+#
+#   python bench/beban_bersama.py [sesi ...]
+SESI = (10, 100, 1000)
+BARIS_HARGA = 200
+PENGINGAT = 500
+
+
+def siapkan(folder):
+    berkas_harga = BerkasJSON(os.path.join(folder, "harga_komoditas.json"))
+    berkas_harga.tulis([{"Komoditas": f"Komoditas {i}", "Harga (Rp/kg)": 5000 + 25 * i}
+                        for i in range(BARIS_HARGA)])
+    berkas_todo = BerkasJSON(os.path.join(folder, "todo_harian.json"))
+    berkas_todo.tulis([f"Periksa saluran irigasi petak {i}" for i in range(PENGINGAT)])
+    return berkas_harga, berkas_todo
+
+
+def buka_salinan(berkas_harga, berkas_todo):
+    return {"harga": berkas_harga.baca()[0], "todo": berkas_todo.baca()[0]}
+
+
+def buka_bersama(data_bersama):
+    return {"harga": data_bersama.baca("harga"), "todo": data_bersama.baca("todo"),
+            "versi_terlihat": data_bersama.versi}
+
+
+def ukur(buka, jumlah_sesi):
+    tracemalloc.start()
+    awal = tracemalloc.take_snapshot()
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        sesi = list(pool.map(lambda _: buka(), range(jumlah_sesi)))
+    akhir = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    byte = sum(s.size_diff for s in akhir.compare_to(awal, "filename"))
+    assert len(sesi) == jumlah_sesi
+    return byte / 1e6
+
+
+def main(*daftar_sesi):
+    folder = tempfile.mkdtemp(prefix="beban_bersama_")
+    try:
+        berkas_harga, berkas_todo = siapkan(folder)
+        for jumlah_sesi in daftar_sesi or SESI:
+            # DataBersama baru per putaran supaya pemuatan pertama ikut terhitung
+            data_bersama = DataBersama()
+            data_bersama.daftar("harga", berkas_harga)
+            data_bersama.daftar("todo", berkas_todo)
+            salinan = ukur(lambda: buka_salinan(berkas_harga, berkas_todo), jumlah_sesi)
+            bersama = ukur(lambda: buka_bersama(data_bersama), jumlah_sesi)
+            assert bersama < salinan
+            print(f"{jumlah_sesi:5d} sesi: salinan {salinan:7.2f} MB -> bersama {bersama:6.2f} MB")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cuaca import PARAM_CUACA, KlienCuaca, buat_df_harian
+from stub_open_meteo import jalankan_stub
+from wilayah import buat_grid
+
+# ------------------ Benchmark Pengambilan Banyak Lokasi ------------------
+# Serial (requests.get per lokasi, seperti sebelum KlienCuaca) dibanding ambil_banyak (session bersama
+# + thread pool) terhadap server Open-Meteo palsu dengan latensi tetap per permintaan.
+#
+#   python bench/bench_cuaca.py [jumlah_lokasi] [jeda_ms] [workers]
+LOKASI = 50
+JEDA_MS = 30
+WORKERS = 16
+
+
+def serial(url, lokasi):
+    frames = []
+    for nama, lat, lon in lokasi:
+        resp = requests.get(url, params=dict(PARAM_CUACA, latitude=lat, longitude=lon), timeout=10)
+        resp.raise_for_status()
+        frames.append(buat_df_harian(resp.json()))
+    return frames
+
+
+def main(jumlah=LOKASI, jeda_ms=JEDA_MS, workers=WORKERS):
+    url, server = jalankan_stub(jeda_ms / 1000)
+    # Koordinat berbeda semua supaya tidak ada yang terlayani dari cache klien
+    lokasi = [(f"g{i}", lat, lon) for i, (_, lat, lon) in enumerate(buat_grid(0.02)[:jumlah])]
+    assert len(lokasi) == jumlah
+
+    t = time.perf_counter()
+    serial(url, lokasi)
+    waktu_serial = time.perf_counter() - t
+
+    with tempfile.TemporaryDirectory() as folder:
+        klien = KlienCuaca(base_url=url, cache_file=os.path.join(folder, "cache.json"))
+        t = time.perf_counter()
+        df = klien.ambil_banyak(lokasi, max_workers=workers)
+        waktu_pool = time.perf_counter() - t
+        t = time.perf_counter()
+        klien.ambil_banyak(lokasi, max_workers=workers)
+        waktu_cache = time.perf_counter() - t
+
+    assert not df.attrs["gagal"] and df["Lokasi"].nunique() == jumlah
+    assert server.jumlah == 2 * jumlah, "putaran kedua seharusnya terlayani cache klien"
+    print(f"{jumlah} lokasi, latensi {jeda_ms} ms per permintaan")
+    print(f"  serial requests.get    {waktu_serial:6.2f} s")
+    print(f"  ambil_banyak ({workers:2d} thr) {waktu_pool:6.2f} s  ({waktu_serial / waktu_pool:.1f}x)")
+    print(f"  ambil_banyak (cache)   {waktu_cache:6.2f} s")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:4]))
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+AKAR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AKAR)
+
+from ekspor import ANGGARAN_EKSPOR, FORMAT_EKSPOR, CacheEkspor
+from irigasi import hitung_irigasi
+from wilayah import KECAMATAN_SIDRAP
+
+# ------------------ Benchmark Ekspor Cuaca ------------------
+# Waktu bangun tiap format untuk satu tahun data harian seluruh kecamatan (format df_kabupaten:
+# Lokasi, Lat, Lon, 5 kolom cuaca, 4 kolom irigasi), lalu waktu ambil dari cache. Setiap format dibangun
+# sekali sebagai pemanasan, lalu diambil yang tercepat dari `ulangan` kali bangun dengan cache kosong.
+# Gagal jika xlsx (satu sheet / per lokasi) melewati ANGGARAN_EKSPOR.
+#
+#   python bench/bench_ekspor.py [hari] [ulangan]
+HARI = 365
+ULANGAN = 5
+THRESHOLD = 5
+
+
+def data_kabupaten(hari, rng):
+    tanggal = pd.date_range("2024-01-01", periods=hari, freq="D")
+    frames = []
+    for nama, lat, lon in KECAMATAN_SIDRAP:
+        frames.append(pd.DataFrame({
+            "Lokasi": nama, "Lat": lat, "Lon": lon, "Tanggal": tanggal,
+            "Curah Hujan (mm)": np.round(rng.gamma(0.8, 6, hari), 1),
+            "Suhu Maks (°C)": np.round(rng.normal(32, 1.5, hari), 1),
+            "Suhu Min (°C)": np.round(rng.normal(24, 1.0, hari), 1),
+            "Kelembapan (%)": np.round(rng.uniform(65, 90, hari), 1),
+        }))
+    return hitung_irigasi(pd.concat(frames, ignore_index=True), THRESHOLD)
+
+
+def detik(fungsi):
+    t = time.perf_counter()
+    fungsi()
+    return time.perf_counter() - t
+
+
+def terbaik(df, fmt, per_lokasi, ulangan):
+    # Cache baru setiap ulangan supaya yang diukur selalu bangun penuh (zip ikut membangun keempat format)
+    detik(CacheEkspor().pembuat(df, fmt, "data_cuaca_kabupaten", per_lokasi))
+    return min(detik(CacheEkspor().pembuat(df, fmt, "data_cuaca_kabupaten", per_lokasi)) for _ in range(ulangan))
+
+
+def main(hari=HARI, ulangan=ULANGAN):
+    df = data_kabupaten(hari, np.random.default_rng(3))
+    print(f"{len(df):,} baris x {len(df.columns)} kolom")
+    cache = CacheEkspor()
+    hasil = {}
+    for label, fmt, per_lokasi in [("csv", "csv", False), ("xlsx", "xlsx", False),
+                                   ("xlsx_per_lokasi", "xlsx", True), ("html", "html", False),
+                                   ("parquet", "parquet", False), ("zip", "zip", False)]:
+        bangun = terbaik(df, fmt, per_lokasi, ulangan)
+        buat = cache.pembuat(df, fmt, "data_cuaca_kabupaten", per_lokasi)
+        buat()
+        tersimpan = detik(buat)
+        hasil[label] = bangun
+        assert len(buat()) > 0 and fmt in FORMAT_EKSPOR
+        print(f"  {label:16s} bangun {bangun * 1000:7.0f} ms   cache {tersimpan * 1000:5.1f} ms")
+
+    for label, batas in ANGGARAN_EKSPOR.items():
+        assert hasil[label] < batas, f"{label}: {hasil[label]:.2f} s melewati anggaran {batas} s"
+    print("anggaran terpenuhi: " + ", ".join(f"{k} < {v} s" for k, v in ANGGARAN_EKSPOR.items()))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
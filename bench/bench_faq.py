@@ -0,0 +1,77 @@
+import os
+import random
+import sys
+import time
+
+from rapidfuzz import fuzz, process
+
+AKAR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AKAR)
+os.chdir(AKAR)
+
+from faq import JAWABAN_DEFAULT, IndeksFAQ, muat_pasangan
+
+# ------------------ Benchmark Indeks FAQ ------------------
+# Pencarian linear lama (extractOne token_set_ratio atas semua pertanyaan setiap kueri) dibanding IndeksFAQ
+# (indeks terbalik prefiks kata, hanya kandidat yang diskor). Basis sintetis dibuat dari kosakata
+# data/faq.json; pada FAQ asli jawaban kedua cara harus sama.
+#
+#   python bench/bench_faq.py [jumlah_pasangan] [jumlah_kueri]
+PASANGAN = 50_000
+KUERI = 50
+KUERI_ASLI = [
+    "padi saya kuning", "cara mengatasi padi kuneng", "kapan waktu tanam jagung", "hama wereng",
+    "pupuk untuk kakao", "irigasi sawah musim kemarau", "harga gabah hari ini", "cuaca besok",
+]
+
+
+def cari_lama(pertanyaan, faq_list, threshold=70):
+    # Salinan cari_jawaban sebelum indeks (ap.py)
+    pertanyaan = pertanyaan.lower().strip()
+    hasil = process.extractOne(pertanyaan, [q for q, _ in faq_list], scorer=fuzz.token_set_ratio)
+    if hasil and hasil[1] >= threshold:
+        for q, a in faq_list:
+            if q == hasil[0]:
+                return a
+    return JAWABAN_DEFAULT
+
+
+def basis_sintetis(asli, jumlah, rng):
+    kata = sorted({k for q, _ in asli for k in q.lower().split()})
+    pasangan = list(asli)
+    while len(pasangan) < jumlah:
+        q = " ".join(rng.choice(kata) for _ in range(rng.randint(3, 8)))
+        pasangan.append((q, f"jawaban {len(pasangan)}"))
+    return pasangan, kata
+
+
+def ukur(fungsi, kueri):
+    t = time.perf_counter()
+    hasil = [fungsi(q) for q in kueri]
+    return (time.perf_counter() - t) / len(kueri) * 1000, hasil
+
+
+def main(jumlah=PASANGAN, jumlah_kueri=KUERI):
+    rng = random.Random(42)
+    asli = muat_pasangan()
+
+    indeks_asli = IndeksFAQ(asli)
+    sama = [indeks_asli.jawab(q) == cari_lama(q, asli) for q in KUERI_ASLI]
+    print(f"FAQ asli ({len(asli)} pasangan): {sum(sama)}/{len(sama)} jawaban sama dengan pencarian lama")
+    assert all(sama)
+
+    pasangan, kata = basis_sintetis(asli, jumlah, rng)
+    t = time.perf_counter()
+    indeks = IndeksFAQ(pasangan)
+    bangun = time.perf_counter() - t
+    kueri = [" ".join(rng.choice(kata) for _ in range(rng.randint(2, 5))) for _ in range(jumlah_kueri)]
+    kueri += [q for q, _ in rng.sample(pasangan, 10)]  # pertanyaan persis
+    lama, _ = ukur(lambda q: cari_lama(q, pasangan), kueri)
+    baru, hasil = ukur(indeks.jawab, kueri)
+    assert all(h != JAWABAN_DEFAULT for h in hasil[-10:]), "pertanyaan persis harus terjawab"
+    print(f"basis sintetis {len(pasangan):,} pasangan: indeks dibangun {bangun:.2f} s")
+    print(f"  per kueri: linear {lama:.1f} ms -> indeks {baru:.1f} ms ({lama / baru:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
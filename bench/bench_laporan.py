@@ -0,0 +1,85 @@
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+AKAR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AKAR)
+
+from laporan import FORMAT_TANGGAL, SQL_TAMBAH, StoreLaporan, _nilai
+
+# ------------------ Benchmark Sisip/Hapus Laporan ------------------
+# Sebelum: setiap kirim/hapus menulis ulang seluruh laporan_warga.json (json.dump indent=4).
+# Sesudah: satu transaksi SQLite kecil berdasarkan id (data/laporan.db, mode WAL).
+# Keduanya diisi dulu dengan `jumlah` laporan di folder sementara.
+#
+#   python bench/bench_laporan.py [jumlah_laporan] [ulangan]
+JUMLAH = 100_000
+ULANGAN = 200
+ULANGAN_JSON = 5
+JENIS = ["Hama", "Penyakit Tanaman", "Banjir", "Kekeringan", "Lainnya"]
+LOKASI = ["Maritengngae", "Watang Pulu", "Panca Rijang", "Tellu Limpoe", "Baranti", "Dua Pitue"]
+
+
+def buat_laporan(i, rng):
+    waktu = datetime(2024, 1, 1) + timedelta(minutes=7 * i)
+    return {
+        "Nama": f"Warga {i}", "Kontak": f"08{rng.randint(10**9, 10**10 - 1)}",
+        "Jenis": rng.choice(JENIS), "Lokasi": rng.choice(LOKASI),
+        "Deskripsi": f"laporan nomor {i} tanaman padi terserang hama di petak {rng.randint(1, 50)}",
+        "Waktu": waktu.isoformat(timespec="seconds"), "Tanggal": waktu.strftime(FORMAT_TANGGAL),
+        "Gambar": None,
+    }
+
+
+def ms_per(fungsi, ulangan):
+    t = time.perf_counter()
+    for i in range(ulangan):
+        fungsi(i)
+    return (time.perf_counter() - t) / ulangan * 1000
+
+
+def main(jumlah=JUMLAH, ulangan=ULANGAN):
+    rng = random.Random(7)
+    laporan = [buat_laporan(i, rng) for i in range(jumlah)]
+    folder = tempfile.mkdtemp(prefix="bench_laporan_")
+    try:
+        # JSON lama: satu laporan baru / satu hapus = tulis ulang seluruh daftar
+        path_json = os.path.join(folder, "laporan_warga.json")
+        daftar = list(laporan)
+
+        def simpan_json():
+            with open(path_json, "w", encoding="utf-8") as f:
+                json.dump(daftar, f, ensure_ascii=False, indent=4)
+
+        simpan_json()
+        json_tambah = ms_per(lambda i: (daftar.append(buat_laporan(jumlah + i, rng)), simpan_json()), ULANGAN_JSON)
+        json_hapus = ms_per(lambda i: (daftar.pop(rng.randrange(len(daftar))), simpan_json()), ULANGAN_JSON)
+
+        # SQLite: isi massal sekali, lalu ukur transaksi per laporan
+        store = StoreLaporan(os.path.join(folder, "laporan.db"))
+        with store._koneksi() as conn:
+            conn.executemany(SQL_TAMBAH, (_nilai(lap) for lap in laporan))
+        assert store.jumlah() == jumlah
+
+        baru = []
+        sql_tambah = ms_per(lambda i: baru.append(store.tambah(buat_laporan(jumlah + i, rng))), ulangan)
+        id_hapus = rng.sample(range(1, jumlah + 1), ulangan)
+        sql_hapus = ms_per(lambda i: store.hapus(id_hapus[i]), ulangan)
+        assert store.jumlah() == jumlah
+        assert all(store.ambil(i) is None for i in id_hapus)
+        assert sql_tambah < json_tambah and sql_hapus < json_hapus
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    print(f"{jumlah:,} laporan")
+    print(f"  tambah: json {json_tambah:8.1f} ms -> sqlite {sql_tambah:.2f} ms")
+    print(f"  hapus : json {json_hapus:8.1f} ms -> sqlite {sql_hapus:.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+AKAR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AKAR)
+os.chdir(AKAR)  # path data relatif terhadap akar repo, seperti saat aplikasi dijalankan
+
+from model_panen import RIWAYAT_PANEN_FILE, muat_model, prediksi
+
+# ------------------ Benchmark Model Prediksi Panen ------------------
+# Sebelum: setiap rerun membuat DataFrame latih, fit LinearRegression, lalu 5 kali predict satu baris.
+# Sesudah: model dimuat sekali per proses (cold start: latih + simpan, atau muat dari data/model) dan
+# setiap rerun hanya satu prediksi() untuk 5 baris. Model disimpan di folder sementara.
+#
+#   python bench/bench_model_panen.py [ulangan]
+ULANGAN = 200
+BARIS = [[3.0, 31.0, 78.0], [2.1, 32.5, 80.2], [4.0, 30.1, 77.0], [1.5, 33.0, 81.0], [np.nan, np.nan, np.nan]]
+
+
+def rerun_lama():
+    model_df = pd.DataFrame({
+        "Curah Hujan (mm)": [3.2, 1.0, 5.5, 0.0, 6.0],
+        "Suhu (°C)": [30, 32, 29, 31, 33],
+        "Kelembapan (%)": [75, 80, 78, 82, 79],
+        "Hasil Panen (kg/ha)": [5100, 4800, 5300, 4500, 5500]
+    })
+    model = LinearRegression().fit(model_df.drop("Hasil Panen (kg/ha)", axis=1), model_df["Hasil Panen (kg/ha)"])
+    return [model.predict([b])[0] if not np.isnan(b).any() else 0 for b in BARIS]
+
+
+def ukur(fungsi, ulangan):
+    t = time.perf_counter()
+    for _ in range(ulangan):
+        hasil = fungsi()
+    return (time.perf_counter() - t) / ulangan * 1000, hasil
+
+
+def main(ulangan=ULANGAN):
+    warnings.simplefilter("ignore")  # predict tanpa nama fitur pada pola lama
+    with tempfile.TemporaryDirectory() as folder:
+        t = time.perf_counter()
+        model, versi = muat_model(RIWAYAT_PANEN_FILE, folder)
+        dingin = (time.perf_counter() - t) * 1000
+        muat, (model_muat, versi_muat) = ukur(lambda: muat_model(RIWAYAT_PANEN_FILE, folder), 20)
+        assert versi_muat == versi and os.listdir(folder) == [f"model_panen_{versi}.joblib"]
+
+    lama, hasil_lama = ukur(rerun_lama, ulangan)
+    baru, hasil_baru = ukur(lambda: prediksi(model_muat, BARIS), ulangan)
+    # Data benih = lima baris yang dulu tertanam di ap.py, jadi prediksinya harus sama
+    assert np.allclose(hasil_lama, hasil_baru)
+    print(f"cold start: latih + simpan {dingin:.1f} ms, muat dari disk {muat:.2f} ms")
+    print(f"per rerun:  fit + 5 predict {lama:.2f} ms -> 1 prediksi() batch {baru:.3f} ms ({lama / baru:.0f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
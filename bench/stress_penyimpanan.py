@@ -0,0 +1,139 @@
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from penyimpanan import BerkasJSON, KonflikTulis
+
+# ------------------ Uji Beban BerkasJSON (banyak proses penulis) ------------------
+# Menjalankan N proses yang menulis ke satu file JSON bersamaan, ditambah satu proses pembaca mentah:
+#   1. ubah(): setiap proses menambah ITEM item; tidak boleh ada pembaruan yang hilang
+#   2. tulis(versi=...): penulisan optimistis; setiap penulisan yang berhasil harus ada di file dan
+#      sisanya harus ditolak sebagai KonflikTulis (berhasil + konflik = jumlah percobaan)
+#   3. selama keduanya, pembaca tidak pernah melihat JSON setengah jadi
+#   4. pembanding: pola lama baca lalu open("w") kehilangan pembaruan
+#
+#   python bench/stress_penyimpanan.py [jumlah_proses] [item_per_proses]
+PROSES = 16
+ITEM = 50
+
+
+def penulis_ubah(path, id_proses, item, mulai):
+    berkas = BerkasJSON(path)
+    mulai.wait()
+    for i in range(item):
+        berkas.ubah(lambda data: data + [f"{id_proses}-{i}"])
+
+
+def penulis_optimis(path, id_proses, item, mulai, hasil):
+    berkas = BerkasJSON(path)
+    berhasil, konflik = [], 0
+    mulai.wait()
+    for i in range(item):
+        data, versi = berkas.baca()
+        nilai = f"{id_proses}-{i}"
+        try:
+            berkas.tulis(data + [nilai], versi)
+            berhasil.append(nilai)
+        except KonflikTulis:
+            konflik += 1
+    hasil.put((berhasil, konflik))
+
+
+def penulis_lama(path, id_proses, item, mulai):
+    # Pola sebelum BerkasJSON: baca, ubah, tulis ulang dengan "w" tanpa kunci
+    mulai.wait()
+    for i in range(item):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = []
+        data.append(f"{id_proses}-{i}")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+
+def pembaca(path, berhenti, hasil):
+    # Membaca file mentah (tanpa cache BerkasJSON) sesering mungkin
+    baca = rusak = 0
+    while not berhenti.is_set():
+        try:
+            with open(path, "rb") as f:
+                isi = f.read()
+        except FileNotFoundError:
+            continue
+        baca += 1
+        try:
+            json.loads(isi.decode("utf-8"))
+        except ValueError:
+            rusak += 1
+    hasil.put((baca, rusak))
+
+
+def jalankan(target, path, proses, item, dengan_hasil=False):
+    mulai, berhenti, hasil, hasil_baca = mp.Event(), mp.Event(), mp.Queue(), mp.Queue()
+    pb = mp.Process(target=pembaca, args=(path, berhenti, hasil_baca))
+    pb.start()
+    args = lambda i: (path, i, item, mulai, hasil) if dengan_hasil else (path, i, item, mulai)
+    daftar = [mp.Process(target=target, args=args(i)) for i in range(proses)]
+    for p in daftar:
+        p.start()
+    t = time.perf_counter()
+    mulai.set()
+    keluaran = [hasil.get() for _ in daftar] if dengan_hasil else []
+    for p in daftar:
+        p.join()
+        assert p.exitcode == 0, f"proses penulis gagal ({p.exitcode})"
+    lama = time.perf_counter() - t
+    berhenti.set()
+    baca, rusak = hasil_baca.get()
+    pb.join()
+    return lama, keluaran, baca, rusak
+
+
+def main(proses=PROSES, item=ITEM):
+    with tempfile.TemporaryDirectory(prefix="stress_penyimpanan_") as folder:
+        uji(folder, proses, item)
+
+
+def uji(folder, proses, item):
+    path = os.path.join(folder, "ubah.json")
+    lama, _, baca, rusak = jalankan(penulis_ubah, path, proses, item)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    diharapkan = {f"{p}-{i}" for p in range(proses) for i in range(item)}
+    print(f"ubah():  {proses} proses x {item} item dalam {lama:.2f} s -> {len(data)} item, "
+          f"pembaca {baca} kali baca, {rusak} JSON rusak")
+    assert len(data) == len(diharapkan) and set(data) == diharapkan, "ada pembaruan yang hilang"
+    assert rusak == 0, "pembaca melihat JSON setengah jadi"
+
+    path = os.path.join(folder, "optimis.json")
+    lama, keluaran, baca, rusak = jalankan(penulis_optimis, path, proses, item, dengan_hasil=True)
+    berhasil = [v for b, _ in keluaran for v in b]
+    konflik = sum(k for _, k in keluaran)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    print(f"tulis(): {len(berhasil)} berhasil, {konflik} KonflikTulis dalam {lama:.2f} s -> {len(data)} item, "
+          f"pembaca {baca} kali baca, {rusak} JSON rusak")
+    assert len(berhasil) + konflik == proses * item, "jumlah percobaan tidak cocok"
+    assert sorted(data) == sorted(berhasil), "penulisan yang berhasil tidak ada di file (atau sebaliknya)"
+    assert proses == 1 or konflik > 0, "penulisan bersamaan tidak pernah terdeteksi sebagai konflik"
+    assert rusak == 0, "pembaca melihat JSON setengah jadi"
+
+    path = os.path.join(folder, "lama.json")
+    lama, _, baca, rusak = jalankan(penulis_lama, path, proses, item)
+    try:
+        with open(path, encoding="utf-8") as f:
+            tersisa = len(json.load(f))
+    except ValueError:
+        tersisa = 0
+    print(f"pola lama (tanpa kunci): {tersisa} dari {proses * item} item tersisa, {rusak} JSON rusak terbaca")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,45 @@
+import glob
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ------------------ Server Open-Meteo Palsu untuk Benchmark ------------------
+# Menyajikan payload fixture (data/fixture/open_meteo_*.json) untuk setiap lokasi dengan jeda tetap per
+# permintaan, meniru latensi jaringan ke upstream. HTTP/1.1 supaya koneksi keep-alive bisa dipakai ulang.
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "fixture")
+
+
+def payload_fixture():
+    path = sorted(glob.glob(os.path.join(FIXTURE_DIR, "open_meteo_*.json")))[-1]
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def jalankan_stub(jeda=0.03):
+    # -> (url forecast, server); server.jumlah = jumlah permintaan yang dilayani
+    isi = json.dumps(payload_fixture()).encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(jeda)
+            with server.lock:
+                server.jumlah += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(isi)))
+            self.end_headers()
+            self.wfile.write(isi)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.jumlah = 0
+    server.lock = threading.Lock()  # satu thread per permintaan: += tidak atomik
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/v1/forecast", server
@@ -0,0 +1,97 @@
+import sys
+import threading
+import time
+from types import MappingProxyType
+
+# ------------------ Data Bersama Satu Proses ------------------
+# Satu salinan setiap dataset referensi (harga, pengingat) untuk semua sesi. Data dibekukan
+# (tuple & mappingproxy) sehingga sesi membacanya langsung tanpa menyalin dan tanpa risiko
+# mengubah milik sesi lain. Setiap penulisan menaikkan nomor versi; sesi membandingkannya
+# dengan versi yang terakhir dilihat untuk tahu kapan harus memuat ulang tampilan.
+
+
+def bekukan(data):
+    if isinstance(data, (list, tuple)):
+        return tuple(bekukan(v) for v in data)
+    if isinstance(data, dict):
+        return MappingProxyType({k: bekukan(v) for k, v in data.items()})
+    return data
+
+
+def ukuran_objek(data, _dilihat=None):
+    # Perkiraan memori (byte) termasuk isi list/dict; objek yang dipakai bersama dihitung sekali
+    _dilihat = set() if _dilihat is None else _dilihat
+    if id(data) in _dilihat:
+        return 0
+    _dilihat.add(id(data))
+    total = sys.getsizeof(data)
+    if isinstance(data, MappingProxyType):
+        data = dict(data)
+    if isinstance(data, dict):
+        total += sum(ukuran_objek(k, _dilihat) + ukuran_objek(v, _dilihat) for k, v in data.items())
+    elif isinstance(data, (list, tuple, set)):
+        total += sum(ukuran_objek(v, _dilihat) for v in data)
+    return total
+
+
+class DataBersama:
+    # sumber: objek dengan baca() -> (data, versi) dan cap() -> penanda perubahan file (BerkasJSON).
+    # Perubahan file oleh proses lain terdeteksi lewat cap(), paling sering tiap `interval` detik.
+    def __init__(self, interval=2):
+        self.interval = interval
+        self.versi = 0
+        self._sumber = {}
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def daftar(self, nama, sumber):
+        with self._lock:
+            if nama not in self._sumber:
+                self._sumber[nama] = sumber
+
+    def _muat(self, nama):
+        sumber = self._sumber[nama]
+        cap = sumber.cap()
+        data, versi_sumber = sumber.baca()
+        self._data[nama] = {
+            "data": bekukan(data), "versi_sumber": versi_sumber, "cap": cap,
+            "dicek": time.monotonic(),
+        }
+
+    def baca(self, nama):
+        entri = self._data.get(nama)
+        if entri is not None and time.monotonic() - entri["dicek"] < self.interval:
+            return entri["data"]
+        with self._lock:
+            entri = self._data.get(nama)
+            if entri is None:
+                self._muat(nama)
+            elif time.monotonic() - entri["dicek"] >= self.interval:
+                if self._sumber[nama].cap() != entri["cap"]:
+                    self.versi += 1
+                    self._muat(nama)
+                else:
+                    entri["dicek"] = time.monotonic()
+            return self._data[nama]["data"]
+
+    def versi_sumber(self, nama):
+        self.baca(nama)
+        return self._data[nama]["versi_sumber"]
+
+    def segarkan(self, nama):
+        # Dipanggil setelah menulis ke sumber: muat ulang dan naikkan versi
+        with self._lock:
+            self.versi += 1
+            self._muat(nama)
+        return self.versi
+
+    def tandai(self, nama):
+        # Untuk dataset yang disimpan di luar objek ini (mis. laporan di SQLite): naikkan versi saja
+        with self._lock:
+            self.versi += 1
+        return self.versi
+
+    def ukuran(self):
+        # {nama: byte} untuk dataset yang dipegang di memori proses ini
+        with self._lock:
+            return {nama: ukuran_objek(e["data"]) for nama, e in self._data.items()}
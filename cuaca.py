@@ -0,0 +1,271 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ------------------ Konfigurasi Open-Meteo ------------------
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+PARAM_CUACA = {
+    "daily": "temperature_2m_min,temperature_2m_max,precipitation_sum,relative_humidity_2m_mean",
+    "hourly": "temperature_2m,precipitation,relative_humidity_2m",
+    "timezone": "auto",
+}
+CACHE_CUACA_FILE = "data/cache_cuaca.json"
+BATAS_CACHE_CUACA = 2000  # koordinat; grid kabupaten rapat ~200 titik
+JEDA_SIMPAN_CUACA = 5  # detik; penulisan file cache digabung dalam jendela ini
+
+
+def buat_session(retries=3, backoff=0.5, pool=20):
+    # Session bersama: koneksi keep-alive dipakai ulang, retry terbatas dengan backoff
+    retry = Retry(
+        total=retries, connect=retries, read=retries, backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",),
+    )
+    adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def kunci_lokasi(lat, lon, presisi=2):
+    # Koordinat dibulatkan (2 desimal ≈ 1 km) supaya titik yang berdekatan berbagi cache
+    return f"{round(lat, presisi):.{presisi}f},{round(lon, presisi):.{presisi}f}"
+
+
+class KlienCuaca:
+    # Cache prakiraan per koordinat dengan TTL: data yang kedaluwarsa tetap dikembalikan
+    # langsung sementara pembaruan berjalan di thread latar belakang. Cache berupa LRU berbatas
+    # `batas` koordinat; beberapa miss bersamaan untuk koordinat yang sama berbagi satu unduhan.
+    # File cache ditulis paling sering sekali per `jeda_simpan` detik (dan sekali di akhir ambil_banyak),
+    # bukan setiap kali satu koordinat diperbarui.
+    def __init__(self, base_url=OPEN_METEO_URL, ttl=900, presisi=2,
+                 cache_file=CACHE_CUACA_FILE, timeout=(3.05, 10), session=None,
+                 batas=BATAS_CACHE_CUACA, jeda_simpan=JEDA_SIMPAN_CUACA):
+        self.base_url = base_url
+        self.session = session or buat_session()
+        self.ttl = ttl
+        self.presisi = presisi
+        self.cache_file = cache_file
+        self.timeout = timeout
+        self.batas = batas
+        self.jeda_simpan = jeda_simpan
+        self.stats = {
+            "hit": 0, "stale": 0, "miss": 0, "gabung": 0, "refresh": 0, "gagal": 0, "gagal_pendengar": 0,
+            "buang": 0, "simpan": 0,
+        }
+        self._cache = OrderedDict()
+        self._sedang_refresh = set()
+        self._menunggu = {}  # kunci -> threading.Event untuk miss yang sedang diunduh
+        self._kotor = False
+        self._timer_simpan = None
+        self._lock = threading.Lock()
+        self._lock_berkas = threading.Lock()
+        # Dipanggil pendengar(kunci, data) setiap payload baru berhasil diunduh (mis. arsip snapshot)
+        self.pendengar = []
+        self._muat_cache()
+
+    # ---------- API utama ----------
+    def ambil(self, lat, lon):
+        kunci = kunci_lokasi(lat, lon, self.presisi)
+        with self._lock:
+            entri = self._cache.get(kunci)
+            if entri is None:
+                self.stats["miss"] += 1
+            elif time.time() - entri["waktu"] < self.ttl:
+                self.stats["hit"] += 1
+                self._cache.move_to_end(kunci)
+                return entri["data"]
+            else:
+                self.stats["stale"] += 1
+                self._cache.move_to_end(kunci)
+
+        if entri is None:
+            # Belum pernah diambil: tidak ada data lama, jadi harus menunggu upstream
+            return self._perbarui_tunggal(kunci)
+
+        self._perbarui_latar(kunci)
+        return entri["data"]
+
+    def ambil_banyak(self, lokasi, max_workers=8):
+        # lokasi: list of (nama, lat, lon); diambil paralel lewat session yang sama
+        def satu(item):
+            nama, lat, lon = item
+            try:
+                return nama, lat, lon, self.ambil(lat, lon)
+            except (requests.RequestException, ValueError):
+                return nama, lat, lon, None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            hasil = list(pool.map(satu, lokasi))
+        self.simpan()
+
+        frames = []
+        gagal = []
+        for nama, lat, lon, data in hasil:
+            if data is None:
+                gagal.append(nama)
+                continue
+            df = buat_df_harian(data)
+            df.insert(0, "Lokasi", nama)
+            df.insert(1, "Lat", lat)
+            df.insert(2, "Lon", lon)
+            frames.append(df)
+        df_semua = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        df_semua.attrs["gagal"] = gagal
+        return df_semua
+
+    def umur(self, lat, lon):
+        entri = self._cache.get(kunci_lokasi(lat, lon, self.presisi))
+        return None if entri is None else time.time() - entri["waktu"]
+
+    # ---------- Upstream ----------
+    def _unduh(self, kunci):
+        lat, lon = kunci.split(",")
+        params = dict(PARAM_CUACA, latitude=lat, longitude=lon)
+        resp = self.session.get(self.base_url, params=params, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    def _perbarui(self, kunci):
+        try:
+            data = self._unduh(kunci)
+        except (requests.RequestException, ValueError):
+            with self._lock:
+                self.stats["gagal"] += 1
+                entri = self._cache.get(kunci)
+            if entri is None:
+                raise
+            # Upstream gagal: pakai payload terakhir yang berhasil
+            return entri["data"]
+
+        with self._lock:
+            self.stats["refresh"] += 1
+            self._cache[kunci] = {"data": data, "waktu": time.time()}
+            self._cache.move_to_end(kunci)
+            while len(self._cache) > self.batas:
+                self._cache.popitem(last=False)
+                self.stats["buang"] += 1
+        self._jadwalkan_simpan()
+        for fungsi in self.pendengar:
+            # Pendengar yang gagal tidak boleh menggagalkan pengambilan yang sudah berhasil
+            try:
+                fungsi(kunci, data)
+            except Exception:
+                with self._lock:
+                    self.stats["gagal_pendengar"] += 1
+        return data
+
+    def _perbarui_tunggal(self, kunci):
+        # Miss bersamaan untuk kunci yang sama: satu thread mengunduh, sisanya menunggu hasilnya
+        with self._lock:
+            selesai = self._menunggu.get(kunci)
+            pemilik = selesai is None
+            if pemilik:
+                selesai = self._menunggu[kunci] = threading.Event()
+            else:
+                self.stats["gabung"] += 1
+        if not pemilik:
+            selesai.wait()
+            with self._lock:
+                entri = self._cache.get(kunci)
+            if entri is None:
+                raise requests.RequestException(f"Pengambilan prakiraan {kunci} gagal")
+            return entri["data"]
+        try:
+            return self._perbarui(kunci)
+        finally:
+            with self._lock:
+                del self._menunggu[kunci]
+            selesai.set()
+
+    def _perbarui_latar(self, kunci):
+        with self._lock:
+            if kunci in self._sedang_refresh:
+                return
+            self._sedang_refresh.add(kunci)
+
+        def kerja():
+            try:
+                self._perbarui(kunci)
+            except (requests.RequestException, ValueError):
+                pass
+            finally:
+                with self._lock:
+                    self._sedang_refresh.discard(kunci)
+
+        threading.Thread(target=kerja, daemon=True).start()
+
+    # ---------- Cache di disk ----------
+    def _muat_cache(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        with open(self.cache_file, "r", encoding="utf-8") as f:
+            try:
+                isi = json.load(f)
+            except json.JSONDecodeError:
+                isi = {}
+        # File ditulis dalam urutan LRU (yang terakhir dipakai paling akhir), dipotong ke batas
+        self._cache = OrderedDict(list(isi.items())[-self.batas:])
+
+    def _jadwalkan_simpan(self):
+        if not self.cache_file:
+            return
+        with self._lock:
+            self._kotor = True
+            if self._timer_simpan is not None:
+                return
+            self._timer_simpan = threading.Timer(self.jeda_simpan, self.simpan)
+            self._timer_simpan.daemon = True
+        self._timer_simpan.start()
+
+    def simpan(self):
+        # Tulis file cache jika ada perubahan sejak penulisan terakhir. Di bawah lock hanya disalin
+        # daftar entri (payload tidak pernah diubah setelah disimpan); json.dumps & tulis di luar lock.
+        if not self.cache_file:
+            return
+        with self._lock_berkas:
+            with self._lock:
+                self._timer_simpan = None
+                if not self._kotor:
+                    return
+                self._kotor = False
+                salinan = dict(self._cache)
+            isi = json.dumps(salinan, ensure_ascii=False)
+            folder = os.path.dirname(self.cache_file)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder, exist_ok=True)
+            tmp = f"{self.cache_file}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(isi)
+            os.replace(tmp, self.cache_file)
+            with self._lock:
+                self.stats["simpan"] += 1
+
+
+# ------------------ Payload -> DataFrame ------------------
+def buat_df_harian(data):
+    return pd.DataFrame({
+        "Tanggal": pd.to_datetime(data["daily"]["time"]),
+        "Curah Hujan (mm)": np.round(data["daily"]["precipitation_sum"], 1),
+        "Suhu Maks (°C)": np.round(data["daily"]["temperature_2m_max"], 1),
+        "Suhu Min (°C)": np.round(data["daily"]["temperature_2m_min"], 1),
+        "Kelembapan (%)": np.round(data["daily"]["relative_humidity_2m_mean"], 1)
+    })
+
+
+def buat_df_jam(data):
+    return pd.DataFrame({
+        "Waktu": pd.to_datetime(data["hourly"]["time"]),
+        "Curah Hujan (mm)": data["hourly"]["precipitation"],
+        "Suhu (°C)": data["hourly"]["temperature_2m"],
+        "Kelembapan (%)": data["hourly"]["relative_humidity_2m"]
+    })
@@ -0,0 +1,424 @@
+import csv
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from html import escape
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, quote, urlsplit
+
+import pandas as pd
+import xlsxwriter
+
+# ------------------ Ekspor Data Cuaca (CSV / Excel / HTML / Parquet / ZIP) ------------------
+# Setiap format dibuat hanya saat diminta (tombol unduh diklik), lalu byte hasilnya disimpan
+# di cache LRU berdasarkan sidik isi DataFrame + parameter, sehingga rerun dan sesi lain
+# dengan data yang sama tidak membangun ulang file.
+FORMAT_EKSPOR = {
+    "csv": ("text/csv", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "html": ("text/html", "html"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "zip": ("application/zip", "zip"),
+}
+BATAS_CACHE_EKSPOR = 64 * 1024 * 1024  # byte
+# Anggaran waktu bangun (detik, terbaik dari beberapa ulangan) untuk satu tahun data seluruh kecamatan
+# (4015 baris, 12 kolom); diperiksa oleh bench/bench_ekspor.py. Sebagian besar waktu xlsx ada di
+# serialisasi XML xlsxwriter saat close() (~0.45 s satu sheet), jadi anggaran diberi ruang ~1.5x.
+ANGGARAN_EKSPOR = {"xlsx": 0.8, "xlsx_per_lokasi": 2.0}
+EPOCH_EXCEL = pd.Timestamp("1899-12-30")
+
+
+def sidik_df(df, *parameter):
+    h = hashlib.sha1()
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    h.update(repr((list(df.columns), parameter)).encode("utf-8"))
+    return h.hexdigest()
+
+
+def saring_tanggal(df, mulai=None, sampai=None, kolom="Tanggal"):
+    if mulai is not None:
+        df = df[df[kolom] >= pd.Timestamp(mulai)]
+    if sampai is not None:
+        df = df[df[kolom] < pd.Timestamp(sampai) + pd.Timedelta(days=1)]
+    return df
+
+
+def ke_csv(df):
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def _tulis_lembar(wb, ws, df, fmt_tanggal, fmt_judul):
+    # Ditulis per kolom dengan write_column (jauh lebih cepat dari to_excel sel per sel);
+    # tanggal dikirim sebagai nomor seri Excel + format tanggal, NaN jadi sel kosong
+    for j, kolom in enumerate(df.columns):
+        ws.write(0, j, kolom, fmt_judul)
+        nilai = df[kolom]
+        fmt = None
+        if pd.api.types.is_datetime64_any_dtype(nilai):
+            nilai = (nilai - EPOCH_EXCEL) / pd.Timedelta(days=1)
+            fmt = fmt_tanggal
+        isi = nilai.astype(object).where(nilai.notna(), None).tolist()
+        ws.write_column(1, j, isi, fmt)
+    ws.set_column(0, len(df.columns) - 1, 15)
+    ws.freeze_panes(1, 0)
+
+
+def ke_excel(df, nama_sheet="Cuaca Harian", per_lokasi=False):
+    # Satu sheet gabungan; jika per_lokasi dan ada kolom Lokasi, ditambah satu sheet per lokasi
+    buf = BytesIO()
+    wb = xlsxwriter.Workbook(buf, {"in_memory": True})
+    fmt_tanggal = wb.add_format({"num_format": "yyyy-mm-dd"})
+    fmt_judul = wb.add_format({"bold": True})
+    lembar = [(nama_sheet, df)]
+    if per_lokasi and "Lokasi" in df.columns:
+        lembar += [(str(lokasi)[:31], bagian) for lokasi, bagian in df.groupby("Lokasi", sort=False)]
+    for nama, bagian in lembar:
+        _tulis_lembar(wb, wb.add_worksheet(nama), bagian, fmt_tanggal, fmt_judul)
+    wb.close()
+    return buf.getvalue()
+
+
+def _sel_html(kolom):
+    if pd.api.types.is_datetime64_any_dtype(kolom):
+        kolom = kolom.dt.strftime("%Y-%m-%d")
+    teks = kolom.astype(object).where(kolom.notna(), "").map(str).map(escape)
+    return "<td>" + teks + "</td>"
+
+
+def ke_html(df, judul="Laporan Cuaca Harian"):
+    # Tabel dirakit per kolom dengan operasi string vektor; DataFrame.to_html lambat untuk ribuan baris
+    baris = ["<tr>" + "".join(sel) + "</tr>" for sel in zip(*(_sel_html(df[k]) for k in df.columns))]
+    kepala = "".join(f"<th>{escape(str(k))}</th>" for k in df.columns)
+    return (
+        f"<html><head><meta charset='utf-8'><title>{escape(judul)}</title></head><body>"
+        f"<h2>{escape(judul)}</h2><table border='1' class='dataframe'><thead><tr>{kepala}</tr></thead>"
+        f"<tbody>{''.join(baris)}</tbody></table></body></html>"
+    ).encode("utf-8")
+
+
+def ke_parquet(df):
+    buf = BytesIO()
+    df.to_parquet(buf, index=False)
+    return buf.getvalue()
+
+
+class CacheEkspor:
+    # Satu objek per proses; aman dipanggil dari thread unduhan Streamlit
+    def __init__(self, batas_byte=BATAS_CACHE_EKSPOR):
+        self.batas_byte = batas_byte
+        self._cache = OrderedDict()
+        self._ukuran = 0
+        self._lock = threading.Lock()
+        self.stats = {"hit": 0, "bangun": 0}
+
+    def _bangun(self, df, fmt, nama, per_lokasi):
+        if fmt == "csv":
+            return ke_csv(df)
+        if fmt == "xlsx":
+            return ke_excel(df, per_lokasi=per_lokasi)
+        if fmt == "html":
+            return ke_html(df)
+        if fmt == "parquet":
+            return ke_parquet(df)
+        if fmt == "zip":
+            buf = BytesIO()
+            with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+                for f in ("csv", "xlsx", "html", "parquet"):
+                    zf.writestr(f"{nama}.{FORMAT_EKSPOR[f][1]}", self.ambil(df, f, nama, per_lokasi))
+            return buf.getvalue()
+        raise ValueError(f"Format ekspor tidak dikenal: {fmt!r}")
+
+    def ambil(self, df, fmt, nama="data_cuaca_harian", per_lokasi=False, sidik=None):
+        kunci = (sidik or sidik_df(df, nama, per_lokasi), fmt)
+        with self._lock:
+            data = self._cache.get(kunci)
+            if data is not None:
+                self._cache.move_to_end(kunci)
+                self.stats["hit"] += 1
+                return data
+        data = self._bangun(df, fmt, nama, per_lokasi)
+        with self._lock:
+            self.stats["bangun"] += 1
+            if kunci not in self._cache:
+                self._cache[kunci] = data
+                self._ukuran += len(data)
+            while self._ukuran > self.batas_byte and len(self._cache) > 1:
+                _, lama = self._cache.popitem(last=False)
+                self._ukuran -= len(lama)
+        return data
+
+    def pembuat(self, df, fmt, nama="data_cuaca_harian", per_lokasi=False, sidik=None):
+        # Callable tanpa argumen untuk st.download_button(data=...): file dibuat saat tombol diklik.
+        # Sidik dihitung sekarang (sekali untuk semua format), jadi data yang kemudian berubah tidak tercampur.
+        sidik = sidik or sidik_df(df, nama, per_lokasi)
+        return lambda: self.ambil(df, fmt, nama, per_lokasi, sidik=sidik)
+
+
+# ------------------ Ekspor Bertahap (Laporan Warga / Arsip Harga) ------------------
+# Arsip besar ditulis potongan demi potongan langsung dari SQLite ke file di disk: CSV lewat
+# csv.writer, XLSX lewat xlsxwriter mode constant_memory (setiap baris langsung dibuang ke file
+# sementara). Memori puncak ditentukan ukuran potongan, bukan jumlah baris.
+EKSPOR_DIR = "data/ekspor"
+UKURAN_POTONGAN = 5000
+BARIS_MAKS_XLSX = 1048575  # batas baris per sheet Excel, di luar baris judul
+BATAS_FOTO_XLSX = 2000  # foto disimpan xlsxwriter di memori sampai file ditutup
+TINGGI_BARIS_FOTO = 75  # point, cukup untuk foto 96 px
+SIMPAN_EKSPOR = 6 * 3600  # detik; file hasil yang lebih tua dihapus
+PORT_UNDUH = 8766
+POTONGAN_UNDUH = 256 * 1024  # byte per write saat file dikirim dari disk
+# Nama file hasil di EKSPOR_DIR: <nama>_<id 12 heksa>.<ext>; id acak jadi nama tidak bisa ditebak
+POLA_BERKAS = re.compile(r"^[\w-]+_([0-9a-f]{12})\.(csv|xlsx)$")
+
+
+class EksporKedaluwarsa(LookupError):
+    # Pekerjaan tidak dikenal, sudah dibersihkan, atau filenya sudah tidak ada
+    pass
+
+
+def _tulis_csv(path, kolom, potongan, progres):
+    n = 0
+    # utf-8-sig supaya Excel membaca huruf non-ASCII dengan benar
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        penulis = csv.writer(f)
+        penulis.writerow(kolom)
+        for bagian in potongan:
+            penulis.writerows(bagian)
+            n += len(bagian)
+            progres(n)
+    return n
+
+
+def _tulis_xlsx(path, kolom, potongan, progres, kolom_waktu=(), foto=None, kolom_foto=None):
+    # kolom_waktu: indeks kolom berisi teks ISO 8601 (ditulis sebagai tanggal Excel).
+    # foto: fungsi(path foto) -> byte PNG/JPEG atau None; gambarnya masuk kolom "Foto" di akhir.
+    wb = xlsxwriter.Workbook(path, {
+        "constant_memory": True, "default_date_format": "yyyy-mm-dd hh:mm", "remove_timezone": True,
+        "strings_to_urls": False,
+    })
+    fmt_judul = wb.add_format({"bold": True})
+    judul = list(kolom) + (["Foto"] if foto else [])
+    ws, r, n, n_foto = None, 0, 0, 0
+    for bagian in potongan:
+        for b in bagian:
+            if ws is None or r > BARIS_MAKS_XLSX:
+                ws = wb.add_worksheet("Data" if ws is None else f"Data ({len(wb.worksheets()) + 1})")
+                ws.write_row(0, 0, judul, fmt_judul)
+                ws.set_column(0, len(judul) - 1, 18)
+                ws.freeze_panes(1, 0)
+                r = 1
+            if kolom_waktu:
+                b = list(b)
+                for i in kolom_waktu:
+                    if b[i]:
+                        b[i] = datetime.fromisoformat(b[i])
+            if foto and b[kolom_foto] and n_foto < BATAS_FOTO_XLSX:
+                data = foto(b[kolom_foto])
+                if data:
+                    # Dalam mode constant_memory tinggi baris harus diatur sebelum baris ditulis
+                    ws.set_row(r, TINGGI_BARIS_FOTO)
+                    ws.insert_image(r, len(kolom), "foto.png", {"image_data": BytesIO(data), "object_position": 1})
+                    n_foto += 1
+            ws.write_row(r, 0, b)
+            r += 1
+        n += len(bagian)
+        progres(n)
+    if ws is None:
+        wb.add_worksheet("Data").write_row(0, 0, judul, fmt_judul)
+    wb.close()
+    return n
+
+
+def tulis_bertahap(path, fmt, kolom, potongan, progres=None, **opsi):
+    # Tulis iterator potongan (list tuple) ke `path` secara atomik; mengembalikan jumlah baris
+    progres = progres or (lambda n: None)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        if fmt == "csv":
+            n = _tulis_csv(tmp, kolom, potongan, progres)
+        elif fmt == "xlsx":
+            n = _tulis_xlsx(tmp, kolom, potongan, progres, **opsi)
+        else:
+            raise ValueError(f"Format ekspor bertahap tidak dikenal: {fmt!r}")
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return n
+
+
+class AntrianEkspor:
+    # Satu objek per proses. Pekerjaan ekspor dijalankan worker latar sehingga UI tetap responsif;
+    # status & progres dibaca lewat id pekerjaan. File hasil di folder dihapus setelah `simpan` detik
+    # (berdasarkan mtime, termasuk sisa proses sebelumnya); id yang tidak dikenal berstatus "kedaluwarsa".
+    def __init__(self, folder=EKSPOR_DIR, max_workers=1, simpan=SIMPAN_EKSPOR):
+        self.folder = folder
+        self.simpan = simpan
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ekspor")
+        self._job = {}
+        self._lock = threading.Lock()
+        self._bersihkan()
+
+    def mulai(self, nama, fmt, kolom, sumber, total=None, **opsi):
+        # sumber: fungsi tanpa argumen -> iterator potongan. Dipanggil di thread worker, jadi
+        # koneksi SQLite per-thread milik store dibuka di sana.
+        self._bersihkan()
+        id_job = uuid.uuid4().hex[:12]
+        ext = FORMAT_EKSPOR[fmt][1]
+        nama_aman = re.sub(r"[^\w-]", "_", nama)
+        with self._lock:
+            self._job[id_job] = {
+                "id": id_job, "fmt": fmt, "status": "antri", "selesai": 0, "total": total,
+                "path": os.path.join(self.folder, f"{nama_aman}_{id_job}.{ext}"),
+                "file": f"{nama}_{datetime.now():%Y%m%d_%H%M}.{ext}",
+                "ukuran": None, "galat": None, "dibuat": time.time(), "durasi": None,
+            }
+        self._pool.submit(self._jalankan, id_job, kolom, sumber, opsi)
+        return id_job
+
+    def _ubah(self, id_job, **nilai):
+        with self._lock:
+            self._job[id_job].update(nilai)
+
+    def _jalankan(self, id_job, kolom, sumber, opsi):
+        job = self.status(id_job)
+        self._ubah(id_job, status="berjalan")
+        t0 = time.perf_counter()
+        try:
+            n = tulis_bertahap(
+                job["path"], job["fmt"], kolom, sumber(),
+                progres=lambda n: self._ubah(id_job, selesai=n), **opsi,
+            )
+        except Exception as e:  # dilaporkan ke UI lewat status, worker tetap hidup
+            self._ubah(id_job, status="gagal", galat=str(e), durasi=time.perf_counter() - t0)
+            return
+        self._ubah(
+            id_job, status="selesai", selesai=n, total=n,
+            ukuran=os.path.getsize(job["path"]), durasi=time.perf_counter() - t0,
+        )
+
+    def status(self, id_job):
+        with self._lock:
+            job = self._job.get(id_job)
+            return dict(job) if job else {"id": id_job, "status": "kedaluwarsa"}
+
+    def berjalan(self, id_job):
+        return self.status(id_job)["status"] in ("antri", "berjalan")
+
+    def berkas(self, id_job):
+        # Path file hasil pekerjaan yang selesai; EksporKedaluwarsa jika sudah tidak tersedia
+        job = self.status(id_job)
+        if job["status"] != "selesai" or not os.path.exists(job["path"]):
+            raise EksporKedaluwarsa(f"File ekspor {id_job} sudah kedaluwarsa, silakan ekspor ulang.")
+        return job["path"]
+
+    def baca(self, id_job):
+        # Seluruh isi file di memori, untuk st.download_button saat server unduhan tidak dipakai
+        with open(self.berkas(id_job), "rb") as f:
+            return f.read()
+
+    def _bersihkan(self):
+        batas = time.time() - self.simpan
+        with self._lock:
+            lama = [k for k, j in self._job.items() if j["status"] in ("selesai", "gagal") and j["dibuat"] < batas]
+            for k in lama:
+                self._job.pop(k)
+            aktif = {os.path.basename(j["path"]) for j in self._job.values()}
+        # Disapu per mtime, bukan per pekerjaan yang tercatat: file sisa proses sebelumnya (restart) dan
+        # file sementara yang tertinggal ikut terhapus. File pekerjaan yang masih tercatat tidak disentuh.
+        for nama in os.listdir(self.folder):
+            path = os.path.join(self.folder, nama)
+            if nama in aktif or not os.path.isfile(path):
+                continue
+            try:
+                if os.path.getmtime(path) < batas:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+# ------------------ Server Unduhan Ekspor ------------------
+# st.download_button selalu memuat seluruh file ke memori server Streamlit. Jika secrets EKSPOR_URL diisi,
+# file hasil dikirim dari disk per potongan oleh server HTTP kecil ini (di balik reverse proxy, seperti
+# proksi tile). Hanya nama file sesuai POLA_BERKAS di folder ekspor yang dilayani, dari proses mana pun.
+def url_unduhan(url_dasar, path, nama_file):
+    return f"{url_dasar}/{quote(os.path.basename(path))}?nama={quote(nama_file)}"
+
+
+def buat_handler_unduhan(folder):
+    class HandlerUnduhan(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _kosong(self, status):
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            nama = url.path.lstrip("/")
+            if nama == "sehat":
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(b"ok")
+                return
+            cocok = POLA_BERKAS.match(nama)
+            if not cocok:
+                self._kosong(404)
+                return
+            nama_unduh = parse_qs(url.query).get("nama", [nama])[0]
+            nama_unduh = re.sub(r"[^\w. -]", "_", nama_unduh) or nama
+            try:
+                f = open(os.path.join(folder, nama), "rb")
+            except OSError:
+                self._kosong(404)
+                return
+            with f:
+                self.send_response(200)
+                self.send_header("Content-Type", FORMAT_EKSPOR[cocok.group(2)][0])
+                self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+                self.send_header("Content-Disposition", f'attachment; filename="{nama_unduh}"')
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                if self.command != "HEAD":
+                    shutil.copyfileobj(f, self.wfile, POTONGAN_UNDUH)
+
+        do_HEAD = do_GET
+
+    return HandlerUnduhan
+
+
+def server_unduhan_aktif(port, host="127.0.0.1"):
+    # Apakah sudah ada server unduhan (mis. milik proses Streamlit lain) di port ini
+    conn = HTTPConnection(host, port, timeout=1)
+    try:
+        conn.request("GET", "/sehat")
+        return conn.getresponse().read() == b"ok"
+    except OSError:
+        return False
+    finally:
+        conn.close()
+
+
+def jalankan_server_unduhan(folder=EKSPOR_DIR, host="127.0.0.1", port=PORT_UNDUH):
+    # Thread latar; port=0 memilih port bebas (untuk uji). OSError jika port terpakai.
+    server = ThreadingHTTPServer((host, port), buat_handler_unduhan(folder))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
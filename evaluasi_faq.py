@@ -0,0 +1,116 @@
+import argparse
+import csv
+import time
+
+import numpy as np
+import pandas as pd
+
+from faq import FAQ_FILE, IndeksTfidf, JAWABAN_DEFAULT, MODE_FAQ, muat_indeks, normalisasi
+
+# ------------------ Jawab Massal & Evaluasi Chatbot FAQ ------------------
+# Contoh:
+#   python evaluasi_faq.py data/faq_uji.csv --mode tfidf --k 3 --keluaran hasil_faq.csv
+# File masukan: .txt (satu pertanyaan per baris) atau .csv dengan kolom "pertanyaan" dan
+# opsional "target" (pertanyaan FAQ yang benar, beberapa dipisah "|", kosong = tidak ada jawaban).
+
+
+def baca_pertanyaan(path):
+    if path.endswith(".csv"):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            df = pd.DataFrame({"pertanyaan": [baris.strip() for baris in f if baris.strip()]})
+    return df
+
+
+def buat_indeks(mode="fuzzy", path=FAQ_FILE):
+    indeks = muat_indeks(path)
+    return IndeksTfidf(indeks) if mode == "tfidf" else indeks
+
+
+def jawab_massal(indeks, daftar_pertanyaan, k=3, threshold=None):
+    # Satu baris per pertanyaan: jawaban akhir + top-k (pertanyaan FAQ, skor)
+    ambang = indeks.ambang if threshold is None else threshold
+    mulai = time.perf_counter()
+    hasil = indeks.cari_banyak(daftar_pertanyaan, k=k)
+    durasi = time.perf_counter() - mulai
+
+    baris = []
+    for q, top in zip(daftar_pertanyaan, hasil):
+        terjawab = bool(top) and top[0][2] >= ambang
+        data = {"pertanyaan": q, "jawaban": top[0][1] if terjawab else JAWABAN_DEFAULT}
+        for r in range(k):
+            data[f"faq_{r + 1}"] = top[r][0] if r < len(top) else ""
+            data[f"skor_{r + 1}"] = round(top[r][2], 1) if r < len(top) else np.nan
+        baris.append(data)
+    return pd.DataFrame(baris), durasi
+
+
+def latensi_satuan(indeks, daftar_pertanyaan, threshold=None, sampel=1000):
+    # Latensi per pertanyaan lewat jalur interaktif (indeks.jawab), dalam milidetik, beserta jawabannya
+    latensi, jawaban = [], []
+    for q in daftar_pertanyaan[:sampel]:
+        mulai = time.perf_counter()
+        jawaban.append(indeks.jawab(q, threshold))
+        latensi.append((time.perf_counter() - mulai) * 1000)
+    return (np.percentile(latensi, [50, 95, 99]) if latensi else np.full(3, np.nan)), jawaban
+
+
+def akurasi(df_hasil, target, threshold):
+    # Top-1: jawaban yang diberikan benar (termasuk menolak jika target kosong); Top-k: target ada di top-k
+    k = sum(c.startswith("faq_") for c in df_hasil.columns)
+    benar_1 = benar_k = 0
+    for (_, b), t in zip(df_hasil.iterrows(), target):
+        sah = {normalisasi(x) for x in t.split("|") if x.strip()}
+        terjawab = not pd.isna(b["skor_1"]) and b["skor_1"] >= threshold
+        if not sah:
+            benar_1 += not terjawab
+            benar_k += not terjawab
+            continue
+        benar_1 += terjawab and b["faq_1"] in sah
+        benar_k += any(b[f"faq_{r + 1}"] in sah for r in range(k))
+    n = len(df_hasil)
+    return benar_1 / n, benar_k / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jawab massal & evaluasi chatbot FAQ pertanian")
+    parser.add_argument("masukan", help="File pertanyaan (.txt atau .csv)")
+    parser.add_argument("--mode", choices=MODE_FAQ, default="fuzzy")
+    parser.add_argument("--faq", default=FAQ_FILE, help="File basis pengetahuan FAQ")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--keluaran", help="Simpan hasil per pertanyaan ke CSV")
+    args = parser.parse_args()
+
+    mulai = time.perf_counter()
+    indeks = buat_indeks(args.mode, args.faq)
+    waktu_muat = time.perf_counter() - mulai
+    ambang = indeks.ambang if args.threshold is None else args.threshold
+
+    df = baca_pertanyaan(args.masukan)
+    daftar = df["pertanyaan"].tolist()
+    df_hasil, durasi = jawab_massal(indeks, daftar, args.k, ambang)
+    (p50, p95, p99), jawaban_satuan = latensi_satuan(indeks, daftar, ambang)
+    # Jalur massal harus memberi jawaban yang sama dengan yang diterima pengguna lewat chatbot
+    sama = np.mean([a == b for a, b in zip(jawaban_satuan, df_hasil["jawaban"])]) if jawaban_satuan else 1.0
+
+    print(f"Mode            : {args.mode} (ambang {ambang:g}, {len(indeks)} pertanyaan FAQ)")
+    print(f"Muat indeks     : {waktu_muat * 1000:.1f} ms")
+    print(f"Jawab massal    : {len(daftar)} pertanyaan dalam {durasi:.3f} s "
+          f"({len(daftar) / durasi if durasi else float('inf'):.0f} pertanyaan/s)")
+    print(f"Latensi satuan  : p50 {p50:.2f} ms | p95 {p95:.2f} ms | p99 {p99:.2f} ms")
+    print(f"Sama interaktif : {sama:.1%} dari {len(jawaban_satuan)} jawaban massal = indeks.jawab()")
+    if "target" in df.columns:
+        top1, topk = akurasi(df_hasil, df["target"].tolist(), ambang)
+        print(f"Akurasi         : top-1 {top1:.1%} | top-{args.k} {topk:.1%}")
+    terjawab = (df_hasil["jawaban"] != JAWABAN_DEFAULT).mean() if len(df_hasil) else 0
+    print(f"Terjawab        : {terjawab:.1%}")
+
+    if args.keluaran:
+        df_hasil.to_csv(args.keluaran, index=False, quoting=csv.QUOTE_MINIMAL)
+        print(f"Hasil disimpan  : {args.keluaran}")
+
+
+if __name__ == "__main__":
+    main()
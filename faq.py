@@ -0,0 +1,273 @@
+import csv
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from rapidfuzz import process, fuzz
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# ------------------ Indeks Pencarian FAQ ------------------
+FAQ_FILE = "data/faq.json"
+JAWABAN_DEFAULT = "Maaf, saya belum punya jawaban untuk pertanyaan itu. Silakan tanyakan hal lain."
+PANJANG_PREFIKS = 3
+MODE_FAQ = ("fuzzy", "tfidf")
+UKURAN_BLOK = 256
+
+
+def normalisasi(teks):
+    return " ".join(re.findall(r"\w+", teks.lower()))
+
+
+def _top_k(skor, k):
+    # Indeks top-k per baris matriks skor, urut menurun; skor seri -> indeks lebih kecil dulu
+    n = skor.shape[1]
+    k = min(k, n)
+    kunci = np.round(skor.astype(np.float64) * 1000).astype(np.int64) * n - np.arange(n)
+    top = np.argpartition(-kunci, k - 1, axis=1)[:, :k]
+    baris = np.arange(len(skor))[:, None]
+    return top[baris, np.argsort(-kunci[baris, top], axis=1)]
+
+
+def kunci_token(teks):
+    # Prefiks kata (3 huruf) sebagai kunci indeks, supaya typo di akhir kata ("kuneng") tetap ketemu
+    return {kata[:PANJANG_PREFIKS] for kata in teks.split()}
+
+
+class IndeksFAQ:
+    ambang = 70
+
+    # Dibangun sekali per proses: pertanyaan dinormalisasi & dideduplikasi, peta pertanyaan -> jawaban,
+    # dan indeks terbalik prefiks kata -> id pertanyaan untuk menyaring kandidat sebelum diskor.
+    def __init__(self, pasangan=()):
+        self.pertanyaan = []
+        self.jawaban = []
+        self._posisi = {}
+        self._indeks = defaultdict(list)
+        self.tambah(pasangan)
+
+    def tambah(self, pasangan):
+        for q, a in pasangan:
+            q = normalisasi(q)
+            # Pertanyaan ganda: jawaban pertama yang dipakai, sama seperti pencarian linear sebelumnya
+            if not q or q in self._posisi:
+                continue
+            i = len(self.pertanyaan)
+            self._posisi[q] = i
+            self.pertanyaan.append(q)
+            self.jawaban.append(a)
+            for kunci in kunci_token(q):
+                self._indeks[kunci].append(i)
+
+    def __len__(self):
+        return len(self.pertanyaan)
+
+    def kandidat(self, pertanyaan):
+        ids = set()
+        for kunci in kunci_token(pertanyaan):
+            ids.update(self._indeks.get(kunci, ()))
+        return ids
+
+    def cari(self, pertanyaan, k=5, skor_min=0):
+        # Top-k (pertanyaan, jawaban, skor) berdasarkan fuzz.token_set_ratio
+        q = normalisasi(pertanyaan)
+        if not q:
+            return []
+        if k == 1 and q in self._posisi:
+            i = self._posisi[q]
+            return [(self.pertanyaan[i], self.jawaban[i], 100.0)]
+
+        ids = self.kandidat(q)
+        pilihan = {i: self.pertanyaan[i] for i in sorted(ids)} if ids else dict(enumerate(self.pertanyaan))
+        hasil = process.extract(q, pilihan, scorer=fuzz.token_set_ratio, limit=k, score_cutoff=skor_min)
+        return [(self.pertanyaan[i], self.jawaban[i], skor) for _, skor, i in hasil]
+
+    def jawab(self, pertanyaan, threshold=None):
+        hasil = self.cari(pertanyaan, k=1, skor_min=self.ambang if threshold is None else threshold)
+        return hasil[0][1] if hasil else JAWABAN_DEFAULT
+
+    def skor_blok(self, kueri):
+        # Matriks skor (kueri x pertanyaan) dengan rapidfuzz.process.cdist di semua core. Kandidat dipilih
+        # sama seperti cari(): pertanyaan di luar kandidat prefiks diberi skor -1 (tidak pernah terpilih);
+        # kueri tanpa kandidat sama sekali diskor ke semua pertanyaan.
+        skor = process.cdist(kueri, self.pertanyaan, scorer=fuzz.token_set_ratio, dtype=np.float32, workers=-1)
+        for b, q in enumerate(kueri):
+            ids = self.kandidat(q)
+            if ids:
+                luar = np.ones(len(self.pertanyaan), dtype=bool)
+                luar[list(ids)] = False
+                skor[b, luar] = -1
+        return skor
+
+    def cari_banyak(self, daftar_pertanyaan, k=5):
+        return _cari_banyak(self, daftar_pertanyaan, k)
+
+
+def _cari_banyak(indeks, daftar_pertanyaan, k):
+    # Jawab banyak pertanyaan sekaligus, per blok agar memori matriks skor tetap terbatas
+    kueri = [normalisasi(q) for q in daftar_pertanyaan]
+    hasil = []
+    for mulai in range(0, len(kueri), UKURAN_BLOK):
+        blok = kueri[mulai:mulai + UKURAN_BLOK]
+        skor = indeks.skor_blok(blok)
+        top = _top_k(skor, k)
+        for b, q in enumerate(blok):
+            hasil.append([] if not q else [
+                (indeks.pertanyaan[i], indeks.jawaban[i], float(skor[b, i])) for i in top[b] if skor[b, i] >= 0
+            ])
+    return hasil
+
+
+class IndeksTfidf:
+    # Mode alternatif: matriks TF-IDF n-gram karakter (tahan typo/bahasa gaul) dibangun sekali,
+    # kueri diskor ke semua pertanyaan dengan satu perkalian matriks sparse. Skor = cosine x 100.
+    ambang = 45
+
+    def __init__(self, indeks, rerank=False, kandidat_rerank=10):
+        self.indeks = indeks
+        self.rerank = rerank
+        self.kandidat_rerank = kandidat_rerank
+        self._vektorisasi = TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True)
+        self._matriks = self._vektorisasi.fit_transform(indeks.pertanyaan)
+
+    def __len__(self):
+        return len(self.indeks)
+
+    def cari(self, pertanyaan, k=5, skor_min=0):
+        q = normalisasi(pertanyaan)
+        if not q or not len(self.indeks):
+            return []
+        skor = (self._matriks @ self._vektorisasi.transform([q]).T).toarray().ravel() * 100
+        n = min(max(k, self.kandidat_rerank if self.rerank else k), len(skor))
+        top = np.argpartition(-skor, n - 1)[:n]
+        top = top[skor[top] >= skor_min]
+        if self.rerank:
+            # Urutan akhir di antara kandidat teratas ditentukan token_set_ratio, lalu cosine
+            fz = np.array([fuzz.token_set_ratio(q, self.indeks.pertanyaan[i]) for i in top])
+            urutan = np.lexsort((-skor[top], -fz))
+        else:
+            urutan = np.argsort(-skor[top], kind="stable")
+        return [
+            (self.indeks.pertanyaan[i], self.indeks.jawaban[i], float(skor[i]))
+            for i in top[urutan][:k]
+        ]
+
+    def jawab(self, pertanyaan, threshold=None):
+        hasil = self.cari(pertanyaan, k=1, skor_min=self.ambang if threshold is None else threshold)
+        return hasil[0][1] if hasil else JAWABAN_DEFAULT
+
+    @property
+    def pertanyaan(self):
+        return self.indeks.pertanyaan
+
+    @property
+    def jawaban(self):
+        return self.indeks.jawaban
+
+    def skor_blok(self, kueri):
+        return (self._vektorisasi.transform(kueri) @ self._matriks.T).toarray() * 100
+
+    def cari_banyak(self, daftar_pertanyaan, k=5):
+        if self.rerank:
+            # Rerank token_set_ratio per kueri: pakai jalur yang sama dengan pertanyaan interaktif
+            return [self.cari(q, k=k) for q in daftar_pertanyaan]
+        return _cari_banyak(self, daftar_pertanyaan, k)
+
+
+# ------------------ Basis Pengetahuan FAQ di Disk ------------------
+def muat_pasangan(path=FAQ_FILE):
+    # JSON: list of {"pertanyaan", "jawaban", ...}; CSV: kolom pertanyaan,jawaban
+    if path.endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            return [(r["pertanyaan"], r["jawaban"]) for r in csv.DictReader(f)]
+    with open(path, "r", encoding="utf-8") as f:
+        return [(r["pertanyaan"], r["jawaban"]) for r in json.load(f)]
+
+
+def _sidik_pasangan(pasangan):
+    return hashlib.sha256(json.dumps(pasangan, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _cap_file(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def muat_indeks(path=FAQ_FILE):
+    # Indeks terkompilasi disimpan di <path>.index.pkl. Jika sumber tidak berubah indeks langsung
+    # dimuat; jika entri baru hanya ditambahkan di akhir, cukup entri baru yang diindeks.
+    path_indeks = f"{path}.index.pkl"
+    cap = _cap_file(path)
+    tersimpan = None
+    if os.path.exists(path_indeks):
+        with open(path_indeks, "rb") as f:
+            try:
+                tersimpan = pickle.load(f)
+            except (pickle.UnpicklingError, EOFError, AttributeError):
+                tersimpan = None
+        if tersimpan is not None and tersimpan["cap"] == cap:
+            return tersimpan["indeks"]
+
+    pasangan = [list(p) for p in muat_pasangan(path)]
+    sidik = _sidik_pasangan(pasangan)
+    if tersimpan is not None and tersimpan["sidik"] == sidik:
+        indeks = tersimpan["indeks"]
+    elif (tersimpan is not None and tersimpan["jumlah"] <= len(pasangan)
+          and _sidik_pasangan(pasangan[:tersimpan["jumlah"]]) == tersimpan["sidik"]):
+        indeks = tersimpan["indeks"]
+        indeks.tambah(pasangan[tersimpan["jumlah"]:])
+    else:
+        indeks = IndeksFAQ(pasangan)
+
+    tmp = f"{path_indeks}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"cap": cap, "sidik": sidik, "jumlah": len(pasangan), "indeks": indeks}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path_indeks)
+    return indeks
+
+
+class SumberFAQ:
+    # Satu objek per proses (read-only untuk semua sesi); file sumber dicek paling sering tiap
+    # `interval` detik dan indeks dimuat ulang hanya jika mtime/ukurannya berubah.
+    def __init__(self, path=FAQ_FILE, interval=5, mode="fuzzy"):
+        if mode not in MODE_FAQ:
+            raise ValueError(f"Mode FAQ tidak dikenal: {mode!r} (pilih salah satu dari {MODE_FAQ})")
+        self.path = path
+        self.interval = interval
+        self.mode = mode
+        self._lock = threading.Lock()
+        self.stats = {"muat_ulang": 0, "gagal": 0}
+        self._cap = _cap_file(path)
+        self._indeks = self._bangun()
+        self._dicek = time.monotonic()
+
+    def _bangun(self):
+        indeks = muat_indeks(self.path)
+        return IndeksTfidf(indeks) if self.mode == "tfidf" else indeks
+
+    def indeks(self):
+        if time.monotonic() - self._dicek < self.interval:
+            return self._indeks
+        with self._lock:
+            self._dicek = time.monotonic()
+            try:
+                cap = _cap_file(self.path)
+            except OSError:
+                return self._indeks
+            if cap != self._cap:
+                try:
+                    self._indeks = self._bangun()
+                except (OSError, ValueError, KeyError, TypeError):
+                    # File sedang/salah disunting (JSON rusak, kolom hilang): tetap layani indeks terakhir
+                    # yang valid. _cap tidak dimajukan supaya simpanan valid berikutnya langsung termuat.
+                    self.stats["gagal"] += 1
+                    return self._indeks
+                self._cap = cap
+                self.stats["muat_ulang"] += 1
+        return self._indeks
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# ------------------ Penyimpanan Foto Laporan & Thumbnail ------------------
+UPLOAD_DIR = "uploads"
+THUMB_DIR = "uploads/thumb"
+UKURAN_THUMB = (320, 320)
+FORMAT_THUMB = "WEBP"
+KUALITAS_THUMB = 80
+BATAS_CACHE_THUMB = 32 * 1024 * 1024  # byte
+TAG_GPS = 0x8825
+
+
+def _derajat(nilai, arah):
+    d, m, s = (float(x) for x in nilai)
+    hasil = d + m / 60 + s / 3600
+    return -hasil if arah in ("S", "W") else hasil
+
+
+def baca_gps(img):
+    # (lat, lon) dari EXIF GPSInfo, None jika foto tidak menyimpan lokasi
+    try:
+        gps = img.getexif().get_ifd(TAG_GPS)
+        lat = _derajat(gps[2], gps[1])
+        lon = _derajat(gps[4], gps[3])
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        return None
+    return round(lat, 6), round(lon, 6)
+
+
+def _bersihkan(img, fmt):
+    # Simpan ulang tanpa metadata EXIF; orientasi kamera diterapkan ke piksel dulu
+    img = ImageOps.exif_transpose(img)
+    buf = BytesIO()
+    if fmt == "JPEG":
+        img.convert("RGB").save(buf, "JPEG", quality=92, optimize=True)
+    else:
+        img.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+def gambar_kecil(data, ukuran=(96, 96)):
+    # PNG kecil dari byte gambar apa pun (mis. thumbnail WebP), untuk format yang tidak mengenal WebP
+    with Image.open(BytesIO(data)) as img:
+        img.thumbnail(ukuran)
+        buf = BytesIO()
+        img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+class PenyimpanGambar:
+    # Satu objek per proses. Foto asli disimpan dengan nama hash isi (unggahan identik berbagi file),
+    # thumbnail WebP dibuat sekali oleh worker latar, lalu disajikan dari cache LRU berbatas byte.
+    def __init__(self, folder=UPLOAD_DIR, folder_thumb=THUMB_DIR, ukuran=UKURAN_THUMB,
+                 max_workers=2, batas_cache=BATAS_CACHE_THUMB):
+        self.folder = folder
+        self.folder_thumb = folder_thumb
+        self.ukuran = ukuran
+        self.batas_cache = batas_cache
+        for f in (folder, folder_thumb):
+            if not os.path.exists(f):
+                os.makedirs(f)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail")
+        self._proses = {}
+        self._cache = OrderedDict()
+        self._ukuran_cache = 0
+        self._lock = threading.Lock()
+
+    # ---------- Unggahan ----------
+    def simpan(self, data):
+        # Mengembalikan (path foto, (lat, lon) atau None); ValueError jika bukan gambar
+        try:
+            img = Image.open(BytesIO(data))
+            img.load()
+        except (UnidentifiedImageError, OSError) as e:
+            raise ValueError("File bukan gambar yang valid") from e
+        gps = baca_gps(img)
+        fmt = "JPEG" if img.format == "JPEG" else "PNG"
+        sidik = hashlib.sha256(data).hexdigest()
+        path = os.path.join(self.folder, f"{sidik}.{'jpg' if fmt == 'JPEG' else 'png'}")
+        if not os.path.exists(path):
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(_bersihkan(img, fmt))
+            os.replace(tmp, path)
+        self._jadwalkan(path)
+        return path, gps
+
+    def hapus(self, path):
+        # Hapus foto & thumbnailnya; pemanggil memastikan tidak ada laporan lain yang memakainya
+        path_thumb = self.path_thumb(path)
+        with self._lock:
+            data = self._cache.pop(path_thumb, None)
+            if data is not None:
+                self._ukuran_cache -= len(data)
+        for p in (path, path_thumb):
+            if os.path.exists(p):
+                os.remove(p)
+
+    # ---------- Thumbnail ----------
+    def path_thumb(self, path):
+        nama = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(self.folder_thumb, f"{nama}.webp")
+
+    def _buat_thumb(self, path):
+        path_thumb = self.path_thumb(path)
+        if os.path.exists(path_thumb):
+            return path_thumb
+        with Image.open(path) as img:
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail(self.ukuran)
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+            tmp = f"{path_thumb}.{os.getpid()}.{threading.get_ident()}.tmp"
+            img.save(tmp, FORMAT_THUMB, quality=KUALITAS_THUMB)
+        os.replace(tmp, path_thumb)
+        return path_thumb
+
+    def _jadwalkan(self, path):
+        with self._lock:
+            job = self._proses.get(path)
+            if job is None:
+                job = self._pool.submit(self._buat_thumb, path)
+                self._proses[path] = job
+                job.add_done_callback(lambda _, p=path: self._selesai(p))
+        return job
+
+    def _selesai(self, path):
+        with self._lock:
+            self._proses.pop(path, None)
+
+    def thumbnail(self, path):
+        # Byte WebP untuk ditampilkan; foto lama tanpa thumbnail dibuatkan saat pertama diminta.
+        # None jika foto aslinya hilang atau rusak.
+        path_thumb = self.path_thumb(path)
+        with self._lock:
+            data = self._cache.get(path_thumb)
+            if data is not None:
+                self._cache.move_to_end(path_thumb)
+                return data
+        if not os.path.exists(path_thumb):
+            if not os.path.exists(path):
+                return None
+            try:
+                self._jadwalkan(path).result()
+            except (UnidentifiedImageError, OSError):
+                return None
+        with open(path_thumb, "rb") as f:
+            data = f.read()
+        with self._lock:
+            if path_thumb not in self._cache:
+                self._cache[path_thumb] = data
+                self._ukuran_cache += len(data)
+            while self._ukuran_cache > self.batas_cache and len(self._cache) > 1:
+                _, lama = self._cache.popitem(last=False)
+                self._ukuran_cache -= len(lama)
+        return data
+
+    def info_cache(self):
+        with self._lock:
+            return {"jumlah": len(self._cache), "byte": self._ukuran_cache, "antrian": len(self._proses)}
@@ -0,0 +1,148 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+from plotly.subplots import make_subplots
+
+# ------------------ Grafik Cuaca (subplot berbagi sumbu, dirampingkan LTTB) ------------------
+# Semua panel satu grafik digabung dalam satu figure dengan sumbu waktu bersama. Deret panjang
+# dirampingkan dengan LTTB (Largest-Triangle-Three-Buckets) sehingga bentuk puncak/lembah tetap
+# terlihat, dan jumlah titik yang dikirim ke browser dibatasi TITIK_MAKS per trace.
+TITIK_MAKS = 800
+BATAS_LOKASI = 12  # lebih dari ini, tiap panel menampilkan median + rentang min-maks antar lokasi
+BATAS_CACHE_GRAFIK = 64
+WARNA = qualitative.Dark24
+
+# (kolom, jenis trace, judul panel)
+PANEL_HARIAN = [
+    ("Curah Hujan (mm)", "bar", "Curah Hujan Harian"),
+    ("Suhu Maks (°C)", "line", "Suhu Maksimum Harian"),
+    ("Suhu Min (°C)", "line", "Suhu Minimum Harian"),
+    ("Kelembapan (%)", "line", "Kelembapan Harian"),
+]
+PANEL_JAM = [
+    ("Curah Hujan (mm)", "line", "Curah Hujan per Jam"),
+    ("Suhu (°C)", "line", "Suhu per Jam"),
+    ("Kelembapan (%)", "line", "Kelembapan per Jam"),
+]
+
+
+def lttb(x, y, n):
+    # Indeks n titik terpilih dari deret (x, y) yang sudah urut x. Titik pertama & terakhir selalu
+    # ikut; dari setiap ember diambil titik yang membentuk segitiga terbesar dengan titik terpilih
+    # sebelumnya dan rata-rata ember berikutnya.
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    panjang = len(x)
+    if n >= panjang or n < 3:
+        return np.arange(panjang)
+    # n - 2 ember untuk titik di antara ujung; setiap ember berisi minimal satu titik
+    batas = (np.arange(n - 1) * ((panjang - 2) / (n - 2))).astype(int) + 1
+    batas[-1] = panjang - 1
+    terpilih = np.empty(n, dtype=int)
+    terpilih[0], terpilih[-1] = 0, panjang - 1
+    a = 0
+    for i in range(n - 2):
+        awal, akhir = batas[i], batas[i + 1]
+        awal_berikut, akhir_berikut = batas[i + 1], (batas[i + 2] if i + 3 < n else panjang)
+        rata_x = x[awal_berikut:akhir_berikut].mean()
+        rata_y = y[awal_berikut:akhir_berikut].mean()
+        luas = np.abs(
+            (x[a] - rata_x) * (y[awal:akhir] - y[a]) - (x[a] - x[awal:akhir]) * (rata_y - y[a])
+        )
+        a = awal + int(np.argmax(luas))
+        terpilih[i + 1] = a
+    return terpilih
+
+
+def rampingkan(x, y, n=TITIK_MAKS):
+    # (x, y) dengan NaN dibuang lalu dirampingkan ke paling banyak n titik
+    x = pd.to_datetime(pd.Series(x)).reset_index(drop=True)
+    y = pd.Series(y, dtype=float).reset_index(drop=True)
+    ada = y.notna().to_numpy()
+    x, y = x[ada], y[ada]
+    if len(x) <= n:
+        return x, y
+    idx = lttb(x.astype("int64").to_numpy(), y.to_numpy(), n)
+    return x.iloc[idx], y.iloc[idx]
+
+
+def _trace(jenis, x, y, warna=None, **opsi):
+    if jenis == "bar":
+        return go.Bar(x=x, y=y, marker_color=warna, **opsi)
+    return go.Scatter(x=x, y=y, mode="lines", line_color=warna, **opsi)
+
+
+def buat_grafik(df, kolom_x, panel, judul=None, kolom_lokasi=None, titik_maks=TITIK_MAKS):
+    # Satu figure berisi satu baris subplot per panel dengan sumbu x bersama
+    fig = make_subplots(
+        rows=len(panel), cols=1, shared_xaxes=True, vertical_spacing=0.04,
+        subplot_titles=[p[2] for p in panel],
+    )
+    if kolom_lokasi is None:
+        kelompok = {None: df}
+    else:
+        kelompok = dict(list(df.groupby(kolom_lokasi, sort=False)))
+    lokasi = list(kelompok)
+    traces, posisi = [], []
+    for baris, (kolom, jenis, _) in enumerate(panel, start=1):
+        if len(lokasi) > BATAS_LOKASI:
+            # Terlalu banyak lokasi untuk satu garis per lokasi: ringkas jadi median & rentang
+            tabel = df.pivot_table(index=kolom_x, columns=kolom_lokasi, values=kolom)
+            for nama, nilai, opsi in [
+                ("Maks", tabel.max(axis=1), {"line": {"width": 0}, "showlegend": False}),
+                ("Min", tabel.min(axis=1), {"line": {"width": 0}, "fill": "tonexty", "showlegend": False}),
+                ("Median", tabel.median(axis=1), {"showlegend": baris == 1}),
+            ]:
+                x, y = rampingkan(tabel.index, nilai, titik_maks)
+                traces.append(go.Scatter(x=x, y=y, mode="lines", name=f"{nama} {len(lokasi)} lokasi",
+                                         legendgroup=nama, **opsi))
+                posisi.append(baris)
+            continue
+        for i, nama in enumerate(lokasi):
+            x, y = rampingkan(kelompok[nama][kolom_x], kelompok[nama][kolom], titik_maks)
+            # Warna tetap per lokasi di semua panel
+            traces.append(_trace(
+                jenis, x, y, warna=None if nama is None else WARNA[i % len(WARNA)],
+                name=nama or kolom, legendgroup=nama or kolom, showlegend=nama is not None and baris == 1,
+            ))
+            posisi.append(baris)
+        fig.update_yaxes(title_text=kolom, row=baris, col=1)
+    # Ditambahkan sekaligus: add_trace satu per satu memvalidasi ulang seluruh figure setiap kali
+    fig.add_traces(traces, rows=posisi, cols=[1] * len(posisi))
+    fig.update_layout(
+        title=judul, height=230 * len(panel) + 80, hovermode="x unified",
+        margin={"l": 60, "r": 20, "t": 80, "b": 40}, barmode="group",
+    )
+    return fig
+
+
+class CacheGrafik:
+    # Figure per (versi prakiraan, jenis grafik, parameter), dipakai bersama semua sesi dan hanya-baca.
+    # Versi berubah setiap prakiraan diperbarui, jadi figure hanya dibangun sekali per versi.
+    # Objek Figure (bukan dict) yang disimpan: st.plotly_chart memvalidasi ulang dict di setiap
+    # render, sedangkan Figure langsung diserialisasi.
+    def __init__(self, batas=BATAS_CACHE_GRAFIK):
+        self.batas = batas
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hit": 0, "bangun": 0}
+
+    def ambil(self, kunci, bangun):
+        # bangun: fungsi tanpa argumen -> go.Figure
+        with self._lock:
+            fig = self._cache.get(kunci)
+            if fig is not None:
+                self._cache.move_to_end(kunci)
+                self.stats["hit"] += 1
+                return fig
+        fig = bangun()
+        with self._lock:
+            self.stats["bangun"] += 1
+            self._cache[kunci] = fig
+            while len(self._cache) > self.batas:
+                self._cache.popitem(last=False)
+        return fig
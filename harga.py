@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# ------------------ Riwayat Harga Komoditas (SQLite) ------------------
+HARGA_DB = "data/harga.db"
+FREKUENSI = {"Harian": "D", "Mingguan": "W-MON", "Bulanan": "MS"}
+
+SKEMA = """
+CREATE TABLE IF NOT EXISTS harga (
+    komoditas TEXT NOT NULL,
+    waktu     TEXT NOT NULL,  -- ISO 8601
+    harga     REAL NOT NULL,
+    PRIMARY KEY (komoditas, waktu)
+) WITHOUT ROWID;
+"""
+
+SQL_KOMODITAS = (
+    "WITH RECURSIVE k(nama) AS (SELECT MIN(komoditas) FROM harga UNION ALL "
+    "SELECT (SELECT MIN(komoditas) FROM harga WHERE komoditas > k.nama) FROM k WHERE k.nama IS NOT NULL) "
+)
+
+
+class RiwayatHarga:
+    # Setiap penyimpanan harga dicatat sebagai observasi (komoditas, waktu, harga). Kunci utama
+    # (komoditas, waktu) sekaligus indeks berkelompok, jadi kueri rentang per komoditas
+    # hanya membaca baris komoditas itu secara berurutan.
+    def __init__(self, path=HARGA_DB):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self._lokal = threading.local()
+        conn = self._koneksi()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SKEMA)
+
+    def _koneksi(self):
+        conn = getattr(self._lokal, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._lokal.conn = conn
+        return conn
+
+    def catat(self, data, waktu=None):
+        # data: list of {"Komoditas", "Harga (Rp/kg)"} seperti isi editor harga
+        waktu = (waktu or datetime.now()).isoformat(timespec="seconds")
+        baris = [
+            (d["Komoditas"], waktu, float(d["Harga (Rp/kg)"]))
+            for d in data
+            if d.get("Komoditas") and d.get("Harga (Rp/kg)") is not None and not pd.isna(d["Harga (Rp/kg)"])
+        ]
+        with self._koneksi() as conn:
+            conn.executemany("INSERT OR REPLACE INTO harga VALUES (?, ?, ?)", baris)
+        return len(baris)
+
+    def kosong(self):
+        return self._koneksi().execute("SELECT 1 FROM harga LIMIT 1").fetchone() is None
+
+    def daftar_komoditas(self):
+        # Skip-scan lewat kunci utama: satu lompatan indeks per komoditas, bukan memindai semua baris
+        return [b[0] for b in self._koneksi().execute(SQL_KOMODITAS + "SELECT nama FROM k WHERE nama IS NOT NULL")]
+
+    def terbaru(self):
+        # {komoditas: harga terakhir}
+        return dict(self._koneksi().execute(
+            SQL_KOMODITAS + "SELECT nama, (SELECT harga FROM harga WHERE komoditas = nama "
+            "ORDER BY waktu DESC LIMIT 1) FROM k WHERE nama IS NOT NULL"
+        ).fetchall())
+
+    def _syarat(self, komoditas, mulai, sampai):
+        syarat, arg = [f"komoditas IN ({', '.join('?' * len(komoditas))})"], list(komoditas)
+        if mulai is not None:
+            syarat.append("waktu >= ?")
+            arg.append(pd.Timestamp(mulai).isoformat())
+        if sampai is not None:
+            syarat.append("waktu < ?")
+            arg.append((pd.Timestamp(sampai) + pd.Timedelta(days=1)).isoformat())
+        return " AND ".join(syarat), arg
+
+    def rentang(self, komoditas, mulai=None, sampai=None):
+        # Observasi mentah (Komoditas, Waktu, Harga) untuk daftar komoditas dalam rentang tanggal
+        syarat, arg = self._syarat(komoditas, mulai, sampai)
+        baris = self._koneksi().execute(
+            f"SELECT komoditas, waktu, harga FROM harga WHERE {syarat} ORDER BY komoditas, waktu", arg
+        ).fetchall()
+        df = pd.DataFrame(baris, columns=["Komoditas", "Waktu", "Harga"])
+        df["Waktu"] = pd.to_datetime(df["Waktu"])
+        return df
+
+    def hitung(self, komoditas, mulai=None, sampai=None):
+        syarat, arg = self._syarat(komoditas, mulai, sampai)
+        return self._koneksi().execute(f"SELECT COUNT(*) FROM harga WHERE {syarat}", arg).fetchone()[0]
+
+    def iter_potongan(self, komoditas, mulai=None, sampai=None, ukuran=5000):
+        # Observasi mentah (komoditas, waktu, harga) urut kunci utama, per potongan list tuple.
+        # Per komoditas, halaman berikutnya lanjut dari waktu terakhir (bukan OFFSET): setiap potongan
+        # adalah satu rentang pendek di kunci utama dan memori tetap satu potongan.
+        cur = self._koneksi().cursor()
+        for nama in sorted(komoditas):
+            syarat, arg = self._syarat([nama], mulai, sampai)
+            sql = f"SELECT komoditas, waktu, harga FROM harga WHERE {syarat} AND waktu > ? ORDER BY waktu LIMIT ?"
+            terakhir = ""
+            while True:
+                baris = cur.execute(sql, arg + [terakhir, ukuran]).fetchall()
+                if baris:
+                    terakhir = baris[-1][1]
+                    yield baris
+                if len(baris) < ukuran:
+                    break
+
+    def harian(self, komoditas, mulai=None, sampai=None):
+        # Jumlah & cacah harga per (komoditas, hari) dihitung di SQLite; dasar semua agregasi periode
+        syarat, arg = self._syarat(komoditas, mulai, sampai)
+        baris = self._koneksi().execute(
+            f"SELECT komoditas, substr(waktu, 1, 10), SUM(harga), COUNT(*) FROM harga WHERE {syarat} "
+            "GROUP BY komoditas, substr(waktu, 1, 10)", arg
+        ).fetchall()
+        df = pd.DataFrame(baris, columns=["Komoditas", "Waktu", "Jumlah", "Cacah"])
+        df["Waktu"] = pd.to_datetime(df["Waktu"])
+        return df
+
+    def ringkas(self, komoditas, frekuensi="Mingguan", mulai=None, sampai=None, jendela=4):
+        # Rata-rata harga per periode + volatilitas bergulir (std perubahan % dalam `jendela` periode)
+        df = self.harian(komoditas, mulai, sampai)
+        if df.empty:
+            return pd.DataFrame(columns=["Komoditas", "Waktu", "Harga", "Volatilitas (%)"])
+        periode = (
+            df.set_index("Waktu").groupby("Komoditas")[["Jumlah", "Cacah"]]
+            .resample(FREKUENSI[frekuensi]).sum()
+        )
+        hasil = (periode["Jumlah"] / periode["Cacah"].where(periode["Cacah"] > 0)).rename("Harga")
+        hasil = hasil.groupby(level=0).ffill().reset_index()
+        hasil["Volatilitas (%)"] = (
+            hasil.groupby("Komoditas")["Harga"]
+            .transform(lambda s: s.pct_change().rolling(jendela, min_periods=2).std() * 100)
+        )
+        return hasil
+
+    def prakiraan(self, komoditas, tanggal, riwayat_hari=180):
+        # Harga pada `tanggal` dari tren linear rata-rata harian `riwayat_hari` terakhir; jika datanya
+        # kurang dari 2 hari, harga rata-rata hari terakhir yang dipakai. {komoditas: harga}
+        tanggal = pd.Timestamp(tanggal)
+        df = self.harian(komoditas, mulai=pd.Timestamp.now().normalize() - pd.Timedelta(days=riwayat_hari + 365))
+        hasil = {}
+        for nama, kelompok in df.groupby("Komoditas"):
+            kelompok = kelompok[kelompok["Waktu"] >= kelompok["Waktu"].max() - pd.Timedelta(days=riwayat_hari)]
+            harga = (kelompok["Jumlah"] / kelompok["Cacah"]).to_numpy()
+            if len(kelompok) < 2:
+                hasil[nama] = float(harga[-1])
+                continue
+            hari = (kelompok["Waktu"] - kelompok["Waktu"].min()).dt.days.to_numpy()
+            a, b = np.polyfit(hari, harga, 1)
+            x = (tanggal - kelompok["Waktu"].min()).days
+            hasil[nama] = float(max(a * x + b, 0))
+        return hasil
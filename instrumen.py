@@ -0,0 +1,363 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from functools import wraps
+
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# ------------------ Instrumentasi Kinerja per Bagian Dashboard ------------------
+# Setiap bagian dashboard dibungkus `with instrumen.ukur("peta"):` (atau dekorator @instrumen.catat("grafik")
+# untuk fragmen). Per rerun dicatat waktu dinding, byte yang diunduh, hit/miss cache, dan (opsional) alokasi
+# memori tiap bagian ke ring buffer berukuran tetap. Pencatatan hanya untuk sesi yang menyalakan panel debug
+# (atau semua sesi jika `selalu`); selain itu ukur() langsung mengembalikan konteks kosong bersama, jadi
+# biayanya hanya satu pencarian konteks script per bagian.
+#
+# Byte dan hit/miss dibaca dari penghitung proses (hook session requests & dict stats cache), jadi angka satu
+# bagian bisa ikut memuat aktivitas sesi lain atau worker latar yang berjalan bersamaan. Alokasi memakai
+# tracemalloc yang memperlambat semua alokasi selama aktif, karena itu dinyalakan terpisah.
+#
+# Ekspor: ke_json() / ke_prometheus(), ditulis berkala ke METRIK_DIR (kinerja.json & kinerja.prom, bisa
+# dibaca textfile collector node_exporter) dan disajikan di /metrics oleh server proksi tile jika proksi itu
+# dijalankan (TILE_PROXY_URL diisi).
+#
+# Run penuh yang berhenti lebih awal (st.stop() / st.rerun()) tidak sampai ke selesai_rerun(); run seperti itu
+# ditutup oleh mulai_rerun() berikutnya di sesi yang sama dan ditandai "terhenti". Waktunya dihitung sampai
+# bagian terakhir yang selesai diukur, bukan sampai rerun berikutnya dimulai.
+#
+# Entri per sesi (panel debug, run yang sedang dicatat) dibuang oleh penyapuan berkala di atur_sesi() begitu
+# sesinya sudah ditutup Streamlit atau tidak rerun selama BATAS_DIAM_SESI; run yang masih terbuka ditandai
+# "terhenti".
+KAPASITAS_RIWAYAT = 200  # jumlah rerun terakhir yang disimpan
+METRIK_DIR = "data/metrik"
+INTERVAL_EKSPOR = 10  # detik minimum antar penulisan berkas metrik
+KUANTIL = (0.5, 0.9, 0.99)
+BATAS_DIAM_SESI = 3600  # detik tanpa rerun sebelum entri sesi dianggap basi
+INTERVAL_SAPU = 60  # detik minimum antar penyapuan entri sesi
+
+
+class _Kosong:
+    # Konteks/pengukur saat instrumentasi mati: tidak mencatat apa pun
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_KOSONG = _Kosong()
+
+
+class _Pengukur:
+    def __init__(self, instrumen, rerun, bagian):
+        self.instrumen = instrumen
+        self.rerun = rerun
+        self.bagian = bagian
+
+    def __enter__(self):
+        self.awal_byte = self.instrumen.byte
+        self.awal_cache = self.instrumen._hitung_cache()
+        self.awal_memori = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        self.awal = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        akhir = time.perf_counter()
+        hit, miss = self.instrumen._hitung_cache()
+        catatan = {
+            "detik": akhir - self.awal,
+            "byte": self.instrumen.byte - self.awal_byte,
+            "hit": hit - self.awal_cache[0],
+            "miss": miss - self.awal_cache[1],
+            "alokasi": None,
+        }
+        if self.awal_memori is not None and tracemalloc.is_tracing():
+            catatan["alokasi"] = tracemalloc.get_traced_memory()[0] - self.awal_memori
+        self.instrumen._simpan(self.rerun, self.bagian, catatan, akhir)
+        return False
+
+
+class Instrumen:
+    # Dipakai bersama semua sesi (satu per proses); riwayat dibaca panel debug & ekspor
+    def __init__(self, kapasitas=KAPASITAS_RIWAYAT, folder=METRIK_DIR, selalu=False, batas_diam=BATAS_DIAM_SESI):
+        self.folder = folder
+        self.selalu = selalu  # catat semua sesi tanpa menunggu panel debug dinyalakan
+        self.batas_diam = batas_diam
+        self.byte = 0
+        self._riwayat = deque(maxlen=kapasitas)  # rerun terbaru di kanan, yang terlama terbuang otomatis
+        self._sesi = set()  # id sesi yang menyalakan panel debug
+        self._sesi_alokasi = set()  # id sesi yang meminta pelacakan alokasi
+        self._berjalan = {}  # id sesi -> rerun penuh yang sedang dicatat
+        self._terlihat = {}  # id sesi -> waktu monotonic rerun terakhirnya (untuk penyapuan)
+        self._sapu_terakhir = time.monotonic()
+        self._cache = []  # (nama, dict stats, kunci hit, kunci miss)
+        self._kumulatif = {}  # bagian -> total sejak proses mulai (counter Prometheus tidak boleh turun)
+        self._nomor = 0
+        self._ekspor_terakhir = 0
+        self._lock = threading.Lock()
+        self.stats = {"rerun": 0, "bagian": 0, "terhenti": 0, "sesi_dibuang": 0, "ekspor": 0, "gagal_ekspor": 0}
+
+    # ---------- Sumber data ----------
+    def pantau_session(self, session):
+        # Hitung byte setiap respons requests.Session (isi sudah dibaca karena tidak ada stream=True)
+        session.hooks["response"].append(self._hook_respons)
+
+    def _hook_respons(self, resp, *args, **kwargs):
+        ukuran = len(resp.content or b"")
+        with self._lock:
+            self.byte += ukuran
+
+    def daftar_cache(self, nama, stats, hit=("hit",), miss=("miss",)):
+        # stats: dict penghitung milik cache (mis. KlienCuaca.stats); hanya dibaca
+        self._cache.append((nama, stats, tuple(hit), tuple(miss)))
+
+    def _hitung_cache(self):
+        hit = miss = 0
+        for _, stats, kunci_hit, kunci_miss in self._cache:
+            hit += sum(stats.get(k, 0) for k in kunci_hit)
+            miss += sum(stats.get(k, 0) for k in kunci_miss)
+        return hit, miss
+
+    # ---------- Sesi ----------
+    def atur_sesi(self, aktif, alokasi=False):
+        # Dipanggil setiap rerun dari checkbox panel debug sesi ini
+        ctx = get_script_run_ctx()
+        if ctx is None:
+            return
+        self.sapu()
+        with self._lock:
+            self._terlihat[ctx.session_id] = time.monotonic()
+            (self._sesi.add if aktif else self._sesi.discard)(ctx.session_id)
+            (self._sesi_alokasi.add if aktif and alokasi else self._sesi_alokasi.discard)(ctx.session_id)
+            lacak = bool(self._sesi_alokasi)
+        if lacak and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not lacak and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _aktif(self, ctx):
+        if ctx is None:
+            return False
+        if self.selalu:
+            return True
+        with self._lock:
+            return ctx.session_id in self._sesi
+
+    def sapu(self, paksa=False):
+        # Buang entri sesi yang sudah ditutup Streamlit atau diam lebih lama dari batas_diam, paling sering
+        # sekali per INTERVAL_SAPU. Mengembalikan jumlah sesi yang dibuang.
+        sekarang = time.monotonic()
+        with self._lock:
+            if not paksa and sekarang - self._sapu_terakhir < INTERVAL_SAPU:
+                return 0
+            self._sapu_terakhir = sekarang
+            daftar = set(self._terlihat) | self._sesi | self._sesi_alokasi | set(self._berjalan)
+            basi = {s for s in daftar if sekarang - self._terlihat.get(s, 0) > self.batas_diam}
+        basi |= {s for s in daftar - basi if not _sesi_hidup(s)}
+        if not basi:
+            return 0
+        with self._lock:
+            for s in basi:
+                self._sesi.discard(s)
+                self._sesi_alokasi.discard(s)
+                self._terlihat.pop(s, None)
+                sisa = self._berjalan.pop(s, None)
+                if sisa is not None:
+                    sisa["terhenti"] = True
+                    self.stats["terhenti"] += 1
+            self.stats["sesi_dibuang"] += len(basi)
+            lacak = bool(self._sesi_alokasi)
+        if not lacak and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return len(basi)
+
+    # ---------- Pencatatan ----------
+    def _rerun_baru(self, ctx, jenis):
+        with self._lock:
+            self._nomor += 1
+            rerun = {
+                "nomor": self._nomor, "sesi": ctx.session_id[:8], "jenis": jenis, "waktu": time.time(),
+                "awal": time.perf_counter(), "detik": 0.0, "terhenti": False, "bagian": {},
+            }
+            self._riwayat.append(rerun)
+            self.stats["rerun"] += 1
+        return rerun
+
+    def mulai_rerun(self):
+        # Awal run penuh script; bagian yang diukur sesudahnya masuk ke rerun ini.
+        # Sisa run sebelumnya yang tidak sampai selesai_rerun() ditutup dulu (juga saat panel sudah dimatikan).
+        ctx = get_script_run_ctx()
+        if ctx is None:
+            return
+        with self._lock:
+            self._terlihat[ctx.session_id] = time.monotonic()
+            sisa = self._berjalan.pop(ctx.session_id, None)
+        if sisa is not None:
+            with self._lock:
+                sisa["terhenti"] = True
+                self.stats["terhenti"] += 1
+            self.ekspor_berkala()
+        if not self._aktif(ctx):
+            return
+        rerun = self._rerun_baru(ctx, "app")
+        with self._lock:
+            self._berjalan[ctx.session_id] = rerun
+
+    def selesai_rerun(self):
+        ctx = get_script_run_ctx()
+        if ctx is None:
+            return
+        with self._lock:
+            rerun = self._berjalan.pop(ctx.session_id, None)
+            if rerun is not None:
+                rerun["detik"] = time.perf_counter() - rerun["awal"]
+        if rerun is not None:
+            self.ekspor_berkala()
+
+    def ukur(self, bagian):
+        ctx = get_script_run_ctx()
+        if not self._aktif(ctx):
+            return _KOSONG
+        with self._lock:
+            rerun = self._berjalan.get(ctx.session_id)
+        if rerun is None or ctx.fragment_ids_this_run:
+            # Run fragmen saja (atau run penuh tanpa mulai_rerun): bagian ini menjadi rerun tersendiri
+            rerun = self._rerun_baru(ctx, f"fragmen:{bagian}")
+        return _Pengukur(self, rerun, bagian)
+
+    def catat(self, bagian):
+        # Dekorator: seluruh pemanggilan fungsi diukur sebagai satu bagian (untuk fragmen)
+        def dekor(fungsi):
+            @wraps(fungsi)
+            def pembungkus(*args, **kwargs):
+                with self.ukur(bagian):
+                    return fungsi(*args, **kwargs)
+            return pembungkus
+        return dekor
+
+    def _simpan(self, rerun, bagian, catatan, akhir):
+        with self._lock:
+            # Bagian yang sama bisa berjalan lebih dari sekali dalam satu rerun: dijumlahkan
+            lama = rerun["bagian"].get(bagian)
+            if lama is not None:
+                for k, v in catatan.items():
+                    if v is not None:
+                        catatan[k] = v + (lama[k] or 0)
+            rerun["bagian"][bagian] = catatan
+            rerun["detik"] = max(rerun["detik"], akhir - rerun["awal"])
+            total = self._kumulatif.setdefault(bagian, {"jumlah": 0, "detik": 0.0, "byte": 0, "hit": 0, "miss": 0})
+            total["jumlah"] += 1
+            for k in ("detik", "byte", "hit", "miss"):
+                total[k] += catatan[k] - (lama[k] if lama is not None else 0)
+            self.stats["bagian"] += 1
+        if rerun["jenis"] != "app":
+            self.ekspor_berkala()
+
+    # ---------- Baca & ekspor ----------
+    def riwayat(self, sesi_ini=False, batas=None):
+        # Salinan rerun terbaru lebih dulu; sesi_ini=True hanya rerun milik sesi yang memanggil
+        ctx = get_script_run_ctx() if sesi_ini else None
+        sesi = ctx.session_id[:8] if ctx is not None else None
+        with self._lock:
+            daftar = [
+                {**{k: v for k, v in r.items() if k != "awal"}, "bagian": {b: dict(c) for b, c in r["bagian"].items()}}
+                for r in reversed(self._riwayat) if sesi is None or r["sesi"] == sesi
+            ]
+        return daftar[:batas] if batas else daftar
+
+    def ringkasan(self):
+        # bagian -> jumlah, total & kuantil waktu dari riwayat di ring buffer
+        per_bagian = {}
+        for rerun in self.riwayat():
+            for bagian, c in rerun["bagian"].items():
+                per_bagian.setdefault(bagian, []).append(c)
+        hasil = {}
+        for bagian, daftar in sorted(per_bagian.items()):
+            detik = sorted(c["detik"] for c in daftar)
+            alokasi = [c["alokasi"] for c in daftar if c["alokasi"] is not None]
+            hasil[bagian] = {
+                "jumlah": len(daftar),
+                "rata_ms": 1000 * sum(detik) / len(detik),
+                **{f"p{int(q * 100)}_ms": 1000 * _kuantil(detik, q) for q in KUANTIL},
+                "byte": sum(c["byte"] for c in daftar),
+                "hit": sum(c["hit"] for c in daftar),
+                "miss": sum(c["miss"] for c in daftar),
+                "alokasi_maks": max(alokasi) if alokasi else None,
+            }
+        return hasil
+
+    def ke_json(self):
+        return json.dumps(
+            {"dibuat": time.time(), "stats": dict(self.stats), "ringkasan": self.ringkasan(), "rerun": self.riwayat()},
+            ensure_ascii=False,
+        )
+
+    def ke_prometheus(self):
+        with self._lock:
+            kumulatif = {b: dict(t) for b, t in self._kumulatif.items()}
+            jumlah_rerun = self.stats["rerun"]
+        ringkasan = self.ringkasan()
+        baris = [
+            "# HELP dashboard_rerun_total Jumlah rerun yang tercatat.",
+            "# TYPE dashboard_rerun_total counter",
+            f"dashboard_rerun_total {jumlah_rerun}",
+            "# HELP dashboard_bagian_detik Waktu dinding per bagian dashboard (kuantil dari rerun terakhir).",
+            "# TYPE dashboard_bagian_detik summary",
+        ]
+        for bagian, t in sorted(kumulatif.items()):
+            label = f'bagian="{bagian}"'
+            for q in KUANTIL:
+                nilai = ringkasan.get(bagian, {}).get(f"p{int(q * 100)}_ms")
+                if nilai is not None:
+                    baris.append(f'dashboard_bagian_detik{{{label},quantile="{q}"}} {nilai / 1000:.6f}')
+            baris.append(f"dashboard_bagian_detik_sum{{{label}}} {t['detik']:.6f}")
+            baris.append(f"dashboard_bagian_detik_count{{{label}}} {t['jumlah']}")
+        for nama, kunci, bantuan in [
+            ("byte", "byte", "Byte diunduh selama bagian berjalan."),
+            ("cache_hit", "hit", "Hit cache selama bagian berjalan."),
+            ("cache_miss", "miss", "Miss cache selama bagian berjalan."),
+        ]:
+            baris.append(f"# HELP dashboard_bagian_{nama}_total {bantuan}")
+            baris.append(f"# TYPE dashboard_bagian_{nama}_total counter")
+            for bagian, t in sorted(kumulatif.items()):
+                baris.append(f'dashboard_bagian_{nama}_total{{bagian="{bagian}"}} {t[kunci]}')
+        alokasi = {b: r["alokasi_maks"] for b, r in ringkasan.items() if r["alokasi_maks"] is not None}
+        if alokasi:
+            baris.append("# HELP dashboard_bagian_alokasi_byte Alokasi bersih terbesar per bagian (rerun terakhir).")
+            baris.append("# TYPE dashboard_bagian_alokasi_byte gauge")
+            for bagian, nilai in sorted(alokasi.items()):
+                baris.append(f'dashboard_bagian_alokasi_byte{{bagian="{bagian}"}} {nilai}')
+        return "\n".join(baris) + "\n"
+
+    def ekspor_berkala(self, paksa=False):
+        # Tulis kinerja.json & kinerja.prom paling sering sekali per INTERVAL_EKSPOR
+        with self._lock:
+            if not self.folder or (not paksa and time.monotonic() - self._ekspor_terakhir < INTERVAL_EKSPOR):
+                return
+            self._ekspor_terakhir = time.monotonic()
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            for nama, isi in (("kinerja.json", self.ke_json()), ("kinerja.prom", self.ke_prometheus())):
+                path = os.path.join(self.folder, nama)
+                sementara = f"{path}.{os.getpid()}.tmp"
+                with open(sementara, "w", encoding="utf-8") as f:
+                    f.write(isi)
+                os.replace(sementara, path)  # atomik: pembaca tidak pernah melihat berkas setengah jadi
+            self.stats["ekspor"] += 1
+        except OSError:
+            self.stats["gagal_ekspor"] += 1
+
+
+def _sesi_hidup(session_id):
+    # Di luar server Streamlit (uji, skrip) tidak ada daftar sesi: hanya batas diam yang berlaku
+    if not runtime.exists():
+        return True
+    return runtime.get_instance().is_active_session(session_id)
+
+
+def _kuantil(urut, q):
+    # Kuantil dari daftar yang sudah urut (metode nearest-rank)
+    return urut[min(len(urut) - 1, max(0, int(round(q * len(urut))) - 1))]
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+# ------------------ Kebutuhan Air & Rekomendasi Irigasi ------------------
+KC_PADI = 1.1
+LEVEL_PERINGATAN = ["Aman", "Waspada", "Siaga", "Awas"]
+
+
+def rekomendasi_irigasi(curah_hujan, threshold):
+    hujan = np.asarray(curah_hujan, dtype=float)
+    return np.where(hujan < threshold, "Irigasi Diperlukan", "Cukup")
+
+
+def et0_hargreaves(lat, tanggal, suhu_maks, suhu_min):
+    # Evapotranspirasi acuan (mm/hari) metode Hargreaves, semua argumen berupa array sejajar
+    lat_rad = np.radians(np.asarray(lat, dtype=float))
+    j = pd.DatetimeIndex(tanggal).dayofyear.to_numpy()
+    dr = 1 + 0.033 * np.cos(2 * np.pi * j / 365)
+    delta = 0.409 * np.sin(2 * np.pi * j / 365 - 1.39)
+    ws = np.arccos(np.clip(-np.tan(lat_rad) * np.tan(delta), -1, 1))
+    ra = (24 * 60 / np.pi) * 0.0820 * dr * (
+        ws * np.sin(lat_rad) * np.sin(delta) + np.cos(lat_rad) * np.cos(delta) * np.sin(ws)
+    )
+    tmaks = np.asarray(suhu_maks, dtype=float)
+    tmin = np.asarray(suhu_min, dtype=float)
+    tmean = (tmaks + tmin) / 2
+    return 0.0023 * 0.408 * ra * (tmean + 17.8) * np.sqrt(np.clip(tmaks - tmin, 0, None))
+
+
+def hitung_irigasi(df, threshold, kc=KC_PADI):
+    # df format panjang (Lokasi, Lat, Lon, Tanggal, ...) dari KlienCuaca.ambil_banyak;
+    # seluruh (lokasi x hari) dihitung sekaligus tanpa loop per baris
+    df = df.copy()
+    hujan = df["Curah Hujan (mm)"].to_numpy(dtype=float)
+    kebutuhan = kc * et0_hargreaves(df["Lat"], df["Tanggal"], df["Suhu Maks (°C)"], df["Suhu Min (°C)"])
+    defisit = np.clip(kebutuhan - hujan, 0, None)
+
+    df["Kebutuhan Air (mm)"] = np.round(kebutuhan, 1)
+    df["Defisit Air (mm)"] = np.round(defisit, 1)
+    df["Rekomendasi Irigasi"] = rekomendasi_irigasi(hujan, threshold)
+    df["Level Peringatan"] = np.select(
+        [defisit <= 0, defisit < 3, defisit < 6], LEVEL_PERINGATAN[:3], LEVEL_PERINGATAN[3]
+    )
+    return df
+
+
+def ringkasan_lokasi(df_irigasi):
+    # Satu baris per lokasi: total defisit, jumlah hari perlu irigasi, level terburuk
+    level = pd.Categorical(df_irigasi["Level Peringatan"], categories=LEVEL_PERINGATAN, ordered=True)
+    return (
+        df_irigasi.assign(
+            _perlu=df_irigasi["Rekomendasi Irigasi"].eq("Irigasi Diperlukan"),
+            _level=level.codes,
+        )
+        .groupby(["Lokasi", "Lat", "Lon"], as_index=False, sort=False)
+        .agg(**{
+            "Total Defisit (mm)": ("Defisit Air (mm)", "sum"),
+            "Hari Perlu Irigasi": ("_perlu", "sum"),
+            "_level": ("_level", "max"),
+        })
+        .assign(**{"Level Peringatan": lambda d: np.asarray(LEVEL_PERINGATAN)[d["_level"]]})
+        .drop(columns="_level")
+    )
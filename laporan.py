@@ -0,0 +1,309 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# ------------------ Penyimpanan Laporan Warga (SQLite, mode WAL) ------------------
+LAPORAN_DB = "data/laporan.db"
+FORMAT_TANGGAL = "%d %B %Y %H:%M"
+
+SKEMA = """
+CREATE TABLE IF NOT EXISTS laporan (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    nama      TEXT NOT NULL,
+    kontak    TEXT NOT NULL,
+    jenis     TEXT NOT NULL,
+    lokasi    TEXT NOT NULL DEFAULT '',
+    deskripsi TEXT NOT NULL,
+    waktu     TEXT NOT NULL,  -- ISO 8601, untuk urutan & filter rentang tanggal
+    tanggal   TEXT NOT NULL,  -- teks tampilan seperti di laporan_warga.json lama
+    gambar    TEXT,
+    lat       REAL,           -- dari pin peta, GPS EXIF foto, atau gazetir desa
+    lon       REAL,
+    sumber_lokasi TEXT        -- 'peta' | 'gps' | 'gazetir'
+);
+CREATE INDEX IF NOT EXISTS idx_laporan_waktu ON laporan (waktu);
+CREATE INDEX IF NOT EXISTS idx_laporan_jenis ON laporan (jenis, waktu);
+CREATE INDEX IF NOT EXISTS idx_laporan_gambar ON laporan (gambar);
+DROP INDEX IF EXISTS idx_laporan_lokasi;
+CREATE INDEX IF NOT EXISTS idx_laporan_lokasi_waktu ON laporan (lokasi, waktu);
+"""
+
+# Indeks teks penuh untuk Deskripsi, disinkronkan lewat trigger
+SKEMA_FTS = """
+CREATE VIRTUAL TABLE IF NOT EXISTS laporan_fts USING fts5 (
+    deskripsi, content='laporan', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS laporan_fts_tambah AFTER INSERT ON laporan BEGIN
+    INSERT INTO laporan_fts (rowid, deskripsi) VALUES (new.id, new.deskripsi);
+END;
+CREATE TRIGGER IF NOT EXISTS laporan_fts_hapus AFTER DELETE ON laporan BEGIN
+    INSERT INTO laporan_fts (laporan_fts, rowid, deskripsi) VALUES ('delete', old.id, old.deskripsi);
+END;
+"""
+
+# Indeks spasial R*Tree (titik = kotak berukuran nol) untuk kueri kotak batas peta
+SKEMA_RTREE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS laporan_rtree USING rtree (id, lat_min, lat_max, lon_min, lon_max);
+CREATE TRIGGER IF NOT EXISTS laporan_rtree_tambah AFTER INSERT ON laporan WHEN new.lat IS NOT NULL BEGIN
+    INSERT INTO laporan_rtree VALUES (new.id, new.lat, new.lat, new.lon, new.lon);
+END;
+CREATE TRIGGER IF NOT EXISTS laporan_rtree_hapus AFTER DELETE ON laporan BEGIN
+    DELETE FROM laporan_rtree WHERE id = old.id;
+END;
+CREATE TRIGGER IF NOT EXISTS laporan_rtree_ubah AFTER UPDATE OF lat, lon ON laporan BEGIN
+    DELETE FROM laporan_rtree WHERE id = old.id;
+    INSERT INTO laporan_rtree SELECT new.id, new.lat, new.lat, new.lon, new.lon WHERE new.lat IS NOT NULL;
+END;
+"""
+
+# Nama kolom DB -> kunci dict laporan (sama dengan format JSON lama)
+KOLOM = {
+    "id": "id", "nama": "Nama", "kontak": "Kontak", "jenis": "Jenis", "lokasi": "Lokasi",
+    "deskripsi": "Deskripsi", "waktu": "Waktu", "tanggal": "Tanggal", "gambar": "Gambar",
+    "lat": "Lat", "lon": "Lon", "sumber_lokasi": "Sumber Lokasi",
+}
+
+# Kolom yang ditambahkan setelah skema awal: (nama, tipe) untuk ALTER TABLE pada database lama
+KOLOM_TAMBAHAN = [("lat", "REAL"), ("lon", "REAL"), ("sumber_lokasi", "TEXT")]
+
+
+def _ke_dict(baris):
+    return {KOLOM[k]: baris[k] for k in baris.keys()}
+
+
+SQL_TAMBAH = (
+    "INSERT INTO laporan (nama, kontak, jenis, lokasi, deskripsi, waktu, tanggal, gambar, lat, lon, sumber_lokasi) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _nilai(lap):
+    waktu = lap.get("Waktu") or _waktu_dari_tanggal(lap.get("Tanggal")) \
+        or datetime.now().isoformat(timespec="seconds")
+    return (lap.get("Nama", ""), lap.get("Kontak", ""), lap.get("Jenis", "Lainnya"), lap.get("Lokasi", ""),
+            lap.get("Deskripsi", ""), waktu, lap.get("Tanggal", ""), lap.get("Gambar"),
+            lap.get("Lat"), lap.get("Lon"), lap.get("Sumber Lokasi"))
+
+
+def _kueri_fts(teks):
+    # Setiap kata jadi pencarian prefiks berkutip, supaya tanda baca pengguna tidak merusak sintaks FTS
+    kata = re.findall(r"\w+", teks.lower())
+    return " ".join(f'"{k}"*' for k in kata)
+
+
+def _waktu_dari_tanggal(tanggal):
+    try:
+        return datetime.strptime(tanggal, FORMAT_TANGGAL).isoformat(timespec="seconds")
+    except (TypeError, ValueError):
+        return ""
+
+
+class StoreLaporan:
+    # Satu objek per proses; setiap thread (sesi Streamlit) memakai koneksinya sendiri.
+    # Sisip/hapus berupa transaksi kecil berdasarkan id, bukan menulis ulang seluruh file.
+    def __init__(self, path=LAPORAN_DB):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self._lokal = threading.local()
+        conn = self._koneksi()
+        conn.execute("PRAGMA journal_mode=WAL")
+        ada = {b["name"] for b in conn.execute("PRAGMA table_info(laporan)")}
+        if ada:
+            for nama, tipe in KOLOM_TAMBAHAN:
+                if nama not in ada:
+                    conn.execute(f"ALTER TABLE laporan ADD COLUMN {nama} {tipe}")
+        conn.executescript(SKEMA)
+        ada_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'laporan_fts'"
+        ).fetchone()
+        ada_rtree = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'laporan_rtree'"
+        ).fetchone()
+        conn.executescript(SKEMA_FTS)
+        conn.executescript(SKEMA_RTREE)
+        if not ada_fts:
+            # Database lama tanpa indeks teks: isi dari tabel laporan
+            conn.execute("INSERT INTO laporan_fts (laporan_fts) VALUES ('rebuild')")
+        if not ada_rtree:
+            conn.execute("INSERT INTO laporan_rtree SELECT id, lat, lat, lon, lon FROM laporan WHERE lat IS NOT NULL")
+        conn.commit()
+
+    def _koneksi(self):
+        conn = getattr(self._lokal, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._lokal.conn = conn
+        return conn
+
+    def tambah(self, laporan):
+        with self._koneksi() as conn:
+            cur = conn.execute(SQL_TAMBAH, _nilai(laporan))
+        return cur.lastrowid
+
+    def ambil(self, id_laporan):
+        baris = self._koneksi().execute("SELECT * FROM laporan WHERE id = ?", (id_laporan,)).fetchone()
+        return None if baris is None else _ke_dict(baris)
+
+    def hapus(self, id_laporan):
+        # Mengembalikan laporan yang dihapus (untuk membersihkan gambarnya), None jika tidak ada
+        with self._koneksi() as conn:
+            baris = conn.execute("SELECT * FROM laporan WHERE id = ?", (id_laporan,)).fetchone()
+            if baris is None:
+                return None
+            conn.execute("DELETE FROM laporan WHERE id = ?", (id_laporan,))
+        return _ke_dict(baris)
+
+    def semua(self):
+        return [_ke_dict(b) for b in self._koneksi().execute("SELECT * FROM laporan ORDER BY id")]
+
+    def jumlah(self):
+        return self._koneksi().execute("SELECT COUNT(*) FROM laporan").fetchone()[0]
+
+    def _syarat(self, jenis=None, mulai=None, sampai=None, lokasi=None, teks=None):
+        # (klausa WHERE, argumen) untuk filter daftar laporan; mulai/sampai: date/datetime
+        # (sampai inklusif sampai akhir hari)
+        syarat, arg = [], []
+        if jenis:
+            syarat.append(f"jenis IN ({', '.join('?' * len(jenis))})")
+            arg.extend(jenis)
+        if mulai:
+            syarat.append("waktu >= ?")
+            arg.append(mulai.isoformat())
+        if sampai:
+            syarat.append("waktu < ?")
+            arg.append((sampai + timedelta(days=1)).isoformat())
+        if lokasi:
+            syarat.append("lokasi = ?")
+            arg.append(lokasi)
+        if teks and _kueri_fts(teks):
+            syarat.append("id IN (SELECT rowid FROM laporan_fts WHERE laporan_fts MATCH ?)")
+            arg.append(_kueri_fts(teks))
+        return syarat, arg
+
+    def cari(self, jenis=None, mulai=None, sampai=None, lokasi=None, teks=None, batas=20, offset=0):
+        # Satu halaman laporan terbaru yang cocok dengan filter, beserta jumlah total kecocokan
+        syarat, arg = self._syarat(jenis, mulai, sampai, lokasi, teks)
+        where = f"WHERE {' AND '.join(syarat)}" if syarat else ""
+
+        conn = self._koneksi()
+        total = conn.execute(f"SELECT COUNT(*) FROM laporan {where}", arg).fetchone()[0]
+        baris = conn.execute(
+            f"SELECT * FROM laporan {where} ORDER BY waktu DESC, id DESC LIMIT ? OFFSET ?",
+            arg + [batas, offset],
+        ).fetchall()
+        return [_ke_dict(b) for b in baris], total
+
+    def iter_potongan(self, kolom, jenis=None, mulai=None, sampai=None, lokasi=None, teks=None, ukuran=5000):
+        # Semua laporan yang cocok (urut id) sebagai potongan list tuple berisi `kolom` (nama kolom DB).
+        # Halaman berikutnya dimulai dari id terakhir (bukan OFFSET), jadi tiap potongan sama murahnya
+        # dan memori hanya menampung satu potongan, berapa pun jumlah laporannya.
+        syarat, arg = self._syarat(jenis, mulai, sampai, lokasi, teks)
+        sql = (
+            f"SELECT id, {', '.join(kolom)} FROM laporan WHERE {' AND '.join(syarat + ['id > ?'])} "
+            "ORDER BY id LIMIT ?"
+        )
+        cur = self._koneksi().cursor()
+        cur.row_factory = None
+        terakhir = 0
+        while True:
+            baris = cur.execute(sql, arg + [terakhir, ukuran]).fetchall()
+            if not baris:
+                return
+            terakhir = baris[-1][0]
+            yield [b[1:] for b in baris]
+            if len(baris) < ukuran:
+                return
+
+    def gambar_dipakai(self, path_gambar):
+        # Foto disimpan per hash isi, jadi satu file bisa dipakai beberapa laporan
+        return self._koneksi().execute(
+            "SELECT 1 FROM laporan WHERE gambar = ? LIMIT 1", (path_gambar,)
+        ).fetchone() is not None
+
+    def daftar_lokasi(self):
+        return [b[0] for b in self._koneksi().execute(
+            "SELECT DISTINCT lokasi FROM laporan WHERE lokasi != '' ORDER BY lokasi"
+        )]
+
+    def versi(self):
+        # Berubah setiap ada laporan ditambah/dihapus/digeokode; dipakai sebagai kunci cache
+        return tuple(self._koneksi().execute("SELECT COUNT(*), MAX(id), COUNT(lat) FROM laporan").fetchone())
+
+    # ---------- Spasial ----------
+    def isi_koordinat(self, cari_koordinat, sumber="gazetir"):
+        # Geokode laporan yang belum berkoordinat; cari_koordinat(lokasi) -> (lat, lon) atau None.
+        # Dipanggil sekali per nama lokasi unik, bukan per laporan.
+        conn = self._koneksi()
+        nama = [b[0] for b in conn.execute(
+            "SELECT DISTINCT lokasi FROM laporan WHERE lat IS NULL AND lokasi != ''"
+        )]
+        ubah = []
+        for lokasi in nama:
+            titik = cari_koordinat(lokasi)
+            if titik:
+                ubah.append((titik[0], titik[1], sumber, lokasi))
+        with conn:
+            conn.executemany(
+                "UPDATE laporan SET lat = ?, lon = ?, sumber_lokasi = ? WHERE lokasi = ? AND lat IS NULL", ubah
+            )
+        return len(ubah)
+
+    def dalam_kotak(self, lat_min, lon_min, lat_max, lon_max, jenis=None, batas=None):
+        # Laporan berkoordinat di dalam kotak batas, terbaru dulu. Jumlah titik dihitung dulu
+        # lewat R*Tree: kotak kecil diambil lewat R*Tree lalu diurutkan, kotak yang berisi jauh
+        # lebih banyak titik dari `batas` lebih cepat dipindai dari indeks waktu (terbaru dulu).
+        kotak = [lat_min, lat_max, lon_min, lon_max]
+        conn = self._koneksi()
+        n = conn.execute(
+            "SELECT COUNT(*) FROM laporan_rtree WHERE lat_max >= ? AND lat_min <= ? AND lon_max >= ? AND lon_min <= ?",
+            kotak,
+        ).fetchone()[0]
+        if batas and n > 4 * batas:
+            syarat, arg = ["lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?"], list(kotak)
+            sumber = "laporan"
+        else:
+            syarat, arg = ["r.lat_max >= ? AND r.lat_min <= ? AND r.lon_max >= ? AND r.lon_min <= ?"], list(kotak)
+            sumber = "laporan_rtree r JOIN laporan ON laporan.id = r.id"
+        if jenis:
+            syarat.append(f"jenis IN ({', '.join('?' * len(jenis))})")
+            arg.extend(jenis)
+        sql = (
+            f"SELECT laporan.id, jenis, lokasi, tanggal, lat, lon FROM {sumber} "
+            f"WHERE {' AND '.join(syarat)} ORDER BY waktu DESC"
+        )
+        if batas:
+            sql += " LIMIT ?"
+            arg.append(batas)
+        cur = conn.cursor()
+        cur.row_factory = None
+        return pd.DataFrame(cur.execute(sql, arg).fetchall(), columns=["id", "Jenis", "Lokasi", "Tanggal", "Lat", "Lon"])
+
+    def koordinat(self):
+        # Semua titik laporan (Lat, Lon, Jenis) untuk agregasi hotspot; tanpa sqlite3.Row agar ringan
+        cur = self._koneksi().cursor()
+        cur.row_factory = None
+        baris = cur.execute("SELECT lat, lon, jenis FROM laporan WHERE lat IS NOT NULL").fetchall()
+        return pd.DataFrame(baris, columns=["Lat", "Lon", "Jenis"])
+
+    def migrasi_json(self, path_json):
+        # Impor sekali dari laporan_warga.json lama, lalu file diganti nama menjadi *.migrated
+        if not os.path.exists(path_json):
+            return 0
+        with open(path_json, "r", encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                data = []
+        with self._koneksi() as conn:
+            conn.executemany(SQL_TAMBAH, [_nilai(lap) for lap in data])
+        os.replace(path_json, f"{path_json}.migrated")
+        return len(data)
@@ -0,0 +1,60 @@
+import hashlib
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+# ------------------ Registri Model Prediksi Panen ------------------
+RIWAYAT_PANEN_FILE = "data/riwayat_panen.csv"
+MODEL_DIR = "data/model"
+FITUR = ["Curah Hujan (mm)", "Suhu (°C)", "Kelembapan (%)"]
+TARGET = "Hasil Panen (kg/ha)"
+
+
+def baca_riwayat(path=RIWAYAT_PANEN_FILE):
+    # Data historis hasil panen + cuaca per musim (CSV atau Parquet)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, columns=FITUR + [TARGET])
+    return pd.read_csv(path, usecols=FITUR + [TARGET])
+
+
+def versi_data(path=RIWAYAT_PANEN_FILE):
+    # Versi model = hash isi data latih + daftar fitur, jadi data baru otomatis melatih ulang
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for blok in iter(lambda: f.read(1 << 20), b""):
+            h.update(blok)
+    h.update("|".join(FITUR + [TARGET]).encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+def latih_model(df):
+    return LinearRegression().fit(df[FITUR].to_numpy(dtype=float), df[TARGET].to_numpy(dtype=float))
+
+
+def muat_model(path=RIWAYAT_PANEN_FILE, model_dir=MODEL_DIR):
+    # Pakai model tersimpan untuk versi data ini; latih & simpan hanya jika belum ada
+    versi = versi_data(path)
+    file_model = os.path.join(model_dir, f"model_panen_{versi}.joblib")
+    if os.path.exists(file_model):
+        return joblib.load(file_model), versi
+
+    model = latih_model(baca_riwayat(path))
+    if not os.path.exists(model_dir):
+        os.makedirs(model_dir)
+    tmp = f"{file_model}.{os.getpid()}.tmp"
+    joblib.dump(model, tmp)
+    os.replace(tmp, file_model)
+    return model, versi
+
+
+def prediksi(model, baris):
+    # Prediksi banyak baris sekaligus; baris yang mengandung NaN (data kosong) bernilai 0
+    X = np.asarray(baris, dtype=float).reshape(-1, len(FITUR))
+    valid = ~np.isnan(X).any(axis=1)
+    hasil = np.zeros(len(X))
+    if valid.any():
+        hasil[valid] = model.predict(X[valid])
+    return hasil
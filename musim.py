@@ -0,0 +1,193 @@
+import os
+import warnings
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import requests
+
+from cuaca import buat_df_harian, kunci_lokasi
+
+# ------------------ Klimatologi & Musim Tanam Sidrap ------------------
+ARSIP_URL = "https://archive-api.open-meteo.com/v1/archive"
+PARAM_ARSIP_DAILY = "temperature_2m_min,temperature_2m_max,precipitation_sum,relative_humidity_2m_mean"
+KLIMATOLOGI_DIR = "data/klimatologi"
+KOLOM_IKLIM = ["Curah Hujan (mm)", "Suhu Maks (°C)", "Suhu Min (°C)", "Kelembapan (%)"]
+TAHUN_KLIMATOLOGI = 10
+JEDA_ARSIP = 5  # data arsip (reanalisis) tertinggal beberapa hari
+
+# Tiga musim tanam padi (IP 300): (nama, bulan tanam, tanggal tanam)
+MUSIM_TANAM_SIDRAP = [
+    ("Panen 1 (MT Rendengan)", 10, 1),
+    ("Panen 2 (MT Gadu)", 2, 1),
+    ("Panen 3 (MT III)", 6, 1),
+]
+LAMA_MUSIM = 110
+
+
+def file_klimatologi(lat, lon, folder=KLIMATOLOGI_DIR):
+    # Agregat per slot kalender (.kalender); berkas .harian lama (per dayofyear) tidak dipakai lagi
+    nama = kunci_lokasi(lat, lon).replace(",", "_")
+    return os.path.join(folder, f"{nama}.parquet"), os.path.join(folder, f"{nama}.kalender.parquet")
+
+
+def hari_kalender(tanggal):
+    # Slot 1..366 berdasarkan (bulan, tanggal) pada kalender tahun kabisat: 29 Feb = 60, 1 Mar = 61 di
+    # semua tahun. dayofyear biasa menggeser setiap tanggal setelah Februari satu slot di tahun non-kabisat.
+    tanggal = pd.DatetimeIndex(tanggal)
+    hari = tanggal.dayofyear.to_numpy()
+    return hari + ((~tanggal.is_leap_year) & (tanggal.month > 2)).astype(int)
+
+
+def _agregat_kosong():
+    return pd.DataFrame(
+        0.0, index=pd.RangeIndex(1, 367, name="Hari"),
+        columns=[f"jumlah {k}" for k in KOLOM_IKLIM] + [f"cacah {k}" for k in KOLOM_IKLIM],
+    )
+
+
+def _tambah_agregat(agregat, df):
+    hari = hari_kalender(df["Tanggal"])
+    nilai = df[KOLOM_IKLIM]
+    agregat[[f"jumlah {k}" for k in KOLOM_IKLIM]] += (
+        nilai.groupby(hari).sum().reindex(agregat.index, fill_value=0).to_numpy()
+    )
+    agregat[[f"cacah {k}" for k in KOLOM_IKLIM]] += (
+        nilai.notna().groupby(hari).sum().reindex(agregat.index, fill_value=0).to_numpy()
+    )
+    return agregat
+
+
+def _potong_ekor_kosong(df):
+    # Hari terakhir arsip bisa masih null (reanalisis belum lengkap): buang baris di belakang hari terakhir
+    # yang berisi data, supaya hari itu diunduh lagi pada pembaruan berikutnya
+    ada = df[KOLOM_IKLIM].notna().any(axis=1).to_numpy()
+    if not ada.any():
+        return df.iloc[:0]
+    return df.iloc[:np.flatnonzero(ada)[-1] + 1]
+
+
+def unduh_arsip(lat, lon, mulai, sampai, session, base_url=ARSIP_URL, timeout=(3.05, 30)):
+    params = {
+        "latitude": lat, "longitude": lon,
+        "start_date": mulai.isoformat(), "end_date": sampai.isoformat(),
+        "daily": PARAM_ARSIP_DAILY, "timezone": "auto",
+    }
+    resp = session.get(base_url, params=params, timeout=timeout)
+    resp.raise_for_status()
+    data = resp.json()
+    # Hari yang belum tersedia di arsip bernilai null di JSON: jadikan NaN sebelum dibulatkan
+    data["daily"] = {
+        k: (v if k == "time" else np.asarray(v, dtype=float)) for k, v in data["daily"].items()
+    }
+    return buat_df_harian(data)
+
+
+def _tulis_parquet(df, path):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def perbarui_klimatologi(lat, lon, session, hari_ini=None, folder=KLIMATOLOGI_DIR, base_url=ARSIP_URL):
+    # Riwayat harian disimpan di Parquet; hanya hari yang belum ada yang diunduh, dan
+    # agregat per slot kalender (jumlah & cacah, lihat hari_kalender) ditambah dari hari baru saja.
+    # Mengembalikan rata-rata harian (index 1..366) atau None jika belum ada data sama sekali.
+    path_riwayat, path_agregat = file_klimatologi(lat, lon, folder)
+    hari_ini = hari_ini or date.today()
+    sampai = hari_ini - timedelta(days=JEDA_ARSIP)
+
+    if os.path.exists(path_riwayat):
+        riwayat = _potong_ekor_kosong(pd.read_parquet(path_riwayat))
+        if os.path.exists(path_agregat):
+            agregat = pd.read_parquet(path_agregat).set_index("Hari")
+        else:
+            # Riwayat dari versi lama (agregat per dayofyear): agregat dibangun ulang sekali dari riwayat
+            agregat = _tambah_agregat(_agregat_kosong(), riwayat)
+            _tulis_parquet(agregat.reset_index(), path_agregat)
+        if riwayat.empty:
+            riwayat = None
+    else:
+        riwayat, agregat = None, _agregat_kosong()
+    if riwayat is not None:
+        mulai = riwayat["Tanggal"].max().date() + timedelta(days=1)
+    else:
+        mulai = sampai - timedelta(days=365 * TAHUN_KLIMATOLOGI)
+
+    if mulai <= sampai:
+        try:
+            baru = unduh_arsip(lat, lon, mulai, sampai, session, base_url)
+        except (requests.RequestException, ValueError, KeyError):
+            baru = None
+        if baru is not None:
+            baru = _potong_ekor_kosong(baru)
+        if baru is not None and not baru.empty:
+            agregat = _tambah_agregat(agregat, baru)
+            riwayat = baru if riwayat is None else pd.concat([riwayat, baru], ignore_index=True)
+            if not os.path.exists(folder):
+                os.makedirs(folder)
+            _tulis_parquet(riwayat, path_riwayat)
+            _tulis_parquet(agregat.reset_index(), path_agregat)
+
+    if riwayat is None:
+        return None
+    return rata_rata_harian(agregat)
+
+
+def rata_rata_harian(agregat):
+    jumlah = agregat[[f"jumlah {k}" for k in KOLOM_IKLIM]].to_numpy()
+    cacah = agregat[[f"cacah {k}" for k in KOLOM_IKLIM]].to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rata = np.where(cacah > 0, jumlah / cacah, np.nan)
+    return pd.DataFrame(rata, index=agregat.index, columns=KOLOM_IKLIM)
+
+
+def jendela_musim(hari_ini=None, musim=MUSIM_TANAM_SIDRAP, lama=LAMA_MUSIM):
+    # Untuk tiap musim: tanggal tanam terdekat yang panennya belum lewat
+    hari_ini = pd.Timestamp(hari_ini or date.today()).normalize()
+    hasil = []
+    for nama, bulan, tanggal in musim:
+        for tahun in (hari_ini.year - 1, hari_ini.year, hari_ini.year + 1):
+            mulai = pd.Timestamp(tahun, bulan, tanggal)
+            if mulai + pd.Timedelta(days=lama) >= hari_ini:
+                hasil.append((nama, mulai))
+                break
+    return hasil
+
+
+def fitur_musim_banyak(klimatologi, prakiraan=None, hari_ini=None, kolom=None, lama=LAMA_MUSIM):
+    # klimatologi: dict lokasi -> rata-rata harian (hasil perbarui_klimatologi)
+    # prakiraan: DataFrame panjang (Lokasi, Tanggal, ...) yang menimpa klimatologi pada tanggalnya
+    # Hasil: satu baris per (lokasi, musim) berisi rata-rata cuaca selama musim tanam
+    kolom = kolom or ["Curah Hujan (mm)", "Suhu Maks (°C)", "Kelembapan (%)"]
+    lokasi = list(klimatologi)
+    # Hasil rata_rata_harian selalu berindeks 1..366, jadi cukup ambil kolomnya langsung
+    iklim = np.stack([
+        klimatologi[l].to_numpy()[:, klimatologi[l].columns.get_indexer(kolom)]
+        if len(klimatologi[l]) == 366 else klimatologi[l].reindex(range(1, 367))[kolom].to_numpy()
+        for l in lokasi
+    ])
+
+    jendela = jendela_musim(hari_ini, lama=lama)
+    tanggal = pd.DatetimeIndex(np.concatenate([pd.date_range(m, periods=lama).values for _, m in jendela]))
+    hari = (hari_kalender(tanggal) - 1).reshape(len(jendela), lama)
+    nilai = iklim[:, hari, :]  # (lokasi, musim, hari, kolom)
+
+    if prakiraan is not None and not prakiraan.empty:
+        p = prakiraan[prakiraan["Lokasi"].isin(lokasi)]
+        idx_lokasi = pd.Index(lokasi).get_indexer(p["Lokasi"])
+        isi = p[kolom].to_numpy(dtype=float)
+        for i, (_, mulai) in enumerate(jendela):
+            geser = (p["Tanggal"] - mulai).dt.days.to_numpy()
+            ok = (geser >= 0) & (geser < lama)
+            nilai[idx_lokasi[ok], i, geser[ok], :] = isi[ok]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        rata = np.nanmean(nilai, axis=2)
+    return pd.DataFrame({
+        "Lokasi": np.repeat(lokasi, len(jendela)),
+        "Musim": [nama for nama, _ in jendela] * len(lokasi),
+        "Mulai Tanam": [mulai for _, mulai in jendela] * len(lokasi),
+        **{k: rata[:, :, j].ravel() for j, k in enumerate(kolom)},
+    })
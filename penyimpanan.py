@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: tanpa kunci antar-proses, penulisan tetap atomik
+    fcntl = None
+
+# ------------------ Penyimpanan JSON Atomik & Aman Konkurensi ------------------
+# Dipakai untuk harga komoditas dan pengingat harian. Penulisan: file sementara di folder
+# yang sama -> fsync -> os.replace, di bawah kunci file (fcntl) sehingga sesi/proses lain
+# tidak pernah membaca file setengah jadi dan tidak saling menimpa.
+
+VERSI_KOSONG = "kosong"  # versi file yang belum ada; tulis(versi=VERSI_KOSONG) gagal jika file sudah dibuat pihak lain
+_cache = {}  # path absolut -> (cap file, data, versi); dipakai bersama semua objek di proses ini
+_lock_cache = threading.Lock()
+
+
+class KonflikTulis(Exception):
+    # File sudah diubah pihak lain sejak versi yang dibaca pemanggil
+    pass
+
+
+def _salin(data):
+    # Salinan dalam untuk struktur JSON (list/dict/skalar), jauh lebih murah dari copy.deepcopy
+    if isinstance(data, list):
+        return [_salin(v) for v in data]
+    if isinstance(data, dict):
+        return {k: _salin(v) for k, v in data.items()}
+    return data
+
+
+def _versi(isi):
+    return hashlib.sha256(isi).hexdigest()[:16]
+
+
+class BerkasJSON:
+    def __init__(self, path, default=None):
+        self.path = os.path.abspath(path)
+        self.default = default if default is not None else []
+        self._path_kunci = f"{self.path}.lock"
+
+    @contextmanager
+    def _kunci(self):
+        folder = os.path.dirname(self.path)
+        if not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+        with open(self._path_kunci, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def cap(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def baca(self):
+        # (data, versi). File hanya di-parse ulang jika mtime/ukuran/inode berubah; data dikembalikan
+        # sebagai salinan supaya perubahan oleh pemanggil tidak mengotori cache.
+        cap = self.cap()
+        with _lock_cache:
+            tersimpan = _cache.get(self.path)
+        if tersimpan is not None and tersimpan[0] == cap:
+            return _salin(tersimpan[1]), tersimpan[2]
+        return self._baca_berkas()
+
+    def _baca_berkas(self):
+        # Selalu membaca isi file. Dipakai di bawah kunci sebelum menulis: cap bisa sama untuk dua isi
+        # berbeda (inode dipakai ulang, ukuran sama, mtime dalam satu tick), jadi cache tidak cukup di sini.
+        cap = self.cap()
+        if cap is None:
+            return _salin(self.default), VERSI_KOSONG
+        try:
+            with open(self.path, "rb") as f:
+                isi = f.read()
+        except FileNotFoundError:
+            return _salin(self.default), VERSI_KOSONG
+        try:
+            data = json.loads(isi.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            data = _salin(self.default)
+        versi = _versi(isi)
+        with _lock_cache:
+            _cache[self.path] = (cap, data, versi)
+        return _salin(data), versi
+
+    def _tulis(self, data):
+        isi = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(isi)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        # fsync folder agar rename juga tahan crash (tidak tersedia di semua OS)
+        try:
+            fd = os.open(os.path.dirname(self.path), os.O_RDONLY)
+        except OSError:
+            fd = None
+        if fd is not None:
+            try:
+                os.fsync(fd)
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+        versi = _versi(isi)
+        with _lock_cache:
+            _cache[self.path] = (self.cap(), _salin(data), versi)
+        return versi
+
+    def tulis(self, data, versi=None):
+        # Tulis seluruh isi. Jika versi diberikan (hasil baca() sebelumnya) dan file sudah berubah
+        # sejak itu, KonflikTulis dilempar dan file tidak disentuh.
+        with self._kunci():
+            if versi is not None:
+                _, sekarang = self._baca_berkas()
+                if sekarang != versi:
+                    raise KonflikTulis(self.path)
+            return self._tulis(data)
+
+    def ubah(self, fungsi):
+        # Baca-ubah-tulis di bawah kunci: fungsi(data) -> data baru. Tidak ada pembaruan yang hilang
+        # walau banyak sesi/proses mengubah file bersamaan. Mengembalikan data baru.
+        with self._kunci():
+            data, _ = self._baca_berkas()
+            data = fungsi(data)
+            self._tulis(data)
+        return data
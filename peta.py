@@ -0,0 +1,98 @@
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+from streamlit_folium import st_folium
+
+try:
+    # Bagian internal streamlit-folium yang dipakai st_folium sendiri untuk menyiapkan komponen
+    from streamlit_folium import _component_func, _get_header, _get_html, _get_map_string, generate_js_hash, get_full_id
+except ImportError:  # versi lain: tetap jalan lewat st_folium biasa, hanya tanpa cache render
+    _component_func = None
+# Bagian internal di atas dipastikan cocok untuk streamlit-folium 0.27.x (dipatok di requirements.txt).
+# Jika tanda tangannya berubah (TypeError/AttributeError), tampil_peta kembali ke st_folium.
+
+# ------------------ Komponen Peta Folium (HTML di-cache, event dibatasi) ------------------
+# st_folium me-render ulang seluruh peta setiap rerun: script hasil render (berisi ribuan titik laporan)
+# dikompilasi ulang oleh jinja, ~200 ms. Tanpa returned_objects, komponen juga mengirim nilai baru setiap
+# peta digeser/di-zoom (bounds, zoom, center berubah), dan setiap kiriman = satu rerun seluruh script.
+# tampil_peta me-render peta sekali per kunci (lokasi, lapisan, versi data) dan memakai ulang hasilnya untuk
+# semua rerun & sesi; yang dikembalikan hanya KEJADIAN_PETA, jadi geser/zoom tidak memicu rerun sama sekali
+# dan klik hanya dikirim setelah jeda debounce 250 ms di frontend komponen.
+KEJADIAN_PETA = ("last_clicked",)
+BATAS_CACHE_PETA = 32
+
+
+def _elemen(e):
+    yield e
+    for anak in getattr(e, "_children", {}).values():
+        yield from _elemen(anak)
+
+
+def siapkan_peta(m, key, returned_objects=KEJADIAN_PETA):
+    # folium.Map -> argumen komponen st_folium (sama seperti yang disusun st_folium), dapat dipakai ulang
+    m.get_root().render()
+    m.render()
+    html, header = _get_html(m), _get_header(m)
+    script = _get_map_string(m)
+    css, js = [], []
+    for elemen in _elemen(m):
+        css.extend(href for _, href in getattr(elemen, "default_css", []))
+        js.extend(src for _, src in getattr(elemen, "default_js", []))
+    return {
+        "script": script, "header": header, "html": html, "id": get_full_id(m),
+        "key": generate_js_hash(script, key, False),
+        # Nilai awal hanya untuk event yang dikembalikan; semua event klik bernilai None sebelum ada klik
+        "returned_objects": list(returned_objects), "default": {k: None for k in returned_objects},
+        "css_links": list(dict.fromkeys(css)), "js_links": list(dict.fromkeys(js)),
+    }
+
+
+class CachePeta:
+    # Argumen komponen per kunci peta, dipakai bersama semua sesi dan hanya-baca
+    def __init__(self, batas=BATAS_CACHE_PETA):
+        self.batas = batas
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hit": 0, "bangun": 0, "cadangan": 0}
+
+    def ambil(self, kunci, bangun):
+        with self._lock:
+            arg = self._cache.get(kunci)
+            if arg is not None:
+                self._cache.move_to_end(kunci)
+                self.stats["hit"] += 1
+                return arg
+        arg = bangun()
+        with self._lock:
+            self.stats["bangun"] += 1
+            self._cache[kunci] = arg
+            while len(self._cache) > self.batas:
+                self._cache.popitem(last=False)
+        return arg
+
+
+def tampil_peta(cache, kunci, bangun, key, height=400, returned_objects=KEJADIAN_PETA):
+    # bangun: fungsi tanpa argumen -> folium.Map, hanya dipanggil jika kunci belum ada di cache.
+    # Mengembalikan dict event seperti st_folium; nilai terakhir juga ada di st.session_state[key].
+    if _component_func is not None:
+        try:
+            return _tampil_tercache(cache, kunci, bangun, key, height, returned_objects)
+        except (TypeError, AttributeError):
+            # API internal streamlit-folium berbeda dari yang diharapkan: render biasa tanpa cache
+            with cache._lock:
+                cache.stats["cadangan"] += 1
+    return st_folium(bangun(), height=height, use_container_width=True, key=key,
+                     returned_objects=list(returned_objects))
+
+
+def _tampil_tercache(cache, kunci, bangun, key, height, returned_objects):
+    arg = cache.ambil((kunci, key, tuple(returned_objects)), lambda: siapkan_peta(bangun(), key, returned_objects))
+
+    def saat_berubah():
+        st.session_state[key] = st.session_state.get(arg["key"], {})
+
+    return _component_func(
+        **arg, height=height, width=None, zoom=None, center=None, feature_group=None, return_on_hover=False,
+        layer_control=None, pixelated=False, on_change=saat_berubah, wrap_longitude=False,
+    )
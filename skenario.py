@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from model_panen import prediksi
+
+# ------------------ Mesin Skenario Laba Panen ------------------
+# Semua skenario (hasil x harga x luas x biaya) dihitung dalam satu operasi broadcasting NumPy,
+# sehingga bisa dipakai dari dashboard maupun skrip perencanaan massal.
+#
+# Ukuran grid dibatasi BATAS_SKENARIO sel (float32): jika melebihi, sumbu hasil (yang terpanjang, mis.
+# kombinasi cuaca x langkah) disampel merata pada kuantilnya sehingga sebaran hasil tetap terwakili.
+# Tanpa batas, slider penuh di dashboard (37,5 juta sel float64) memakan ~900 MB per geseran.
+PERSENTIL = [5, 25, 50, 75, 95]
+BATAS_SKENARIO = 2_000_000  # sel per evaluasi, ~8 MB dalam float32
+
+
+def hasil_dari_cuaca(model, curah_hujan, suhu, kelembapan):
+    # Hasil panen (kg/ha) untuk setiap kombinasi cuaca, satu panggilan model
+    h, s, k = np.meshgrid(curah_hujan, suhu, kelembapan, indexing="ij")
+    return prediksi(model, np.column_stack([h.ravel(), s.ravel(), k.ravel()]))
+
+
+def sampel_merata(nilai, n):
+    # n nilai pada kuantil berjarak sama (nilai diurutkan); utuh jika sudah <= n
+    nilai = np.asarray(nilai).ravel()
+    if nilai.size <= n:
+        return nilai
+    return np.sort(nilai)[np.linspace(0, nilai.size - 1, n).round().astype(int)]
+
+
+def jumlah_skenario(hasil_per_ha, harga, luas, biaya):
+    return int(np.prod([np.size(hasil_per_ha), np.size(harga), np.size(luas), np.size(biaya)]))
+
+
+def evaluasi_skenario(hasil_per_ha, harga, luas, biaya, dtype=np.float32, batas=BATAS_SKENARIO):
+    # Laba bersih dengan bentuk (hasil, harga, luas, biaya); sumbu hasil disampel jika total sel > batas
+    if batas and jumlah_skenario(hasil_per_ha, harga, luas, biaya) > batas:
+        lain = np.size(harga) * np.size(luas) * np.size(biaya)
+        hasil_per_ha = sampel_merata(hasil_per_ha, max(batas // lain, 1))
+    hasil_per_ha = np.asarray(hasil_per_ha, dtype=dtype).reshape(-1, 1, 1, 1)
+    harga = np.asarray(harga, dtype=dtype).reshape(1, -1, 1, 1)
+    luas = np.asarray(luas, dtype=dtype).reshape(1, 1, -1, 1)
+    biaya = np.asarray(biaya, dtype=dtype).reshape(1, 1, 1, -1)
+    return (hasil_per_ha * harga - biaya) * luas
+
+
+def harga_impas(hasil_per_ha, biaya):
+    # Harga minimum (Rp/kg) agar tidak rugi, bentuk (hasil, biaya); tidak bergantung luas
+    hasil_per_ha = np.asarray(hasil_per_ha, dtype=float).reshape(-1, 1)
+    biaya = np.asarray(biaya, dtype=float).reshape(1, -1)
+    with np.errstate(divide="ignore"):
+        return np.where(hasil_per_ha > 0, biaya / hasil_per_ha, np.inf)
+
+
+def ringkasan_laba(laba):
+    nilai = np.percentile(laba.ravel(), PERSENTIL)
+    ringkasan = {f"Laba P{p} (Rp)": float(v) for p, v in zip(PERSENTIL, nilai)}
+    ringkasan["Peluang Rugi (%)"] = float(np.count_nonzero(laba < 0) / laba.size * 100)
+    return ringkasan
+
+
+def peta_laba(laba):
+    # Median laba per (harga, biaya) untuk heatmap; sumbu hasil & luas diringkas.
+    # Dihitung per irisan harga supaya salinan kerja median hanya sebesar satu irisan.
+    return np.stack([
+        np.median(laba[:, i].reshape(-1, laba.shape[3]), axis=0) for i in range(laba.shape[1])
+    ])
+
+
+def ringkasan_komoditas(hasil_default, harga_dasar, luas, biaya, variasi=0.2, langkah=50):
+    # Persentil laba per komoditas dengan hasil & harga bervariasi +/- variasi dari nilai dasar
+    baris = []
+    for komoditas, hasil in hasil_default.items():
+        if komoditas not in harga_dasar:
+            continue
+        hasil_arr = np.linspace(hasil * (1 - variasi), hasil * (1 + variasi), langkah)
+        harga_arr = np.linspace(harga_dasar[komoditas] * (1 - variasi), harga_dasar[komoditas] * (1 + variasi), langkah)
+        laba = evaluasi_skenario(hasil_arr, harga_arr, luas, biaya)
+        baris.append({
+            "Komoditas": komoditas,
+            "Jumlah Skenario": jumlah_skenario(hasil_arr, harga_arr, luas, biaya),
+            **ringkasan_laba(laba),
+            "Harga Impas Median (Rp/kg)": float(np.median(harga_impas(hasil_arr, biaya))),
+        })
+    return pd.DataFrame(baris)
@@ -0,0 +1,85 @@
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "fixture")
+
+
+class _Server(ThreadingHTTPServer):
+    # Antrean listen bawaan (5) terlalu pendek untuk pool klien 8 thread tanpa retry
+    request_queue_size = 64
+
+
+class UpstreamStub:
+    # Server tile palsu: setiap permintaan dicatat; isi = path + nomor permintaan, supaya unduhan ulang
+    # bisa dibedakan dari salinan cache. `gagal` membuat semua permintaan dijawab 500, `jeda` menahan respons.
+    # `isi(path, nomor) -> (bytes, content-type)` mengganti isi bawaan (mis. payload Open-Meteo).
+    def __init__(self, isi=None):
+        self.permintaan = []
+        self.gagal = False
+        self.jeda = 0
+        self.isi = isi
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.permintaan.append(self.path)
+                    nomor = len(stub.permintaan)
+                if stub.jeda:
+                    time.sleep(stub.jeda)
+                if stub.gagal:
+                    self.send_response(500)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if stub.isi is not None:
+                    isi, jenis = stub.isi(self.path, nomor)
+                else:
+                    isi, jenis = f"{self.path}#{nomor}".encode() + b"\0" * 1000, "image/png"
+                self.send_response(200)
+                self.send_header("Content-Type", jenis)
+                self.send_header("Content-Length", str(len(isi)))
+                self.end_headers()
+                self.wfile.write(isi)
+
+        self.server = _Server(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def jumlah(self, path=None):
+        with self._lock:
+            return len([p for p in self.permintaan if path is None or p.startswith(path)])
+
+
+@pytest.fixture
+def upstream():
+    stub = UpstreamStub()
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+@pytest.fixture
+def open_meteo():
+    # Open-Meteo palsu: payload fixture terakhir, ditambah "nomor" permintaan untuk membedakan unduhan
+    path = sorted(glob.glob(os.path.join(FIXTURE_DIR, "open_meteo_*.json")))[-1]
+    with open(path, encoding="utf-8") as f:
+        payload = json.load(f)
+    stub = UpstreamStub(isi=lambda path, nomor: (json.dumps(dict(payload, nomor=nomor)).encode(), "application/json"))
+    stub.url += "/v1/forecast"
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
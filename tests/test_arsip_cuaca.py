@@ -0,0 +1,178 @@
+import glob
+import json
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+from arsip_cuaca import ArsipCuaca, PengumpulCuaca
+from cuaca import KlienCuaca, kunci_lokasi
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "fixture")
+LAT, LON = -3.92, 119.77
+LOKASI = kunci_lokasi(LAT, LON)
+
+
+def muat_fixture():
+    # waktu terbit (datetime) -> payload Open-Meteo
+    hasil = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "open_meteo_*.json"))):
+        terbit = datetime.strptime(os.path.basename(path)[len("open_meteo_"):-len(".json")], "%Y-%m-%dT%H")
+        with open(path, encoding="utf-8") as f:
+            hasil[terbit] = json.load(f)
+    return hasil
+
+
+FIXTURE = muat_fixture()
+
+
+def harian_payload(data):
+    # Agregat harian yang diharapkan dari satu payload: hujan dijumlah, suhu maks/min, kelembapan rata-rata
+    df = pd.DataFrame(data["hourly"])
+    df["hari"] = pd.to_datetime(df["time"]).dt.normalize()
+    return df.groupby("hari").agg(
+        hujan=("precipitation", "sum"), suhu_maks=("temperature_2m", "max"),
+        suhu_min=("temperature_2m", "min"), kelembapan=("relative_humidity_2m", "mean"),
+    )
+
+
+def diharapkan(lead):
+    # Per hari: rata-rata agregat semua snapshot yang diambil `lead` hari sebelumnya
+    daftar = []
+    for terbit, data in FIXTURE.items():
+        df = harian_payload(data)
+        daftar.append(df[df.index == pd.Timestamp(terbit.date()) + pd.Timedelta(days=lead)])
+    return pd.concat(daftar).groupby(level=0).mean().round(1)
+
+
+PUTARAN = pd.date_range("2026-10-01 06:00", "2026-10-04 18:00", freq="6h")
+
+
+@pytest.fixture
+def arsip(tmp_path):
+    return ArsipCuaca(path=str(tmp_path / "arsip.db"), simpan_jam_hari=2)
+
+
+def kumpulkan(arsip):
+    # Pengumpul dijalankan tiap 6 jam dari 1 s/d 4 Oktober; sumber mengembalikan payload terakhir yang
+    # sudah terbit, jadi payload yang sama ikut terkumpul berkali-kali (harus dilewati)
+    sekarang = {"t": None}
+
+    def sumber(lat, lon):
+        return FIXTURE[max(t for t in FIXTURE if t <= sekarang["t"])]
+
+    pengumpul = PengumpulCuaca(arsip, [("Pangkajene", LAT, LON)], sumber, interval_rapikan=0)
+    baru = 0
+    for t in PUTARAN:
+        sekarang["t"] = t.to_pydatetime()
+        baru += pengumpul.jalankan_sekali(sekarang=sekarang["t"])
+    return pengumpul, baru
+
+
+def test_fixture_lengkap():
+    assert len(FIXTURE) == 5
+    for data in FIXTURE.values():
+        assert len(data["hourly"]["time"]) == 72 and data["timezone"] == "Asia/Makassar"
+
+
+def test_pengumpul_dan_harian(arsip):
+    pengumpul, baru = kumpulkan(arsip)
+    assert baru == len(FIXTURE)
+    assert arsip.stats["snapshot"] == len(FIXTURE) and arsip.stats["sama"] == len(PUTARAN) - len(FIXTURE)
+    assert pengumpul.stats == {"putaran": len(PUTARAN), "gagal": 0}
+    assert arsip.daftar_lokasi() == [LOKASI]
+
+    for lead in (0, 1, 2):
+        df = arsip.harian(LOKASI, lead=lead).set_index("Tanggal")
+        harap = diharapkan(lead)
+        assert list(df.index) == list(harap.index), lead
+        assert df["Curah Hujan (mm)"].tolist() == pytest.approx(harap["hujan"].tolist(), abs=0.051)
+        assert df["Suhu Maks (°C)"].tolist() == pytest.approx(harap["suhu_maks"].tolist(), abs=0.051)
+        assert df["Suhu Min (°C)"].tolist() == pytest.approx(harap["suhu_min"].tolist(), abs=0.051)
+        assert df["Kelembapan (%)"].tolist() == pytest.approx(harap["kelembapan"].tolist(), abs=0.051)
+
+    # Rentang tanggal
+    df = arsip.harian(LOKASI, mulai=datetime(2026, 10, 2), sampai=datetime(2026, 10, 3))
+    assert df["Tanggal"].dt.day.tolist() == [2, 3]
+
+
+def test_rapikan_dan_jam(arsip):
+    kumpulkan(arsip)
+    # simpan_jam_hari=2 dengan hari ini 4 Okt: hanya jam sejak 2 Okt 00:00 yang tersisa
+    df = arsip.jam(LOKASI)
+    assert df["Waktu"].min() == pd.Timestamp("2026-10-02")
+    assert df["Waktu"].max() == pd.Timestamp("2026-10-06 23:00")
+    assert df["Waktu"].is_unique and df["Waktu"].is_monotonic_increasing
+    conn = arsip._koneksi()
+    assert conn.execute("SELECT MIN(diambil) FROM jam").fetchone()[0] >= pd.Timestamp("2026-10-02").value // 10**9
+
+    # Tiap jam berisi nilai snapshot terbaru yang mencakupnya
+    terbaru = {}
+    for terbit in sorted(FIXTURE):
+        jam = FIXTURE[terbit]["hourly"]
+        for w, s in zip(jam["time"], jam["temperature_2m"]):
+            terbaru[pd.Timestamp(w)] = s
+    df = df.set_index("Waktu")
+    assert df["Suhu (°C)"].to_dict() == {w: s for w, s in terbaru.items() if w >= pd.Timestamp("2026-10-02")}
+
+    # Riwayat harian tetap utuh setelah baris jam dibuang
+    assert arsip.harian(LOKASI)["Tanggal"].dt.day.tolist() == [1, 2, 3, 4]
+    assert arsip.rapikan(datetime(2026, 10, 4, 23)) == 0
+
+
+def test_payload_rusak_tidak_menghentikan_pengumpul(arsip):
+    data = FIXTURE[min(FIXTURE)]
+    lokasi = [("A", LAT, LON), ("B", -3.80, 119.90)]
+    payload = {(LAT, LON): {"latitude": LAT}, (-3.80, 119.90): data}  # A tanpa "hourly"
+    pengumpul = PengumpulCuaca(arsip, lokasi, lambda lat, lon: payload[(lat, lon)], interval_rapikan=0)
+    assert pengumpul.jalankan_sekali(sekarang=datetime(2026, 10, 1, 6)) == 1
+    assert pengumpul.stats["gagal"] == 1
+    # Payload yang gagal diarsipkan tidak tercatat sebagai "sama" sehingga dicoba lagi
+    payload[(LAT, LON)] = data
+    assert pengumpul.jalankan_sekali(sekarang=datetime(2026, 10, 1, 7)) == 1
+
+
+class SessionPalsu:
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, *args, **kwargs):
+        return self
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+def test_pendengar_gagal_tidak_menggagalkan_ambil(tmp_path, arsip):
+    klien = KlienCuaca(session=SessionPalsu({"latitude": LAT}), cache_file=str(tmp_path / "cache.json"))
+
+    def rusak(kunci, data):
+        raise RuntimeError("pendengar rusak")
+
+    klien.pendengar += [rusak, arsip.dengar]
+    assert klien.ambil(LAT, LON) == {"latitude": LAT}
+    assert klien.stats["gagal_pendengar"] == 1
+    assert arsip.stats["gagal"] == 1  # payload tanpa hourly ditangkap dengar()
+
+
+def test_rapikan_memakai_zona_waktu_snapshot(arsip, monkeypatch):
+    # 17:00 UTC 3 Okt = 01:00 WITA 4 Okt: server ber-UTC tidak boleh menganggap hari ini masih 3 Okt
+    class Jam(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            utc = datetime(2026, 10, 3, 17, 0, tzinfo=timezone.utc)
+            return utc if tz is not None else utc.replace(tzinfo=None)
+
+    data = FIXTURE[min(FIXTURE)]
+    assert data["utc_offset_seconds"] == 8 * 3600
+    arsip.simpan(LOKASI, data, diambil=datetime(2026, 10, 3, 20))
+    monkeypatch.setattr("arsip_cuaca.datetime", Jam)
+    arsip.rapikan()
+    diringkas = arsip._koneksi().execute("SELECT nilai FROM info WHERE kunci = 'diringkas'").fetchone()[0]
+    assert diringkas == pd.Timestamp("2026-10-04").value // 10**9
+    # Snapshot 3 Okt sudah final dan ada di tabel harian
+    assert arsip._koneksi().execute("SELECT COUNT(*) FROM harian").fetchone()[0] > 0
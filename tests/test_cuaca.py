@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from cuaca import KlienCuaca, kunci_lokasi
+
+LAT, LON = -3.92, 119.77
+
+
+@pytest.fixture
+def buat_klien(tmp_path, open_meteo):
+    # Session tanpa retry supaya kegagalan upstream langsung terlihat
+    def buat(**opsi):
+        opsi.setdefault("cache_file", str(tmp_path / "cache_cuaca.json"))
+        return KlienCuaca(base_url=open_meteo.url, session=requests.Session(), timeout=(1, 2), **opsi)
+    return buat
+
+
+def tunggu(syarat, batas=3):
+    akhir = time.monotonic() + batas
+    while not syarat():
+        assert time.monotonic() < akhir, "syarat tidak terpenuhi"
+        time.sleep(0.01)
+
+
+def test_segar_dari_cache(buat_klien, open_meteo):
+    klien = buat_klien()
+    assert klien.ambil(LAT, LON)["nomor"] == 1
+    assert klien.ambil(LAT + 0.001, LON)["nomor"] == 1  # dibulatkan ke kunci yang sama
+    assert open_meteo.jumlah() == 1
+    assert klien.stats["miss"] == 1 and klien.stats["hit"] == 1
+
+
+def test_kedaluwarsa_dikembalikan_lalu_diperbarui_di_latar(buat_klien, open_meteo):
+    klien = buat_klien(ttl=0)
+    klien.ambil(LAT, LON)
+    open_meteo.jeda = 0.1
+    assert klien.ambil(LAT, LON)["nomor"] == 1  # langsung, tanpa menunggu upstream
+    assert klien.stats["stale"] == 1
+    tunggu(lambda: klien._cache[kunci_lokasi(LAT, LON)]["data"]["nomor"] == 2)
+
+
+def test_upstream_gagal_pakai_data_terakhir(buat_klien, open_meteo):
+    klien = buat_klien()
+    klien.ambil(LAT, LON)
+    open_meteo.gagal = True
+    assert klien._perbarui(kunci_lokasi(LAT, LON))["nomor"] == 1
+    with pytest.raises(requests.RequestException):
+        klien.ambil(LAT + 1, LON)
+    assert klien.stats["gagal"] == 2
+
+
+def test_miss_bersamaan_satu_unduhan(buat_klien, open_meteo):
+    klien = buat_klien()
+    open_meteo.jeda = 0.2
+    hasil = []
+    thread = [threading.Thread(target=lambda: hasil.append(klien.ambil(LAT, LON)["nomor"])) for _ in range(8)]
+    for t in thread:
+        t.start()
+    for t in thread:
+        t.join()
+    assert hasil == [1] * 8 and open_meteo.jumlah() == 1
+    assert klien.stats["gabung"] == 7
+
+
+def test_miss_bersamaan_gagal_semua_penunggu_gagal(buat_klien, open_meteo):
+    klien = buat_klien()
+    open_meteo.jeda, open_meteo.gagal = 0.2, True
+    galat = []
+
+    def ambil():
+        try:
+            klien.ambil(LAT, LON)
+        except requests.RequestException as e:
+            galat.append(e)
+
+    thread = [threading.Thread(target=ambil) for _ in range(4)]
+    for t in thread:
+        t.start()
+    for t in thread:
+        t.join()
+    assert len(galat) == 4 and open_meteo.jumlah() == 1 and klien._menunggu == {}
+
+
+def test_batch_disimpan_sekali_dan_dimuat_ulang(buat_klien, open_meteo, tmp_path):
+    klien = buat_klien(jeda_simpan=60)
+    lokasi = [(f"t{i}", LAT + i * 0.05, LON) for i in range(20)]
+    df = klien.ambil_banyak(lokasi, max_workers=8)
+    assert not df.attrs["gagal"] and klien.stats["simpan"] == 1
+    assert len(json.loads((tmp_path / "cache_cuaca.json").read_text(encoding="utf-8"))) == 20
+
+    baru = buat_klien()
+    baru.ambil_banyak(lokasi)
+    assert open_meteo.jumlah() == 20 and baru.stats["hit"] == 20 and baru.stats["simpan"] == 0
+
+
+def test_simpan_ditunda_dan_digabung(buat_klien, tmp_path):
+    klien = buat_klien(jeda_simpan=0.2)
+    for i in range(3):
+        klien.ambil(LAT + i * 0.05, LON)
+    assert not (tmp_path / "cache_cuaca.json").exists()
+    tunggu(lambda: klien.stats["simpan"] == 1)
+    assert len(json.loads((tmp_path / "cache_cuaca.json").read_text(encoding="utf-8"))) == 3
+
+
+def test_cache_berbatas_membuang_yang_terlama(buat_klien, tmp_path):
+    klien = buat_klien(batas=3)
+    for i in range(4):
+        klien.ambil(LAT + i * 0.05, LON)
+    klien.ambil(LAT + 0.05, LON)  # dipakai lagi: tidak jadi yang terlama
+    klien.ambil(LAT + 0.2, LON)
+    assert list(klien._cache) == [kunci_lokasi(LAT + i * 0.05, LON) for i in (3, 1, 4)]
+    assert klien.stats["buang"] == 2
+
+    klien.simpan()
+    assert list(buat_klien(batas=2)._cache) == [kunci_lokasi(LAT + i * 0.05, LON) for i in (1, 4)]
@@ -0,0 +1,138 @@
+import os
+import time
+import zipfile
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+
+from ekspor import (
+    AntrianEkspor, CacheEkspor, EksporKedaluwarsa, POTONGAN_UNDUH, jalankan_server_unduhan, server_unduhan_aktif,
+    url_unduhan,
+)
+
+KOLOM = ["id", "nama"]
+
+
+def df_cuaca(hari=30):
+    tanggal = pd.date_range("2025-01-01", periods=hari)
+    df = pd.DataFrame({
+        "Lokasi": np.repeat(["Kulo", "Baranti <b>"], hari),
+        "Tanggal": np.tile(tanggal, 2),
+        "Curah Hujan (mm)": np.arange(2 * hari, dtype=float),
+    })
+    df.loc[3, "Curah Hujan (mm)"] = np.nan
+    return df
+
+
+def test_cache_ekspor_hit_dan_invalidasi():
+    cache = CacheEkspor()
+    df = df_cuaca()
+    buat = cache.pembuat(df, "xlsx", per_lokasi=True)
+    assert buat() is buat() and cache.stats == {"hit": 1, "bangun": 1}
+
+    # Isi xlsx: tanggal tetap tanggal, NaN jadi sel kosong, satu sheet per lokasi
+    lembar = pd.read_excel(BytesIO(buat()), sheet_name=None)
+    assert list(lembar) == ["Cuaca Harian", "Kulo", "Baranti <b>"]
+    pd.testing.assert_frame_equal(lembar["Cuaca Harian"], df, check_dtype=False)
+
+    # Data atau parameter berbeda -> kunci berbeda; salinan dengan isi sama -> hit
+    cache.ambil(df.copy(), "xlsx", per_lokasi=True)
+    assert cache.stats["bangun"] == 1
+    cache.ambil(df, "xlsx", per_lokasi=False)
+    ubah = df.copy()
+    ubah.loc[0, "Curah Hujan (mm)"] = 99.0
+    cache.ambil(ubah, "xlsx", per_lokasi=True)
+    assert cache.stats["bangun"] == 3
+
+    # pembuat() mengunci sidik saat dibuat: perubahan df setelahnya tidak tercampur ke cache
+    buat_csv = cache.pembuat(df, "csv")
+    lama = buat_csv()
+    df.loc[0, "Curah Hujan (mm)"] = -1.0
+    assert buat_csv() is lama
+
+    arsip = zipfile.ZipFile(BytesIO(cache.ambil(ubah, "zip", nama="cuaca")))
+    assert sorted(arsip.namelist()) == ["cuaca.csv", "cuaca.html", "cuaca.parquet", "cuaca.xlsx"]
+    assert b"Baranti &lt;b&gt;" in arsip.read("cuaca.html")
+    pd.testing.assert_frame_equal(pd.read_parquet(BytesIO(arsip.read("cuaca.parquet"))), ubah)
+
+
+def test_cache_ekspor_berbatas_byte():
+    cache = CacheEkspor()
+    data = [cache.ambil(df_cuaca(h), "csv") for h in (10, 11, 12)]
+    assert len(cache._cache) == 3
+    cache.batas_byte = len(data[1]) + len(data[2])
+    cache.ambil(df_cuaca(13), "csv")
+    assert cache._ukuran <= cache.batas_byte and len(cache._cache) == 1
+    cache.ambil(df_cuaca(13), "csv")
+    assert cache.stats == {"hit": 1, "bangun": 4}
+
+
+def potongan(n, ukuran=1000):
+    for mulai in range(0, n, ukuran):
+        yield [(i, f"laporan {i}") for i in range(mulai, min(n, mulai + ukuran))]
+
+
+def tunggu_selesai(antrian, id_job, batas=5):
+    akhir = time.monotonic() + batas
+    while antrian.berjalan(id_job):
+        assert time.monotonic() < akhir
+        time.sleep(0.01)
+    return antrian.status(id_job)
+
+
+def test_ekspor_selesai_dan_kedaluwarsa(tmp_path):
+    antrian = AntrianEkspor(folder=str(tmp_path), simpan=3600)
+    id_job = antrian.mulai("laporan warga", "csv", KOLOM, lambda: potongan(2500), total=2500)
+    job = tunggu_selesai(antrian, id_job)
+    assert job["status"] == "selesai" and job["selesai"] == 2500
+    assert os.path.basename(job["path"]) == f"laporan_warga_{id_job}.csv"
+    assert antrian.baca(id_job).decode("utf-8-sig").count("\n") == 2501
+
+    # Setelah masa simpan habis: status jelas "kedaluwarsa", unduhan terlambat mendapat galat yang jelas
+    antrian.simpan = 0
+    antrian._job[id_job]["dibuat"] -= 10
+    os.utime(job["path"], (time.time() - 10, time.time() - 10))
+    antrian._bersihkan()
+    assert antrian.status(id_job)["status"] == "kedaluwarsa" and not antrian.berjalan(id_job)
+    assert not os.path.exists(job["path"])
+    with pytest.raises(EksporKedaluwarsa):
+        antrian.baca(id_job)
+    assert antrian.status("tidakada")["status"] == "kedaluwarsa"
+
+
+def test_sisa_proses_lama_disapu_per_mtime(tmp_path):
+    lama = tmp_path / "laporan_warga_0123456789ab.xlsx"
+    tmp = tmp_path / "harga_0123456789ac.csv.123.456.tmp"
+    baru = tmp_path / "harga_0123456789ad.csv"
+    for p in (lama, tmp, baru):
+        p.write_bytes(b"x")
+    kuno = time.time() - 7200
+    os.utime(lama, (kuno, kuno))
+    os.utime(tmp, (kuno, kuno))
+    AntrianEkspor(folder=str(tmp_path), simpan=3600)
+    assert sorted(os.listdir(tmp_path)) == [baru.name]
+
+
+def test_server_unduhan_mengirim_dari_disk(tmp_path):
+    antrian = AntrianEkspor(folder=str(tmp_path))
+    id_job = antrian.mulai("laporan", "csv", KOLOM, lambda: potongan(40000), total=40000)
+    job = tunggu_selesai(antrian, id_job)
+    assert job["ukuran"] > POTONGAN_UNDUH  # lebih dari satu potongan
+
+    server = jalankan_server_unduhan(str(tmp_path), port=0)
+    try:
+        dasar = f"http://127.0.0.1:{server.server_port}"
+        assert server_unduhan_aktif(server.server_port)
+        resp = requests.get(url_unduhan(dasar, job["path"], job["file"]), timeout=5)
+        assert resp.status_code == 200 and resp.content == open(job["path"], "rb").read()
+        assert resp.headers["Content-Disposition"] == f'attachment; filename="{job["file"]}"'
+        assert resp.headers["Content-Type"] == "text/csv"
+
+        for path in ("/../ekspor.py", "/laporan.csv", "/laporan_0123456789ab.csv", "/%2e%2e%2fap.py"):
+            assert requests.get(dasar + path, timeout=5).status_code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
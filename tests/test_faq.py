@@ -0,0 +1,58 @@
+import json
+import os
+
+from faq import SumberFAQ
+
+PASANGAN = [
+    {"pertanyaan": "mengapa padi saya kuning", "jawaban": "Kurang nitrogen."},
+    {"pertanyaan": "kapan waktu tanam jagung", "jawaban": "Awal musim hujan."},
+]
+
+
+def tulis(path, isi, mtime):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(isi)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_file_rusak_tetap_memakai_indeks_terakhir(tmp_path):
+    path = str(tmp_path / "faq.json")
+    tulis(path, json.dumps(PASANGAN), 1_000_000_000)
+    sumber = SumberFAQ(path=path, interval=0)
+    assert sumber.indeks().jawab("padi saya kuning") == "Kurang nitrogen."
+
+    # Suntingan setengah jadi / salah: tidak ada galat ke pemanggil, jawaban lama tetap dilayani
+    for rusak in ['[{"pertanyaan": "mengapa', '[{"tanya": "x", "jawab": "y"}]', '["bukan objek"]']:
+        tulis(path, rusak, 2_000_000_000)
+        assert sumber.indeks().jawab("padi saya kuning") == "Kurang nitrogen."
+    assert sumber.stats["gagal"] == 3
+
+    # Simpanan valid berikutnya langsung termuat
+    tulis(path, json.dumps(PASANGAN + [{"pertanyaan": "hama wereng", "jawaban": "Pakai varietas tahan."}]),
+          3_000_000_000)
+    assert sumber.indeks().jawab("hama wereng") == "Pakai varietas tahan."
+    assert sumber.stats["muat_ulang"] == 1
+
+
+def test_cari_banyak_sama_dengan_jalur_interaktif():
+    # Jalur massal (evaluasi) memakai penyaringan kandidat yang sama dengan jawab() di chatbot
+    import random
+
+    from faq import IndeksFAQ, IndeksTfidf, muat_pasangan
+
+    rng = random.Random(5)
+    asli = muat_pasangan("data/faq.json")
+    kata = sorted({k for q, _ in asli for k in q.lower().split()})
+    pasangan = asli + [(" ".join(rng.choice(kata) for _ in range(5)), f"sintetis {i}") for i in range(2000)]
+    kueri = [q for q, _ in asli[:20]] + ["padi kuneng", "wereng coklat", "xyz qqq", ""]
+    kueri += [" ".join(rng.choice(kata) for _ in range(3)) for _ in range(50)]
+
+    indeks = IndeksFAQ(pasangan)
+    for mesin in (indeks, IndeksTfidf(indeks), IndeksTfidf(indeks, rerank=True)):
+        massal = mesin.cari_banyak(kueri, k=3)
+        for q, top in zip(kueri, massal):
+            satuan = mesin.cari(q, k=3)
+            # Skor teratas sama (urutan skor seri di bawah ambang boleh berbeda), jawaban akhir sama
+            assert [round(t[2], 3) for t in top[:1]] == [round(t[2], 3) for t in satuan[:1]], q
+            terjawab = bool(top) and top[0][2] >= mesin.ambang
+            assert (top[0][1] if terjawab else mesin.jawab(q)) == mesin.jawab(q), q
@@ -0,0 +1,69 @@
+import os
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from gambar import TAG_GPS, PenyimpanGambar
+
+
+def buat_jpeg(warna, ukuran=(1200, 900), gps=None):
+    img = Image.new("RGB", ukuran, warna)
+    exif = Image.Exif()
+    exif[0x010F] = "KameraUji"  # Make
+    if gps:
+        (lat, ref_lat), (lon, ref_lon) = gps
+        exif.get_ifd(TAG_GPS).update({1: ref_lat, 2: lat, 3: ref_lon, 4: lon})
+    buf = BytesIO()
+    img.save(buf, "JPEG", exif=exif)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def penyimpan(tmp_path):
+    return PenyimpanGambar(folder=str(tmp_path / "uploads"), folder_thumb=str(tmp_path / "uploads" / "thumb"))
+
+
+def test_simpan_per_hash_tanpa_exif(penyimpan):
+    data = buat_jpeg("green", gps=(((3, 55, 12.0), "S"), ((119, 46, 30.0), "E")))
+    path, gps = penyimpan.simpan(data)
+    assert gps == (round(-(3 + 55 / 60 + 12 / 3600), 6), round(119 + 46 / 60 + 30 / 3600, 6))
+    assert os.path.basename(path).endswith(".jpg")
+    with Image.open(path) as img:
+        assert not img.getexif()  # lokasi & metadata kamera tidak ikut tersimpan
+
+    # Unggahan identik berbagi satu file
+    assert penyimpan.simpan(data) == (path, gps)
+    assert len([f for f in os.listdir(penyimpan.folder) if f.endswith(".jpg")]) == 1
+    assert penyimpan.simpan(buat_jpeg("green"))[1] is None
+
+    with pytest.raises(ValueError):
+        penyimpan.simpan(b"bukan gambar")
+
+
+def test_thumbnail_dibuat_sekali_dan_di_cache(penyimpan):
+    path, _ = penyimpan.simpan(buat_jpeg("red"))
+    data = penyimpan.thumbnail(path)
+    with Image.open(BytesIO(data)) as img:
+        assert img.format == "WEBP" and max(img.size) <= 320
+    assert os.path.exists(penyimpan.path_thumb(path))
+
+    os.remove(penyimpan.path_thumb(path))
+    assert penyimpan.thumbnail(path) is data  # dari cache memori, bukan disk
+    assert penyimpan.info_cache()["jumlah"] == 1
+
+    penyimpan.hapus(path)
+    assert not os.path.exists(path) and penyimpan.info_cache()["jumlah"] == 0
+    assert penyimpan.thumbnail(path) is None
+
+
+def test_cache_thumbnail_berbatas_byte(penyimpan):
+    path = [penyimpan.simpan(buat_jpeg((i * 40, 0, 0)))[0] for i in range(4)]
+    ukuran = len(penyimpan.thumbnail(path[0]))
+    penyimpan.batas_cache = ukuran * 2 + ukuran // 2
+    for p in path[1:]:
+        penyimpan.thumbnail(p)
+    info = penyimpan.info_cache()
+    assert info["jumlah"] == 2 and info["byte"] <= penyimpan.batas_cache
+    # Yang tertua dibuang lebih dulu
+    assert set(penyimpan._cache) == {penyimpan.path_thumb(p) for p in path[2:]}
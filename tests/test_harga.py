@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from harga import RiwayatHarga
+
+
+@pytest.fixture
+def riwayat(tmp_path):
+    return RiwayatHarga(str(tmp_path / "harga.db"))
+
+
+def isi_acak(riwayat, hari=60, seed=0):
+    # Beberapa observasi per hari dengan jam acak; dikembalikan juga sebagai DataFrame untuk pembanding
+    rng = np.random.default_rng(seed)
+    awal = datetime(2025, 1, 1)
+    semua = []
+    for h in range(hari):
+        for _ in range(rng.integers(0, 4)):
+            waktu = awal + timedelta(days=h, seconds=int(rng.integers(0, 86400)))
+            data = [{"Komoditas": k, "Harga (Rp/kg)": float(rng.integers(5000, 15000))} for k in ("Beras", "Jagung")]
+            riwayat.catat(data, waktu)
+            semua += [(d["Komoditas"], waktu, d["Harga (Rp/kg)"]) for d in data]
+    return pd.DataFrame(semua, columns=["Komoditas", "Waktu", "Harga"]).drop_duplicates(
+        ["Komoditas", "Waktu"], keep="last")
+
+
+def test_catat_dan_terbaru(riwayat):
+    assert riwayat.kosong()
+    n = riwayat.catat([
+        {"Komoditas": "Beras", "Harga (Rp/kg)": 12000},
+        {"Komoditas": "Jagung", "Harga (Rp/kg)": float("nan")},
+        {"Komoditas": "", "Harga (Rp/kg)": 1},
+        {"Komoditas": "Cabai", "Harga (Rp/kg)": None},
+    ], datetime(2025, 1, 1, 8))
+    assert n == 1
+    riwayat.catat([{"Komoditas": "Beras", "Harga (Rp/kg)": 12500}, {"Komoditas": "Jagung", "Harga (Rp/kg)": 6000}],
+                  datetime(2025, 1, 2, 8))
+    # Waktu yang sama menimpa observasi, bukan menggandakannya
+    riwayat.catat([{"Komoditas": "Beras", "Harga (Rp/kg)": 13000}], datetime(2025, 1, 2, 8))
+
+    assert riwayat.daftar_komoditas() == ["Beras", "Jagung"]
+    assert riwayat.terbaru() == {"Beras": 13000.0, "Jagung": 6000.0}
+    assert riwayat.hitung(["Beras"]) == 2
+    assert riwayat.hitung(["Beras", "Jagung"], mulai="2025-01-02", sampai="2025-01-02") == 2
+
+
+def test_ringkas_sama_dengan_pandas(riwayat):
+    df = isi_acak(riwayat)
+    hasil = riwayat.ringkas(["Beras", "Jagung"], "Mingguan", jendela=4)
+
+    # Pembanding: rata-rata harian dulu, lalu rata-rata tertimbang per minggu (sama dengan rata-rata semua observasi)
+    harapan = (
+        df.set_index("Waktu").groupby("Komoditas")["Harga"].resample("W-MON").mean()
+        .groupby(level=0).ffill().rename("Harga").reset_index()
+    )
+    pd.testing.assert_frame_equal(hasil[["Komoditas", "Waktu", "Harga"]], harapan, check_freq=False)
+    vol = harapan.groupby("Komoditas")["Harga"].transform(lambda s: s.pct_change().rolling(4, min_periods=2).std() * 100)
+    np.testing.assert_allclose(hasil["Volatilitas (%)"], vol)
+
+    mentah = riwayat.rentang(["Jagung"], mulai="2025-01-10", sampai="2025-01-20")
+    harapan = df[(df["Komoditas"] == "Jagung") & (df["Waktu"] >= "2025-01-10") & (df["Waktu"] < "2025-01-21")]
+    assert list(mentah["Harga"]) == list(harapan.sort_values("Waktu")["Harga"])
+
+
+def test_prakiraan_tren_linear(riwayat):
+    hari_ini = pd.Timestamp.now().normalize()
+    for h in range(30):
+        riwayat.catat([{"Komoditas": "Beras", "Harga (Rp/kg)": 10000 + 50 * h}],
+                      (hari_ini - pd.Timedelta(days=29 - h)).to_pydatetime())
+    riwayat.catat([{"Komoditas": "Jagung", "Harga (Rp/kg)": 6000}], hari_ini.to_pydatetime())
+
+    hasil = riwayat.prakiraan(["Beras", "Jagung", "Cabai"], hari_ini + pd.Timedelta(days=10))
+    assert hasil["Beras"] == pytest.approx(10000 + 50 * 39)
+    assert hasil == {"Beras": hasil["Beras"], "Jagung": 6000.0}
+
+
+def test_iter_potongan_keyset_per_komoditas(riwayat):
+    df = isi_acak(riwayat, hari=90)
+    harapan = [tuple(b) for b in df.sort_values(["Komoditas", "Waktu"]).itertuples(index=False)]
+    for ukuran in (1, 7, len(df)):
+        isi = [b for bagian in riwayat.iter_potongan(["Jagung", "Beras"], ukuran=ukuran) for b in bagian]
+        assert [(k, pd.Timestamp(w), h) for k, w, h in isi] == harapan
+        assert all(len(bagian) <= ukuran for bagian in riwayat.iter_potongan(["Beras"], ukuran=ukuran))
+    assert riwayat.hitung(["Beras"], mulai="2025-02-01") == sum(
+        len(bagian) for bagian in riwayat.iter_potongan(["Beras"], mulai="2025-02-01", ukuran=4))
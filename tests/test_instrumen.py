@@ -0,0 +1,77 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import instrumen as modul
+from instrumen import Instrumen
+
+
+@pytest.fixture
+def ctx(monkeypatch):
+    konteks = SimpleNamespace(session_id="sesi-uji-0001", fragment_ids_this_run=[])
+    monkeypatch.setattr(modul, "get_script_run_ctx", lambda: konteks)
+    return konteks
+
+
+def test_rerun_selesai_normal(ctx, tmp_path):
+    ins = Instrumen(folder=str(tmp_path), selalu=True)
+    ins.mulai_rerun()
+    with ins.ukur("peta"):
+        pass
+    ins.selesai_rerun()
+    (rerun,) = ins.riwayat()
+    assert rerun["jenis"] == "app" and not rerun["terhenti"] and "peta" in rerun["bagian"]
+    assert ins.stats["terhenti"] == 0
+
+
+def test_run_terhenti_ditutup_rerun_berikutnya(ctx, tmp_path):
+    ins = Instrumen(folder=str(tmp_path), selalu=True)
+    ins.mulai_rerun()
+    with ins.ukur("cuaca"):
+        time.sleep(0.01)
+    # st.stop() / st.rerun(): selesai_rerun tidak pernah dipanggil; pengguna diam sebentar
+    time.sleep(0.05)
+    ins.mulai_rerun()
+    lama = ins.riwayat()[1]
+    assert lama["terhenti"] and ins.stats["terhenti"] == 1
+    # Waktu dihitung sampai bagian terakhir, bukan sampai rerun berikutnya
+    assert lama["detik"] == pytest.approx(lama["bagian"]["cuaca"]["detik"], abs=0.005)
+    assert (tmp_path / "kinerja.json").exists()
+
+
+def test_sisa_run_ditutup_walau_panel_dimatikan(ctx, tmp_path):
+    ins = Instrumen(folder=str(tmp_path))
+    ins.atur_sesi(True)
+    ins.mulai_rerun()
+    ins.atur_sesi(False)
+    ins.mulai_rerun()
+    assert ins._berjalan == {} and ins.riwayat()[0]["terhenti"]
+    assert ins.stats["rerun"] == 1
+
+
+def test_entri_sesi_basi_disapu(ctx, tmp_path):
+    ins = Instrumen(folder=str(tmp_path), batas_diam=0.05)
+    ins.atur_sesi(True)
+    ins.mulai_rerun()
+    assert ins.sapu(paksa=True) == 0
+
+    # Tab ditutup: sesi tidak pernah rerun lagi, entrinya dibuang setelah batas diam
+    time.sleep(0.1)
+    assert ins.sapu(paksa=True) == 1
+    assert ins._sesi == set() and ins._berjalan == {} and ins._terlihat == {}
+    assert ins.riwayat()[0]["terhenti"] and ins.stats["sesi_dibuang"] == 1
+
+
+def test_sesi_yang_ditutup_streamlit_disapu(ctx, tmp_path, monkeypatch):
+    ins = Instrumen(folder=str(tmp_path))
+    ins.atur_sesi(True)
+    ins.mulai_rerun()
+    hidup = {ctx.session_id: True}
+    monkeypatch.setattr(modul, "_sesi_hidup", lambda s: hidup.get(s, False))
+    assert ins.sapu(paksa=True) == 0 and ins.sapu() == 0
+
+    hidup[ctx.session_id] = False
+    assert ins.sapu() == 0  # dibatasi INTERVAL_SAPU
+    assert ins.sapu(paksa=True) == 1
+    assert not ins._aktif(ctx) and ins._berjalan == {}
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from irigasi import LEVEL_PERINGATAN, et0_hargreaves, hitung_irigasi, ringkasan_lokasi
+
+
+def test_et0_contoh_fao56():
+    # FAO-56 contoh 8: lintang 20°LS, 3 September -> Ra = 32,2 MJ/m²/hari
+    et0 = et0_hargreaves([-20.0], ["2025-09-03"], [30.0], [20.0])
+    assert et0[0] == pytest.approx(0.0023 * 0.408 * 32.2 * (25 + 17.8) * np.sqrt(10), rel=0.01)
+
+
+def df_acak(n_lokasi=30, hari=16, seed=0):
+    rng = np.random.default_rng(seed)
+    lokasi = pd.DataFrame({
+        "Lokasi": [f"L{i}" for i in range(n_lokasi)],
+        "Lat": rng.uniform(-4.2, -3.6, n_lokasi), "Lon": rng.uniform(119.6, 120.2, n_lokasi),
+    })
+    tanggal = pd.DataFrame({"Tanggal": pd.date_range("2025-02-20", periods=hari)})
+    df = lokasi.merge(tanggal, how="cross")
+    df["Curah Hujan (mm)"] = np.round(rng.gamma(0.6, 8, len(df)), 1)
+    df["Suhu Min (°C)"] = np.round(rng.uniform(21, 25, len(df)), 1)
+    df["Suhu Maks (°C)"] = df["Suhu Min (°C)"] + np.round(rng.uniform(4, 12, len(df)), 1)
+    return df
+
+
+def test_vektor_sama_dengan_loop_per_baris():
+    df = df_acak()
+    hasil = hitung_irigasi(df, threshold=10)
+    for _, b in df.sample(50, random_state=1).iterrows():
+        kebutuhan = 1.1 * et0_hargreaves([b["Lat"]], [b["Tanggal"]], [b["Suhu Maks (°C)"]], [b["Suhu Min (°C)"]])[0]
+        defisit = max(kebutuhan - b["Curah Hujan (mm)"], 0)
+        level = "Aman" if defisit <= 0 else "Waspada" if defisit < 3 else "Siaga" if defisit < 6 else "Awas"
+        r = hasil.loc[b.name]
+        assert r["Kebutuhan Air (mm)"] == round(kebutuhan, 1)
+        assert r["Defisit Air (mm)"] == round(defisit, 1)
+        assert r["Level Peringatan"] == level
+        assert r["Rekomendasi Irigasi"] == ("Irigasi Diperlukan" if b["Curah Hujan (mm)"] < 10 else "Cukup")
+
+
+def test_ringkasan_per_lokasi():
+    hasil = hitung_irigasi(df_acak(), threshold=10)
+    ringkas = ringkasan_lokasi(hasil)
+    assert list(ringkas["Lokasi"]) == list(hasil["Lokasi"].unique())
+    for _, r in ringkas.iterrows():
+        kelompok = hasil[hasil["Lokasi"] == r["Lokasi"]]
+        assert r["Total Defisit (mm)"] == pytest.approx(kelompok["Defisit Air (mm)"].sum())
+        assert r["Hari Perlu Irigasi"] == (kelompok["Rekomendasi Irigasi"] == "Irigasi Diperlukan").sum()
+        assert r["Level Peringatan"] == max(kelompok["Level Peringatan"], key=LEVEL_PERINGATAN.index)
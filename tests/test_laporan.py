@@ -0,0 +1,152 @@
+import json
+import random
+import threading
+from datetime import date
+
+import pytest
+
+from laporan import StoreLaporan
+
+
+def buat_laporan(i, **ubah):
+    lap = {
+        "Nama": f"Petani {i}", "Kontak": "0812", "Jenis": "Gangguan Hama", "Lokasi": "Kulo",
+        "Deskripsi": f"wereng coklat di petak {i}", "Tanggal": "01 January 2025 10:00",
+        "Waktu": f"2025-01-{1 + i % 28:02d}T10:{i % 60:02d}:00", "Gambar": None,
+    }
+    lap.update(ubah)
+    return lap
+
+
+@pytest.fixture
+def store(tmp_path):
+    return StoreLaporan(str(tmp_path / "laporan.db"))
+
+
+def test_tambah_ambil_hapus_per_id(store):
+    ids = [store.tambah(buat_laporan(i)) for i in range(5)]
+    assert store.jumlah() == 5 and ids == sorted(ids)
+    assert store.ambil(ids[2])["Nama"] == "Petani 2"
+
+    # Hapus berdasarkan id tidak menggeser laporan lain (dulu: berdasarkan posisi list)
+    assert store.hapus(ids[1])["Nama"] == "Petani 1"
+    assert store.hapus(ids[1]) is None
+    assert store.ambil(ids[1]) is None
+    assert [lap["id"] for lap in store.semua()] == [ids[0]] + ids[2:]
+    assert store.ambil(ids[2])["Nama"] == "Petani 2"
+
+
+def test_migrasi_json_sekali(tmp_path, store):
+    path_json = tmp_path / "laporan_warga.json"
+    lama = [buat_laporan(i, Waktu=None, Tanggal="05 March 2024 08:30") for i in range(3)]
+    path_json.write_text(json.dumps(lama), encoding="utf-8")
+
+    assert store.migrasi_json(str(path_json)) == 3
+    assert not path_json.exists() and (tmp_path / "laporan_warga.json.migrated").exists()
+    assert [lap["Waktu"] for lap in store.semua()] == ["2024-03-05T08:30:00"] * 3
+    assert store.migrasi_json(str(path_json)) == 0
+
+
+def test_tulis_bersamaan_dari_banyak_thread(store):
+    # Setiap thread (sesi) memakai koneksinya sendiri; WAL menyerialkan tulisan tanpa kehilangan baris
+    def tulis(awal):
+        for i in range(awal, awal + 50):
+            store.tambah(buat_laporan(i))
+
+    thread = [threading.Thread(target=tulis, args=(k * 50,)) for k in range(4)]
+    for t in thread:
+        t.start()
+    for t in thread:
+        t.join()
+    assert store.jumlah() == 200
+    assert len({lap["Nama"] for lap in store.semua()}) == 200
+    assert StoreLaporan(store.path).jumlah() == 200
+
+
+def test_cari_halaman_dan_filter(store):
+    for i in range(45):
+        store.tambah(buat_laporan(
+            i, Jenis="Kekeringan" if i % 3 == 0 else "Gangguan Hama", Lokasi="Kulo" if i % 2 else "Baranti",
+        ))
+
+    # Halaman-halaman berurutan menutup seluruh hasil tanpa duplikat, terbaru dulu
+    halaman, total = [], None
+    for offset in range(0, 45, 20):
+        isi, total = store.cari(batas=20, offset=offset)
+        halaman.extend(isi)
+    assert total == 45 and len({lap["id"] for lap in halaman}) == 45
+    kunci = [(lap["Waktu"], lap["id"]) for lap in halaman]
+    assert kunci == sorted(kunci, reverse=True)
+
+    isi, total = store.cari(jenis=["Kekeringan"], lokasi="Kulo", batas=100)
+    assert total == len(isi) == len([i for i in range(45) if i % 3 == 0 and i % 2])
+    assert all(lap["Jenis"] == "Kekeringan" and lap["Lokasi"] == "Kulo" for lap in isi)
+
+    isi, total = store.cari(mulai=date(2025, 1, 2), sampai=date(2025, 1, 3), batas=100)
+    assert total == len(isi) and {lap["Waktu"][:10] for lap in isi} == {"2025-01-02", "2025-01-03"}
+    assert store.daftar_lokasi() == ["Baranti", "Kulo"]
+
+
+def test_cari_teks_tetap_sinkron_setelah_hapus(store):
+    a = store.tambah(buat_laporan(1, Deskripsi="wereng coklat menyerang"))
+    b = store.tambah(buat_laporan(2, Deskripsi="tikus sawah merusak"))
+    store.tambah(buat_laporan(3, Deskripsi="wereng hijau"))
+
+    assert store.cari(teks="were")[1] == 2  # pencarian prefiks
+    assert store.cari(teks='wereng "coklat" (')[0][0]["id"] == a  # tanda baca tidak merusak MATCH
+    store.hapus(a)
+    store.hapus(b)
+    isi, total = store.cari(teks="wereng")
+    assert total == 1 and isi[0]["Deskripsi"] == "wereng hijau"
+    assert store.cari(teks="tikus")[1] == 0
+
+    # Indeks FTS yang dibangun ulang untuk database lama sama dengan yang dijaga trigger
+    conn = store._koneksi()
+    conn.execute("DROP TABLE laporan_fts")
+    conn.commit()
+    dibuka_ulang = StoreLaporan(store.path)
+    assert dibuka_ulang.cari(teks="wereng")[1] == 1 and dibuka_ulang.cari(teks="tikus")[1] == 0
+
+
+def test_iter_potongan_keyset_lengkap_tanpa_duplikat(store):
+    ids = [store.tambah(buat_laporan(i, Jenis="Kekeringan" if i % 4 == 0 else "Gangguan Hama")) for i in range(103)]
+    for ukuran in (1, 10, 103, 500):
+        isi = [b for bagian in store.iter_potongan(["id", "nama"], ukuran=ukuran) for b in bagian]
+        assert [b[0] for b in isi] == ids and len(isi[0]) == 2
+
+    # Baris terhapus di tengah jalan tidak menggeser halaman berikutnya (beda dengan OFFSET)
+    it = store.iter_potongan(["id"], jenis=["Kekeringan"], ukuran=5)
+    pertama = next(it)
+    store.hapus(pertama[0][0])
+    sisa = [b[0] for bagian in it for b in bagian]
+    assert [b[0] for b in pertama] + sisa == [i for n, i in enumerate(ids) if n % 4 == 0]
+
+
+def test_rtree_sinkron_dan_dalam_kotak_sama_dengan_pindai(store):
+    rng = random.Random(0)
+    titik = {}
+    for i in range(300):
+        lat, lon = rng.uniform(-4.2, -3.6), rng.uniform(119.6, 120.2)
+        titik[store.tambah(buat_laporan(i, Lat=lat, Lon=lon, **{"Sumber Lokasi": "peta"}))] = (lat, lon)
+    tanpa = store.tambah(buat_laporan(300, Lokasi="Desa Kulo"))
+    for id_laporan in list(titik)[::7]:
+        store.hapus(id_laporan)
+        del titik[id_laporan]
+
+    # Lokasi teks digeokode sekali; trigger UPDATE ikut mengisi R*Tree
+    assert store.isi_koordinat(lambda nama: (-3.9, 119.8) if nama == "Desa Kulo" else None) == 1
+    titik[tanpa] = (-3.9, 119.8)
+    # R*Tree menyimpan kotak float32 yang dibulatkan keluar, jadi cukup titiknya berada di dalam kotak
+    kotak_rtree = {b[0]: b[1:] for b in store._koneksi().execute("SELECT * FROM laporan_rtree")}
+    assert set(kotak_rtree) == set(titik)
+    assert all(k[0] <= titik[i][0] <= k[1] and k[2] <= titik[i][1] <= k[3] for i, k in kotak_rtree.items())
+
+    kotak = (-4.0, 119.7, -3.8, 119.9)
+    dalam = {i for i, (lat, lon) in titik.items() if kotak[0] <= lat <= kotak[2] and kotak[1] <= lon <= kotak[3]}
+    hasil = store.dalam_kotak(*kotak)
+    assert set(hasil["id"]) == dalam
+    # Jalur R*Tree (batas besar) dan jalur indeks waktu (batas kecil) memberi laporan terbaru yang sama
+    waktu = {lap["id"]: lap["Waktu"] for lap in store.semua()}
+    for batas in (3, len(dalam)):
+        assert sorted(waktu[i] for i in store.dalam_kotak(*kotak, batas=batas)["id"]) \
+            == sorted(waktu[i] for i in dalam)[-batas:]
@@ -0,0 +1,96 @@
+import json
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+
+from conftest import UpstreamStub
+from musim import KOLOM_IKLIM, file_klimatologi, fitur_musim_banyak, hari_kalender, perbarui_klimatologi
+
+LAT, LON = -3.9, 119.8
+
+
+@pytest.fixture
+def arsip():
+    # Arsip Open-Meteo palsu: curah hujan = bulan*100 + tanggal (sama untuk tanggal kalender yang sama di
+    # semua tahun); hari sejak `kosong_mulai` bernilai null seperti reanalisis yang belum lengkap
+    stub = None
+
+    def isi(path, nomor):
+        q = parse_qs(urlsplit(path).query)
+        tanggal = pd.date_range(q["start_date"][0], q["end_date"][0])
+        kosong = tanggal >= pd.Timestamp(stub.kosong_mulai) if stub.kosong_mulai else np.zeros(len(tanggal), bool)
+        hujan = (tanggal.month * 100 + tanggal.day).astype(float)
+        nilai = lambda v: [None if k else float(x) for x, k in zip(v, kosong)]
+        payload = {"daily": {
+            "time": [t.strftime("%Y-%m-%d") for t in tanggal],
+            "precipitation_sum": nilai(hujan),
+            "temperature_2m_max": nilai(np.full(len(tanggal), 32.0)),
+            "temperature_2m_min": nilai(np.full(len(tanggal), 23.0)),
+            "relative_humidity_2m_mean": nilai(np.full(len(tanggal), 80.0)),
+        }}
+        return json.dumps(payload).encode(), "application/json"
+
+    stub = UpstreamStub(isi=isi)
+    stub.kosong_mulai = None
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+def test_hari_kalender_sejajar_antar_tahun():
+    kabisat = hari_kalender(pd.to_datetime(["2024-02-28", "2024-02-29", "2024-03-01", "2024-12-31"]))
+    biasa = hari_kalender(pd.to_datetime(["2023-02-28", "2023-03-01", "2023-12-31"]))
+    assert list(kabisat) == [59, 60, 61, 366]
+    assert list(biasa) == [59, 61, 366]
+
+
+def test_agregat_per_tanggal_kalender(arsip, tmp_path):
+    rata = perbarui_klimatologi(LAT, LON, requests.Session(), hari_ini=date(2025, 1, 10),
+                                folder=str(tmp_path), base_url=arsip.url)
+    hujan = rata["Curah Hujan (mm)"]
+    # Tanpa geser kabisat: setiap slot berisi nilai tanggalnya sendiri dari semua tahun
+    assert hujan[59] == 228 and hujan[60] == 229 and hujan[61] == 301 and hujan[366] == 1231
+    assert not rata.isna().any().any()
+
+    klim = {"Kulo": rata}
+    fitur = fitur_musim_banyak(klim, hari_ini=date(2025, 1, 15), kolom=["Curah Hujan (mm)"], lama=1)
+    # Panen 2 (MT Gadu) ditanam 1 Feb, Panen 3 (MT III) 1 Jun: nilai klimatologi tanggal itu
+    assert dict(zip(fitur["Musim"], fitur["Curah Hujan (mm)"]))["Panen 3 (MT III)"] == 601
+
+
+def test_hari_null_di_ujung_arsip_diunduh_ulang(arsip, tmp_path):
+    sesi, folder = requests.Session(), str(tmp_path)
+    arsip.kosong_mulai = "2025-01-03"
+    perbarui_klimatologi(LAT, LON, sesi, hari_ini=date(2025, 1, 10), folder=folder, base_url=arsip.url)
+    path_riwayat, path_agregat = file_klimatologi(LAT, LON, folder)
+    riwayat = pd.read_parquet(path_riwayat)
+    assert riwayat["Tanggal"].max() == pd.Timestamp("2025-01-02")
+    assert riwayat[KOLOM_IKLIM].notna().all().all()
+
+    # Hari berikutnya data 3-5 Jan sudah ada: kursor melanjutkan dari 3 Jan, bukan 6 Jan
+    arsip.kosong_mulai = None
+    perbarui_klimatologi(LAT, LON, sesi, hari_ini=date(2025, 1, 11), folder=folder, base_url=arsip.url)
+    riwayat = pd.read_parquet(path_riwayat)
+    assert arsip.permintaan[-1].count("start_date=2025-01-03") == 1
+    assert list(riwayat["Tanggal"].tail(4).dt.day) == [3, 4, 5, 6]
+    assert riwayat["Tanggal"].is_unique
+    agregat = pd.read_parquet(path_agregat).set_index("Hari")
+    assert agregat.loc[3, "cacah Curah Hujan (mm)"] == 10
+
+
+def test_agregat_lama_dibangun_ulang_dari_riwayat(arsip, tmp_path):
+    sesi, folder = requests.Session(), str(tmp_path)
+    perbarui_klimatologi(LAT, LON, sesi, hari_ini=date(2025, 1, 10), folder=folder, base_url=arsip.url)
+    _, path_agregat = file_klimatologi(LAT, LON, folder)
+    lama = pd.read_parquet(path_agregat)
+    tmp_path.joinpath(path_agregat).unlink()
+
+    n = len(arsip.permintaan)
+    rata = perbarui_klimatologi(LAT, LON, sesi, hari_ini=date(2025, 1, 10), folder=folder, base_url=arsip.url)
+    assert len(arsip.permintaan) == n
+    pd.testing.assert_frame_equal(pd.read_parquet(path_agregat), lama)
+    assert rata["Curah Hujan (mm)"][61] == 301
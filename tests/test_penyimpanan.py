@@ -0,0 +1,57 @@
+import json
+import threading
+
+import pytest
+
+from penyimpanan import VERSI_KOSONG, BerkasJSON, KonflikTulis
+
+
+def test_tulis_optimis_menolak_versi_usang(tmp_path):
+    path = str(tmp_path / "harga.json")
+    a, b = BerkasJSON(path), BerkasJSON(path)
+    data, versi = a.baca()
+    assert data == [] and versi == VERSI_KOSONG
+
+    versi_a = a.tulis(data + ["a"], versi)
+    # Sesi b masih memegang versi "kosong": file sudah dibuat a, jadi penulisannya ditolak
+    with pytest.raises(KonflikTulis):
+        b.tulis(["b"], VERSI_KOSONG)
+    assert b.baca() == (["a"], versi_a)
+
+    data_b, versi_b = b.baca()
+    b.tulis(data_b + ["b"], versi_b)
+    with pytest.raises(KonflikTulis):
+        a.tulis(["a", "a2"], versi_a)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == ["a", "b"]
+    assert a.tulis(["paksa"]) and a.baca()[0] == ["paksa"]  # tanpa versi: tulis tanpa pemeriksaan
+
+
+def test_baca_mengembalikan_salinan_dan_mengikuti_perubahan_luar(tmp_path):
+    path = tmp_path / "pengingat.json"
+    berkas = BerkasJSON(str(path), default={})
+    berkas.tulis({"catatan": ["siram"]})
+    data, versi = berkas.baca()
+    data["catatan"].append("kotor")
+    assert berkas.baca() == ({"catatan": ["siram"]}, versi)
+
+    path.write_text(json.dumps({"catatan": ["dari proses lain", "x"]}), encoding="utf-8")
+    assert berkas.baca()[0] == {"catatan": ["dari proses lain", "x"]}
+    path.write_text("{rusak", encoding="utf-8")
+    assert berkas.baca()[0] == {}
+
+
+def test_ubah_dari_banyak_thread_tidak_kehilangan_pembaruan(tmp_path):
+    path = str(tmp_path / "harga.json")
+
+    def tambah(id_thread):
+        berkas = BerkasJSON(path)
+        for i in range(25):
+            berkas.ubah(lambda data: data + [f"{id_thread}-{i}"])
+
+    thread = [threading.Thread(target=tambah, args=(k,)) for k in range(8)]
+    for t in thread:
+        t.start()
+    for t in thread:
+        t.join()
+    assert sorted(BerkasJSON(path).baca()[0]) == sorted(f"{k}-{i}" for k in range(8) for i in range(25))
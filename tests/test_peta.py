@@ -0,0 +1,32 @@
+import folium
+
+import peta
+from peta import CachePeta, tampil_peta
+
+
+def bangun():
+    return folium.Map(location=[-3.92, 119.77], zoom_start=11)
+
+
+def test_cache_dipakai_ulang(monkeypatch):
+    panggilan = []
+    monkeypatch.setattr(peta, "_component_func", lambda **arg: panggilan.append(arg) or {"last_clicked": None})
+    cache = CachePeta()
+    for _ in range(3):
+        assert tampil_peta(cache, "k", bangun, key="peta_uji") == {"last_clicked": None}
+    assert cache.stats == {"hit": 2, "bangun": 1, "cadangan": 0}
+    assert len(panggilan) == 3 and panggilan[0]["script"] == panggilan[2]["script"]
+
+
+def test_api_internal_berubah_kembali_ke_st_folium(monkeypatch):
+    def komponen_baru(**arg):
+        raise TypeError("unexpected keyword argument 'wrap_longitude'")
+
+    cadangan = []
+    monkeypatch.setattr(peta, "_component_func", komponen_baru)
+    monkeypatch.setattr(peta, "st_folium", lambda m, **opsi: cadangan.append((m, opsi)) or {"last_clicked": None})
+    cache = CachePeta()
+    assert tampil_peta(cache, "k", bangun, key="peta_uji") == {"last_clicked": None}
+    assert cache.stats["cadangan"] == 1
+    m, opsi = cadangan[0]
+    assert isinstance(m, folium.Map) and opsi["key"] == "peta_uji" and opsi["returned_objects"] == ["last_clicked"]
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from skenario import (
+    PERSENTIL, evaluasi_skenario, harga_impas, hasil_dari_cuaca, jumlah_skenario, peta_laba, ringkasan_laba,
+    sampel_merata,
+)
+
+HASIL = [4000.0, 5200.0, 6100.0]
+HARGA = [5000.0, 7000.0]
+LUAS = [0.5, 1.0, 2.0]
+BIAYA = [4e6, 30e6]
+
+
+def test_evaluasi_sama_dengan_loop():
+    laba = evaluasi_skenario(HASIL, HARGA, LUAS, BIAYA, dtype=np.float64)
+    assert laba.shape == (3, 2, 3, 2)
+    for i, h in enumerate(HASIL):
+        for j, p in enumerate(HARGA):
+            for k, l in enumerate(LUAS):
+                for m, c in enumerate(BIAYA):
+                    assert laba[i, j, k, m] == pytest.approx((h * p - c) * l)
+
+
+def test_ringkasan_dan_peta_sama_dengan_loop():
+    semua = [(h * p - c) * l for h in HASIL for p in HARGA for l in LUAS for c in BIAYA]
+    laba = evaluasi_skenario(HASIL, HARGA, LUAS, BIAYA)
+    ringkasan = ringkasan_laba(laba)
+    for p, v in zip(PERSENTIL, np.percentile(semua, PERSENTIL)):
+        assert ringkasan[f"Laba P{p} (Rp)"] == pytest.approx(v, rel=1e-6)
+    assert ringkasan["Peluang Rugi (%)"] == pytest.approx(100 * np.mean(np.array(semua) < 0))
+
+    peta = peta_laba(laba)
+    assert peta.shape == (len(HARGA), len(BIAYA))
+    for j, p in enumerate(HARGA):
+        for m, c in enumerate(BIAYA):
+            assert peta[j, m] == pytest.approx(np.median([(h * p - c) * l for h in HASIL for l in LUAS]), rel=1e-6)
+
+
+def test_grid_besar_disampel_di_bawah_batas():
+    hasil = np.linspace(3000, 7000, 1250)
+    harga, luas, biaya = np.linspace(5000, 9000, 50), np.linspace(0.5, 2, 12), np.linspace(4e6, 6e6, 50)
+    penuh = evaluasi_skenario(hasil, harga, luas, biaya, dtype=np.float64, batas=None)
+    laba = evaluasi_skenario(hasil, harga, luas, biaya, batas=1_000_000)
+    assert jumlah_skenario(hasil, harga, luas, biaya) == penuh.size == 37_500_000
+    assert laba.size <= 1_000_000 and laba.dtype == np.float32
+    a, b = ringkasan_laba(laba), ringkasan_laba(penuh)
+    for p in PERSENTIL:
+        assert a[f"Laba P{p} (Rp)"] == pytest.approx(b[f"Laba P{p} (Rp)"], rel=0.02)
+
+
+def test_sampel_merata_menjaga_ujung():
+    nilai = np.random.default_rng(1).permutation(np.arange(100.0))
+    sampel = sampel_merata(nilai, 11)
+    assert sampel[0] == 0 and sampel[-1] == 99 and np.all(np.diff(sampel) > 0)
+    assert sampel_merata([3.0, 1.0], 5).tolist() == [3.0, 1.0]
+
+
+def test_harga_impas_dan_hasil_dari_cuaca():
+    impas = harga_impas([0.0, 5000.0], [5e6])
+    assert np.isinf(impas[0, 0]) and impas[1, 0] == pytest.approx(1000)
+
+    class ModelLinear:
+        def predict(self, X):
+            return X @ np.array([10.0, 100.0, 1.0])
+
+    hasil = hasil_dari_cuaca(ModelLinear(), [0.0, 5.0], [30.0], [70.0, 80.0])
+    assert hasil.tolist() == [3070.0, 3080.0, 3120.0, 3130.0]
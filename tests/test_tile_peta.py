@@ -0,0 +1,110 @@
+import os
+import threading
+
+import pytest
+import requests
+
+from tile_peta import ProksiTile, jalankan_server, tile_dalam_kotak
+from wilayah import BBOX_SIDRAP
+
+# Tile zoom 10 di tengah Sidrap dan satu tile jauh di luar wilayah (Jakarta)
+Z = 10
+X, Y = tile_dalam_kotak(BBOX_SIDRAP, Z)[0]
+X_LUAR, Y_LUAR = tile_dalam_kotak((-6.3, 106.7, -6.1, 106.9), Z)[0]
+
+
+@pytest.fixture
+def proksi(tmp_path, upstream):
+    lapisan = {"dasar": (upstream.url + "/{z}/{x}/{y}.png", 600)}
+    p = ProksiTile(folder=str(tmp_path), lapisan=lapisan, session=requests.Session(), timeout=(1, 2),
+                   wilayah=BBOX_SIDRAP)
+    p.ember_sekarang = 100
+    p.ember = lambda lapisan, sekarang=None: p.ember_sekarang
+    return p
+
+
+def test_miss_lalu_hit(proksi, upstream):
+    isi, status = proksi.ambil("dasar", Z, X, Y)
+    assert status == "MISS"
+    assert proksi.ambil("dasar", Z, X, Y) == (isi, "HIT")
+    assert upstream.jumlah() == 1
+    assert proksi.ringkasan()["hit_rate"] == 0.5
+
+
+def test_single_flight(proksi, upstream):
+    # Banyak permintaan bersamaan untuk tile yang sama hanya sekali ke upstream
+    upstream.jeda = 0.3
+    hasil = []
+    threads = [threading.Thread(target=lambda: hasil.append(proksi.ambil("dasar", Z, X, Y))) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert upstream.jumlah() == 1
+    assert len({isi for isi, _ in hasil}) == 1
+    assert sorted(s for _, s in hasil) == ["HIT"] * 9 + ["MISS"]
+
+
+def test_ganti_ember(proksi, upstream, tmp_path):
+    lama, _ = proksi.ambil("dasar", Z, X, Y)
+    proksi.ember_sekarang = 101
+    baru, status = proksi.ambil("dasar", Z, X, Y)
+    assert status == "MISS" and baru != lama
+    assert upstream.jumlah() == 2
+    # Hanya ember terbaru yang disimpan di disk
+    folder = tmp_path / "dasar" / str(Z) / str(X)
+    assert sorted(os.listdir(folder)) == [f"{Y}-101.png"]
+
+
+def test_stale_saat_upstream_gagal(proksi, upstream):
+    lama, _ = proksi.ambil("dasar", Z, X, Y)
+    proksi.ember_sekarang = 101
+    upstream.gagal = True
+    assert proksi.ambil("dasar", Z, X, Y) == (lama, "STALE")
+    assert proksi.stats["stale"] == 1 and proksi.stats["gagal"] == 1
+    # Tanpa salinan lama sama sekali: galat upstream diteruskan
+    with pytest.raises(requests.RequestException):
+        proksi.ambil("dasar", Z, X + 1, Y)
+
+
+def test_batas_lru(tmp_path, upstream):
+    lapisan = {"dasar": (upstream.url + "/{z}/{x}/{y}.png", 600)}
+    # Tile stub ~1 KB; batas 4 KB menyisakan paling banyak 3-4 tile
+    p = ProksiTile(folder=str(tmp_path), lapisan=lapisan, session=requests.Session(), batas_mb=4 / 1024)
+    tiles = tile_dalam_kotak(BBOX_SIDRAP, Z)[:8]
+    for x, y in tiles:
+        p.ambil("dasar", Z, x, y)
+    ringkas = p.ringkasan()
+    assert ringkas["tile"] < len(tiles) and ringkas["buang"] == len(tiles) - ringkas["tile"]
+    assert sum(os.path.getsize(os.path.join(a, f)) for a, _, fs in os.walk(tmp_path) for f in fs) <= 4 * 1024
+    # Yang dibuang adalah yang paling lama tidak dipakai; indeks dibangun ulang sama dari disk
+    assert p.ambil("dasar", Z, *tiles[-1])[1] == "HIT"
+    assert p.ambil("dasar", Z, *tiles[0])[1] == "MISS"
+    p2 = ProksiTile(folder=str(tmp_path), lapisan=lapisan, session=requests.Session(), batas_mb=4 / 1024)
+    assert p2.ringkasan()["tile"] == p.ringkasan()["tile"]
+
+
+def test_server_http(proksi, upstream):
+    server = jalankan_server(proksi, port=0, metrik=lambda: "dashboard_rerun_total 0\n")
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        assert server.server_address[0] == "127.0.0.1"
+        r = requests.get(f"{url}/tile/dasar/{Z}/{X}/{Y}.png")
+        assert r.status_code == 200 and r.headers["X-Cache"] == "MISS"
+        r2 = requests.get(f"{url}/tile/dasar/{Z}/{X}/{Y}.png", headers={"If-None-Match": r.headers["ETag"]})
+        assert r2.status_code == 304
+        # Di luar wilayah, di luar ZOOM_PETA, atau lapisan tak dikenal: ditolak tanpa menyentuh upstream
+        for path in [f"dasar/{Z}/{X_LUAR}/{Y_LUAR}", f"dasar/3/{X // 128}/{Y // 128}", f"dasar/19/{X * 512}/{Y * 512}",
+                     f"hujan/{Z}/{X}/{Y}"]:
+            assert requests.get(f"{url}/tile/{path}.png").status_code == 404, path
+        assert upstream.jumlah() == 1
+        # Upstream gagal dan tidak ada salinan: 502; ada salinan ember lama: STALE
+        upstream.gagal = True
+        assert requests.get(f"{url}/tile/dasar/{Z}/{X + 1}/{Y}.png").status_code == 502
+        proksi.ember_sekarang = 101
+        r3 = requests.get(f"{url}/tile/dasar/{Z}/{X}/{Y}.png")
+        assert r3.status_code == 200 and r3.headers["X-Cache"] == "STALE" and r3.content == r.content
+        assert requests.get(f"{url}/metrics").text == "dashboard_rerun_total 0\n"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,370 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from cuaca import buat_session
+
+# ------------------ Proksi Tile Peta (cache disk LRU) ------------------
+# Browser tidak lagi mengambil tile langsung dari OpenWeatherMap/OpenStreetMap: TileLayer folium menunjuk
+# ke proksi lokal ini. Setiap tile diambil dari upstream paling banyak sekali per ember waktu untuk semua
+# pengguna, disimpan di disk (LRU dengan batas ukuran), dan dikirim dengan Cache-Control/ETag sehingga
+# browser memakai ulang tile-nya sendiri. Kunci API OpenWeatherMap tetap di server.
+# Server hanya mendengarkan 127.0.0.1 secara bawaan (dibuka ke luar lewat reverse proxy), dan hanya melayani
+# tile di sekitar wilayah dashboard pada ZOOM_PETA supaya tidak bisa dipakai sebagai proksi tile umum atas
+# kuota API deployment ini.
+#
+#   GET /tile/<lapisan>/<z>/<x>/<y>.png   tile (header X-Cache: HIT / MISS / STALE)
+#   GET /stats                           statistik cache dalam JSON (termasuk hit rate)
+#   GET /metrics                         metrik kinerja dashboard format teks Prometheus (jika diberikan)
+TILE_DIR = "data/tile"
+BATAS_TILE_MB = 256
+PORT_TILE = 8765
+USER_AGENT = "DashboardPertanianSidrap/1.0"
+
+# lapisan -> (url upstream, umur ember dalam detik). Tile curah hujan OWM diperbarui sekitar tiap 10 menit,
+# peta dasar jarang berubah.
+LAPISAN = {
+    "hujan": ("https://tile.openweathermap.org/map/precipitation_new/{z}/{x}/{y}.png?appid={kunci}", 600),
+    "dasar": ("https://tile.openstreetmap.org/{z}/{x}/{y}.png", 7 * 24 * 3600),
+}
+# Zoom yang dipakai peta (10 = kabupaten, 13 = titik terpilih). Tile hujan kasar dan cepat basi, jadi
+# hanya zoom rendah yang diambil di muka supaya kuota API tetap hemat.
+ZOOM_PREFETCH = {"hujan": (8, 9, 10, 11), "dasar": (10, 11, 12, 13)}
+# Zoom yang boleh diminta (min, maks) dan margin derajat di sekitar bbox wilayah untuk peta yang digeser ke tepi
+ZOOM_PETA = (8, 18)
+MARGIN_WILAYAH = 0.25
+
+POLA_PATH = re.compile(r"^/tile/(\w+)/(\d+)/(\d+)/(\d+)\.png$")
+POLA_FILE = re.compile(r"^\d+-\d+\.png$")
+
+
+def perlebar_kotak(bbox, margin):
+    lat_min, lon_min, lat_max, lon_max = bbox
+    return lat_min - margin, lon_min - margin, lat_max + margin, lon_max + margin
+
+
+def tile_dalam_kotak(bbox, z):
+    # (x, y) semua tile zoom z yang menutupi bbox (lat_min, lon_min, lat_max, lon_max), skema slippy map
+    lat_min, lon_min, lat_max, lon_max = bbox
+    n = 2 ** z
+
+    def ke_xy(lat, lon):
+        x = int((lon + 180) / 360 * n)
+        y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+        return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+    x0, y0 = ke_xy(lat_max, lon_min)
+    x1, y1 = ke_xy(lat_min, lon_max)
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+class ProksiTile:
+    # Cache tile per (lapisan, z, x, y, ember). Ember = waktu // umur lapisan; tile ember lama tidak
+    # dikirim sebagai tile segar, tetapi masih dipakai (STALE) jika upstream gagal. Indeks LRU disimpan
+    # di memori dan dibangun ulang dari isi folder (urut mtime) saat proses mulai.
+    # wilayah: bbox (lat_min, lon_min, lat_max, lon_max) yang dilayani, None = semua tile dunia.
+    def __init__(self, folder=TILE_DIR, lapisan=LAPISAN, kunci_api="", batas_mb=BATAS_TILE_MB,
+                 session=None, timeout=(3.05, 10), wilayah=None, zoom=ZOOM_PETA, margin=MARGIN_WILAYAH):
+        self.folder = folder
+        self.wilayah = None if wilayah is None else perlebar_kotak(wilayah, margin)
+        self.zoom = zoom
+        self._rentang = {}  # z -> (x0, x1, y0, y1) tile yang diizinkan
+        self.lapisan = lapisan
+        self.kunci_api = kunci_api
+        self.batas = batas_mb * 1024 * 1024
+        # Retry tile dibuat singkat: browser menunggu, dan tile yang gagal masih punya salinan lama
+        self.session = session or buat_session(retries=1, backoff=0.2)
+        self.session.headers["User-Agent"] = USER_AGENT
+        self.timeout = timeout
+        self.stats = {"hit": 0, "miss": 0, "stale": 0, "gagal": 0, "buang": 0, "prefetch": 0}
+        self._lock = threading.Lock()
+        self._indeks = OrderedDict()  # (lapisan, z, x, y, ember) -> ukuran byte, urut LRU
+        self._terbaru = {}  # (lapisan, z, x, y) -> ember terbaru di disk
+        self._sedang = {}  # kunci -> Event, supaya miss bersamaan untuk tile yang sama hanya sekali ke upstream
+        self._ukuran = 0
+        self._muat_indeks()
+
+    # ---------- Indeks di disk ----------
+    def _path(self, kunci):
+        lapisan, z, x, y, ember = kunci
+        # Ember di nama file (bukan folder) supaya pergantian ember tidak meninggalkan folder kosong
+        return os.path.join(self.folder, lapisan, str(z), str(x), f"{y}-{ember}.png")
+
+    def _muat_indeks(self):
+        entri = []
+        for akar, _, files in os.walk(self.folder):
+            for nama in files:
+                if not nama.endswith(".png"):
+                    continue
+                path = os.path.join(akar, nama)
+                bagian = os.path.relpath(path, self.folder).split(os.sep)
+                if len(bagian) != 4 or not POLA_FILE.match(nama):
+                    continue
+                y, ember = map(int, nama[:-4].split("-"))
+                st = os.stat(path)
+                entri.append((st.st_mtime, (bagian[0], int(bagian[1]), int(bagian[2]), y, ember), st.st_size))
+        for _, kunci, ukuran in sorted(entri):
+            self._catat(kunci, ukuran)
+
+    def _catat(self, kunci, ukuran):
+        # Dipanggil di bawah _lock (atau saat inisialisasi). Hanya ember terbaru per tile yang disimpan.
+        tile, ember = kunci[:4], kunci[4]
+        lama = self._terbaru.get(tile)
+        if lama is not None and lama > ember:
+            self._hapus_file(kunci)
+            return
+        if lama is not None and lama != ember:
+            self._buang(tile + (lama,))
+        self._ukuran += ukuran - self._indeks.get(kunci, 0)
+        self._indeks[kunci] = ukuran
+        self._indeks.move_to_end(kunci)
+        self._terbaru[tile] = ember
+        while self._ukuran > self.batas and len(self._indeks) > 1:
+            self._buang(next(iter(self._indeks)))
+            self.stats["buang"] += 1
+
+    def _buang(self, kunci):
+        self._ukuran -= self._indeks.pop(kunci, 0)
+        if self._terbaru.get(kunci[:4]) == kunci[4]:
+            del self._terbaru[kunci[:4]]
+        self._hapus_file(kunci)
+
+    def _hapus_file(self, kunci):
+        try:
+            os.remove(self._path(kunci))
+        except FileNotFoundError:
+            pass
+
+    def _baca(self, kunci):
+        try:
+            with open(self._path(kunci), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _tulis(self, kunci, isi):
+        path = self._path(kunci)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(isi)
+        os.replace(tmp, path)
+        with self._lock:
+            self._catat(kunci, len(isi))
+
+    # ---------- API utama ----------
+    def diizinkan(self, lapisan, z, x, y):
+        # Apakah tile boleh dilayani: lapisan dikenal, zoom dalam ZOOM_PETA, dan tile menyentuh wilayah
+        if lapisan not in self.lapisan or not self.zoom[0] <= z <= self.zoom[1]:
+            return False
+        if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return False
+        if self.wilayah is None:
+            return True
+        rentang = self._rentang.get(z)
+        if rentang is None:
+            tile = tile_dalam_kotak(self.wilayah, z)
+            xs, ys = [t[0] for t in tile], [t[1] for t in tile]
+            rentang = self._rentang[z] = (min(xs), max(xs), min(ys), max(ys))
+        return rentang[0] <= x <= rentang[1] and rentang[2] <= y <= rentang[3]
+
+    def ember(self, lapisan, sekarang=None):
+        return int((sekarang or time.time()) // self.lapisan[lapisan][1])
+
+    def sisa_umur(self, lapisan, sekarang=None):
+        # Detik sampai ember sekarang berakhir; dipakai sebagai max-age di header
+        sekarang = sekarang or time.time()
+        umur = self.lapisan[lapisan][1]
+        return max(int((self.ember(lapisan, sekarang) + 1) * umur - sekarang), 1)
+
+    def ambil(self, lapisan, z, x, y, hitung=True):
+        # -> (isi PNG, status "HIT"/"MISS"/"STALE"). requests.RequestException jika upstream gagal
+        # dan tidak ada salinan lama sama sekali.
+        tile = (lapisan, z, x, y)
+        kunci = tile + (self.ember(lapisan),)
+        while True:
+            with self._lock:
+                ada = kunci in self._indeks
+                if ada:
+                    self._indeks.move_to_end(kunci)
+                else:
+                    menunggu = self._sedang.get(kunci)
+                    if menunggu is None:
+                        self._sedang[kunci] = threading.Event()
+                        break
+            if not ada:
+                # Tile yang sama sedang diunduh permintaan lain: tunggu lalu baca dari cache
+                menunggu.wait(self.timeout[1] + 5)
+                continue
+            isi = self._baca(kunci)
+            if isi is not None:
+                if hitung:
+                    with self._lock:
+                        self.stats["hit"] += 1
+                return isi, "HIT"
+            with self._lock:  # file hilang dari disk (dihapus manual): lupakan dan unduh ulang
+                self._buang(kunci)
+
+        try:
+            if hitung:
+                with self._lock:
+                    self.stats["miss"] += 1
+            try:
+                isi = self._unduh(lapisan, z, x, y)
+            except requests.RequestException:
+                with self._lock:
+                    self.stats["gagal"] += 1
+                    lama = self._terbaru.get(tile)
+                    isi = self._baca(tile + (lama,)) if lama is not None else None
+                    if isi is None:
+                        raise
+                    self.stats["stale"] += 1
+                return isi, "STALE"
+            self._tulis(kunci, isi)
+            return isi, "MISS"
+        finally:
+            with self._lock:
+                self._sedang.pop(kunci).set()
+
+    def _unduh(self, lapisan, z, x, y):
+        url = self.lapisan[lapisan][0].format(z=z, x=x, y=y, kunci=self.kunci_api)
+        resp = self.session.get(url, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.content
+
+    def prefetch(self, lapisan, bbox, zoom, max_workers=4):
+        # Ambil di muka semua tile bbox pada daftar zoom yang belum ada di ember sekarang.
+        # Tidak dihitung sebagai hit/miss supaya hit rate mencerminkan permintaan browser.
+        ember = self.ember(lapisan)
+        with self._lock:
+            kurang = [
+                (z, x, y) for z in zoom for x, y in tile_dalam_kotak(bbox, z)
+                if (lapisan, z, x, y, ember) not in self._indeks
+            ]
+
+        def satu(zxy):
+            try:
+                return self.ambil(lapisan, *zxy, hitung=False)[1] == "MISS"
+            except requests.RequestException:
+                return False
+
+        # Satu tile dicoba dulu: jika upstream tidak terjangkau, putaran ini dilewati tanpa membanjiri retry
+        if not kurang or not satu(kurang[0]):
+            return 0
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            baru = 1 + sum(pool.map(satu, kurang[1:]))
+        with self._lock:
+            self.stats["prefetch"] += baru
+        return baru
+
+    def ringkasan(self):
+        with self._lock:
+            hasil = dict(self.stats, tile=len(self._indeks), ukuran_mb=round(self._ukuran / 1024 / 1024, 2))
+        dilayani = hasil["hit"] + hasil["miss"]
+        hasil["hit_rate"] = round(hasil["hit"] / dilayani, 3) if dilayani else None
+        return hasil
+
+
+def jalankan_prefetch(proksi, bbox, zoom=ZOOM_PREFETCH):
+    # Thread latar: prefetch semua lapisan, lalu ulangi begitu ember lapisan yang paling cepat basi berganti
+    zoom = {n: z for n, z in zoom.items() if n in proksi.lapisan}
+    tercepat = min(zoom, key=lambda n: proksi.lapisan[n][1])
+
+    def kerja():
+        while True:
+            for lapisan, daftar_zoom in zoom.items():
+                proksi.prefetch(lapisan, bbox, daftar_zoom)
+            time.sleep(proksi.sisa_umur(tercepat) + 1)
+
+    thread = threading.Thread(target=kerja, daemon=True)
+    thread.start()
+    return thread
+
+
+def buat_handler(proksi, metrik=None):
+    # metrik: fungsi tanpa argumen -> teks Prometheus untuk /metrics (opsional)
+    class HandlerTile(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Header dan isi dikirim dalam dua write; tanpa ini Nagle + delayed ACK menahan ~40 ms per tile
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _kirim(self, status, isi=b"", tipe="text/plain", header=None):
+            self.send_response(status)
+            self.send_header("Content-Type", tipe)
+            self.send_header("Content-Length", str(len(isi)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            for k, v in (header or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(isi)
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/stats":
+                isi = json.dumps(proksi.ringkasan()).encode("utf-8")
+                self._kirim(200, isi, "application/json", {"Cache-Control": "no-store"})
+                return
+            if path == "/metrics" and metrik is not None:
+                isi = metrik().encode("utf-8")
+                self._kirim(200, isi, "text/plain; version=0.0.4; charset=utf-8", {"Cache-Control": "no-store"})
+                return
+            cocok = POLA_PATH.match(path)
+            if not cocok:
+                self._kirim(404)
+                return
+            lapisan, (z, x, y) = cocok.group(1), map(int, cocok.groups()[1:])
+            if not proksi.diizinkan(lapisan, z, x, y):
+                self._kirim(404)
+                return
+            try:
+                isi, status = proksi.ambil(lapisan, z, x, y)
+            except requests.RequestException:
+                self._kirim(502)
+                return
+            etag = '"%s"' % hashlib.sha1(isi).hexdigest()[:16]
+            # Tile basi hanya boleh di-cache sebentar supaya browser segera meminta versi baru
+            max_age = 60 if status == "STALE" else proksi.sisa_umur(lapisan)
+            header = {"Cache-Control": f"public, max-age={max_age}", "ETag": etag, "X-Cache": status}
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                for k, v in header.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self._kirim(200, isi, "image/png", header)
+
+        do_HEAD = do_GET
+
+    return HandlerTile
+
+
+def proksi_aktif(port, host="127.0.0.1"):
+    # Apakah sudah ada proksi tile (mis. milik proses Streamlit lain) yang melayani port ini
+    try:
+        resp = requests.get(f"http://{host}:{port}/stats", timeout=1)
+        return resp.ok and "hit_rate" in resp.json()
+    except (requests.RequestException, ValueError):
+        return False
+
+
+def jalankan_server(proksi, host="127.0.0.1", port=PORT_TILE, metrik=None):
+    # Server HTTP proksi di thread latar; port=0 memilih port bebas (untuk uji). OSError jika port terpakai.
+    # Bawaan hanya localhost: /stats dan /metrics tidak untuk publik, tile dibuka lewat reverse proxy.
+    server = ThreadingHTTPServer((host, port), buat_handler(proksi, metrik))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
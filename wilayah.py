@@ -0,0 +1,122 @@
+import re
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+# ------------------ Wilayah Kabupaten Sidrap ------------------
+# Titik tengah perkiraan tiap kecamatan (lat, lon)
+KECAMATAN_SIDRAP = [
+    ("Maritengngae", -3.921, 119.773),
+    ("Watang Sidenreng", -3.960, 119.850),
+    ("Tellu Limpoe", -4.030, 119.880),
+    ("Panca Lautang", -4.070, 119.750),
+    ("Baranti", -3.870, 119.800),
+    ("Panca Rijang", -3.850, 119.750),
+    ("Kulo", -3.800, 119.730),
+    ("Watang Pulu", -3.900, 119.680),
+    ("Dua Pitue", -3.800, 119.950),
+    ("Pitu Riawa", -3.750, 120.050),
+    ("Pitu Riase", -3.600, 120.050),
+]
+
+# Batas kotak kabupaten: (lat_min, lon_min, lat_max, lon_max)
+BBOX_SIDRAP = (-4.15, 119.60, -3.45, 120.25)
+
+
+def buat_grid(step=0.05, bbox=BBOX_SIDRAP):
+    # Grid titik teratur di dalam kotak kabupaten, format sama dengan KECAMATAN_SIDRAP
+    lat_min, lon_min, lat_max, lon_max = bbox
+    lats = np.round(np.arange(lat_min, lat_max + 1e-9, step), 4)
+    lons = np.round(np.arange(lon_min, lon_max + 1e-9, step), 4)
+    grid_lat, grid_lon = np.meshgrid(lats, lons, indexing="ij")
+    return [
+        (f"Grid {lat:.3f},{lon:.3f}", float(lat), float(lon))
+        for lat, lon in zip(grid_lat.ravel(), grid_lon.ravel())
+    ]
+
+
+# ------------------ Gazetir Desa/Kelurahan & Geokode Laporan ------------------
+# Koordinat di gazetir adalah perkiraan (sekitar pusat desa); baris kecamatan diletakkan terakhir
+# supaya nama desa yang sama dengan kecamatannya (mis. Baranti) memakai titik yang lebih rinci.
+GAZETIR_FILE = "data/gazetir_sidrap.csv"
+KATA_UMUM = {"desa", "kel", "kelurahan", "kec", "kecamatan", "dusun", "dsn", "jl", "jalan",
+             "dekat", "di", "sawah", "kampung", "kab", "sidrap"}
+
+
+def bersihkan_lokasi(teks):
+    return " ".join(k for k in re.findall(r"\w+", str(teks).lower()) if k not in KATA_UMUM)
+
+
+class Gazetir:
+    ambang = 85
+
+    def __init__(self, path=GAZETIR_FILE):
+        self.df = pd.read_csv(path)
+        self._nama = [bersihkan_lokasi(n) for n in self.df["nama"]]
+
+    def cocokkan(self, lokasi, skor_min=None):
+        # Baris gazetir (dict) yang paling cocok dengan teks Lokasi bebas, None jika di bawah ambang
+        q = bersihkan_lokasi(lokasi)
+        if not q:
+            return None
+        hasil = process.extractOne(q, self._nama, scorer=fuzz.WRatio,
+                                   score_cutoff=self.ambang if skor_min is None else skor_min)
+        if hasil is None:
+            return None
+        return {**self.df.iloc[hasil[2]].to_dict(), "skor": hasil[1]}
+
+    def koordinat(self, lokasi):
+        baris = self.cocokkan(lokasi)
+        return None if baris is None else (baris["lat"], baris["lon"])
+
+
+def tentukan_koordinat(pin=None, gps=None, lokasi="", gazetir=None):
+    # Urutan sumber: titik yang diklik di peta, GPS foto, lalu nama lokasi di gazetir.
+    # Mengembalikan (lat, lon, sumber) atau (None, None, None).
+    if pin:
+        return pin[0], pin[1], "peta"
+    if gps:
+        return gps[0], gps[1], "gps"
+    if gazetir is not None:
+        titik = gazetir.koordinat(lokasi)
+        if titik:
+            return titik[0], titik[1], "gazetir"
+    return None, None, None
+
+
+# ------------------ Sebaran & Hotspot Laporan per Kecamatan ------------------
+def kecamatan_terdekat(lat, lon, kecamatan=KECAMATAN_SIDRAP):
+    # Indeks kecamatan dengan pusat terdekat untuk setiap titik (-1 jika koordinat kosong)
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    pusat = np.array([(la, lo) for _, la, lo in kecamatan])
+    # Jarak ekuirektangular cukup untuk wilayah sekecil kabupaten
+    dlat = lat[:, None] - pusat[None, :, 0]
+    dlon = (lon[:, None] - pusat[None, :, 1]) * np.cos(np.radians(pusat[None, :, 0]))
+    idx = np.argmin(dlat ** 2 + dlon ** 2, axis=1)
+    return np.where(np.isnan(lat) | np.isnan(lon), -1, idx)
+
+
+def hotspot_kecamatan(lat, lon, jenis, daftar_jenis, bobot=None, kecamatan=KECAMATAN_SIDRAP, z_min=1.0):
+    # Jumlah laporan per (kecamatan, jenis) dengan satu bincount; hotspot = skor-z total >= z_min.
+    # bobot: jumlah laporan per titik, jika titik sudah diagregasi sebelumnya
+    idx_kec = kecamatan_terdekat(lat, lon, kecamatan)
+    idx_jenis = pd.Categorical(jenis, categories=daftar_jenis).codes
+    ok = (idx_kec >= 0) & (idx_jenis >= 0)
+    n_kec, n_jenis = len(kecamatan), len(daftar_jenis)
+    hitung = np.bincount(
+        idx_kec[ok] * n_jenis + idx_jenis[ok],
+        weights=None if bobot is None else np.asarray(bobot)[ok],
+        minlength=n_kec * n_jenis,
+    ).astype(int).reshape(n_kec, n_jenis)
+
+    total = hitung.sum(axis=1)
+    std = total.std()
+    z = (total - total.mean()) / std if std > 0 else np.zeros(n_kec)
+    df = pd.DataFrame(hitung, columns=daftar_jenis)
+    df.insert(0, "Kecamatan", [nama for nama, _, _ in kecamatan])
+    df["Total"] = total
+    df["Skor-z"] = np.round(z, 2)
+    df["Hotspot"] = z >= z_min
+    return df.sort_values("Total", ascending=False, kind="stable").reset_index(drop=True)